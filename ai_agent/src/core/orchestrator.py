@@ -21,6 +21,7 @@ from shared.database.connection import Database
 from shared.services.company_service import CompanyService
 from shared.services.message_repository import MessageRepository
 from shared.services.session_repository import SessionRepository
+from shared.services.session_state_buffer import SessionStateBuffer
 from crm_integrations.src.factory import CRMFactory
 
 from ..services.gemini_service import GeminiService
@@ -58,12 +59,18 @@ class Orchestrator:
         self.db = Database(database_url or settings.postgres_url)
         self.gemini = GeminiService()
         self.storage = RedisStorage()
+        # Создается после подключения к Redis (initialize)
+        self.session_states: Optional[SessionStateBuffer] = None
 
         logger.info("orchestrator_initialized")
     
     async def initialize(self):
         """Инициализация всех компонентов"""
         await self.storage.connect()
+
+        self.session_states = SessionStateBuffer(self.storage.redis, self.db)
+        self.session_states.start()
+
         logger.info("orchestrator_ready")
     
     async def handle_message(self, message: Message) -> Dict[str, any]:
@@ -204,11 +211,19 @@ class Orchestrator:
                 await self._update_session_state(session)
 
                 # 8. POSTGRES: Обновляем состояние сессии
-                await session_repo.update_session_state(
+                # (через буфер в Redis, в PostgreSQL попадает пакетно)
+                state = session.state.value if hasattr(session.state, 'value') else session.state
+                buffered = self.session_states is not None and await self.session_states.update_session_state(
                     session_id=session.id,
-                    state=session.state.value if hasattr(session.state, 'value') else session.state,
+                    state=state,
                     context=session.context,
                 )
+                if not buffered:
+                    await session_repo.update_session_state(
+                        session_id=session.id,
+                        state=state,
+                        context=session.context,
+                    )
 
                 # Сохраняем сессию в Redis
                 await self.storage.save_session(session)
@@ -219,7 +234,7 @@ class Orchestrator:
                     company_id=message.company_id,
                     new_state=session.state.value if hasattr(session.state, 'value') else session.state,
                     has_function_call=result.get("function_called", False),
-                    persisted_to_postgres=True
+                    buffered=buffered
                 )
 
                 return result
@@ -356,5 +371,12 @@ class Orchestrator:
     
     async def shutdown(self):
         """Корректное завершение работы"""
+        if self.session_states is not None:
+            # Дописать в PostgreSQL состояния, накопленные в Redis
+            try:
+                await self.session_states.stop()
+            except Exception as e:
+                # Состояния остаются в Redis и будут записаны при следующем запуске
+                logger.error("session_states_final_flush_failed", error=str(e))
         await self.storage.disconnect()
         logger.info("orchestrator_shutdown")
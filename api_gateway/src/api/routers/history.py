@@ -14,20 +14,22 @@ from typing import Optional, List, Dict, Any
 from uuid import UUID
 from fastapi import APIRouter, HTTPException, Query, Depends
 from pydantic import BaseModel, Field
+import redis.asyncio as redis
 import structlog
 
-from shared.database.connection import Database
 from shared.services.message_repository import MessageRepository
 from shared.services.session_repository import SessionRepository
 from shared.services.data_retention_service import DataRetentionService, RetentionPolicy
-from ...config import settings
+from shared.utils.pagination import Cursor, decode_cursor
+from ...core.cache import get_redis
+from ...core.database import db
 from ...core.security import verify_api_key
 
 router = APIRouter()
 logger = structlog.get_logger(__name__)
 
-# Database connection
-db = Database(settings.postgres_url)
+# TTL кэша подсчета сообщений
+MESSAGE_COUNT_CACHE_TTL_SECONDS = 60
 
 
 # ========================================
@@ -68,12 +70,19 @@ class SessionWithMessagesResponse(SessionResponse):
 
 
 class PaginatedResponse(BaseModel):
-    """Базовая модель для пагинации"""
+    """Базовая модель для keyset-пагинации"""
     items: List[Any]
-    total: int
-    page: int
     per_page: int
-    pages: int
+    has_more: bool = False
+    next_cursor: Optional[str] = Field(
+        None, description="Курсор следующей страницы (None - страниц больше нет)"
+    )
+
+
+class CountResponse(BaseModel):
+    """Количество записей"""
+    count: int
+    exact: bool = Field(..., description="False - оценка планировщика PostgreSQL")
 
 
 class AnalyticsResponse(BaseModel):
@@ -104,7 +113,7 @@ class CleanupResponse(BaseModel):
 # ========================================
 
 def model_to_message_response(model) -> MessageResponse:
-    """Конвертация SQLAlchemy модели в Pydantic"""
+    """Конвертация SQLAlchemy модели (или Row из MESSAGE_LIST_COLUMNS) в Pydantic"""
     return MessageResponse(
         id=str(model.id),
         session_id=str(model.session_id),
@@ -135,6 +144,16 @@ def model_to_session_response(model) -> SessionResponse:
     )
 
 
+def parse_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    """Раскодировать курсор из query-параметра"""
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 # ========================================
 # ENDPOINTS
 # ========================================
@@ -142,7 +161,7 @@ def model_to_session_response(model) -> SessionResponse:
 @router.get("/sessions", response_model=PaginatedResponse)
 async def list_sessions(
     company_id: str = Query(..., description="ID компании"),
-    page: int = Query(1, ge=1, description="Номер страницы"),
+    cursor: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы"),
     per_page: int = Query(50, ge=1, le=100, description="Записей на страницу"),
     channel: Optional[str] = Query(None, description="Фильтр по каналу"),
     state: Optional[str] = Query(None, description="Фильтр по состоянию"),
@@ -154,7 +173,7 @@ async def list_sessions(
     Получить список сессий компании с пагинацией
 
     - **company_id**: ID компании (обязательно)
-    - **page**: Номер страницы (начиная с 1)
+    - **cursor**: Курсор следующей страницы (из ответа предыдущего запроса)
     - **per_page**: Записей на страницу (1-100)
     - **channel**: Фильтр по каналу (telegram, whatsapp, voice, web)
     - **state**: Фильтр по состоянию (INITIATED, GREETING, BOOKING, COMPLETED, etc.)
@@ -162,9 +181,9 @@ async def list_sessions(
     async with db.session() as db_session:
         session_repo = SessionRepository(db_session)
 
-        sessions, total = await session_repo.get_sessions_with_pagination(
+        sessions, next_cursor = await session_repo.get_sessions_with_pagination(
             company_id=company_id,
-            page=page,
+            cursor=parse_cursor(cursor),
             per_page=per_page,
             channel=channel,
             state=state,
@@ -173,27 +192,25 @@ async def list_sessions(
         )
 
         items = [model_to_session_response(s) for s in sessions]
-        pages = (total + per_page - 1) // per_page
 
         logger.info(
             "sessions_listed",
             company_id=company_id,
-            total=total,
-            page=page
+            count=len(items),
+            has_more=next_cursor is not None
         )
 
         return PaginatedResponse(
             items=items,
-            total=total,
-            page=page,
             per_page=per_page,
-            pages=pages,
+            has_more=next_cursor is not None,
+            next_cursor=next_cursor,
         )
 
 
 @router.get("/sessions/{session_id}", response_model=SessionWithMessagesResponse)
 async def get_session_with_messages(
-    session_id: str,
+    session_id: UUID,
     _: str = Depends(verify_api_key),
 ):
     """
@@ -210,10 +227,9 @@ async def get_session_with_messages(
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
 
-        messages = await message_repo.get_session_messages(
+        messages = await message_repo.list_session_messages_lite(
             session_id=session_id,
             limit=1000,
-            order_desc=False,
         )
 
         session_data = model_to_session_response(session)
@@ -227,9 +243,9 @@ async def get_session_with_messages(
 @router.get("/messages", response_model=PaginatedResponse)
 async def list_messages(
     company_id: str = Query(..., description="ID компании"),
-    page: int = Query(1, ge=1, description="Номер страницы"),
+    cursor: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы"),
     per_page: int = Query(50, ge=1, le=100, description="Записей на страницу"),
-    session_id: Optional[str] = Query(None, description="Фильтр по сессии"),
+    session_id: Optional[UUID] = Query(None, description="Фильтр по сессии"),
     channel: Optional[str] = Query(None, description="Фильтр по каналу"),
     start_date: Optional[datetime] = Query(None, description="Начало периода"),
     end_date: Optional[datetime] = Query(None, description="Конец периода"),
@@ -239,7 +255,7 @@ async def list_messages(
     Получить список сообщений компании с пагинацией
 
     - **company_id**: ID компании (обязательно)
-    - **page**: Номер страницы (начиная с 1)
+    - **cursor**: Курсор следующей страницы (из ответа предыдущего запроса)
     - **per_page**: Записей на страницу (1-100)
     - **session_id**: Фильтр по конкретной сессии
     - **channel**: Фильтр по каналу
@@ -247,9 +263,9 @@ async def list_messages(
     async with db.session() as db_session:
         message_repo = MessageRepository(db_session)
 
-        messages, total = await message_repo.get_messages_with_pagination(
+        messages, next_cursor = await message_repo.get_messages_with_pagination(
             company_id=company_id,
-            page=page,
+            cursor=parse_cursor(cursor),
             per_page=per_page,
             session_id=session_id,
             channel=channel,
@@ -258,24 +274,87 @@ async def list_messages(
         )
 
         items = [model_to_message_response(m) for m in messages]
-        pages = (total + per_page - 1) // per_page
 
         logger.info(
             "messages_listed",
             company_id=company_id,
-            total=total,
-            page=page
+            count=len(items),
+            has_more=next_cursor is not None
         )
 
         return PaginatedResponse(
             items=items,
-            total=total,
-            page=page,
             per_page=per_page,
-            pages=pages,
+            has_more=next_cursor is not None,
+            next_cursor=next_cursor,
         )
 
 
+@router.get("/messages/count", response_model=CountResponse)
+async def count_messages(
+    company_id: str = Query(..., description="ID компании"),
+    session_id: Optional[UUID] = Query(None, description="Фильтр по сессии"),
+    channel: Optional[str] = Query(None, description="Фильтр по каналу"),
+    start_date: Optional[datetime] = Query(None, description="Начало периода"),
+    end_date: Optional[datetime] = Query(None, description="Конец периода"),
+    exact: bool = Query(False, description="Точный COUNT(*) вместо оценки"),
+    _: str = Depends(verify_api_key),
+):
+    """
+    Получить количество сообщений под фильтрами /messages
+
+    Вынесено из списка сообщений, чтобы UI показывал страницу сразу,
+    а итог запрашивал отдельно. По умолчанию возвращается оценка
+    планировщика; exact=true выполняет COUNT(*). Результат кэшируется
+    в Redis на MESSAGE_COUNT_CACHE_TTL_SECONDS (границы периода
+    округляются до минуты).
+    """
+    cache_key = ":".join([
+        "history:messages:count",
+        "exact" if exact else "approx",
+        company_id,
+        str(session_id) if session_id else "",
+        channel or "",
+        start_date.strftime("%Y%m%d%H%M") if start_date else "",
+        end_date.strftime("%Y%m%d%H%M") if end_date else "",
+    ])
+
+    redis_client = get_redis()
+    try:
+        cached = await redis_client.get(cache_key)
+        if cached is not None:
+            return CountResponse(count=int(cached), exact=exact)
+    except redis.RedisError as e:
+        logger.warning("message_count_cache_error", error=str(e))
+
+    async with db.session() as db_session:
+        message_repo = MessageRepository(db_session)
+
+        if exact:
+            count = await message_repo.count_messages(
+                company_id=company_id,
+                session_id=session_id,
+                channel=channel,
+                start_date=start_date,
+                end_date=end_date,
+            )
+        else:
+            count = await message_repo.count_messages_approx(
+                company_id=company_id,
+                session_id=session_id,
+                channel=channel,
+                start_date=start_date,
+                end_date=end_date,
+            )
+
+    try:
+        await redis_client.set(cache_key, count, ex=MESSAGE_COUNT_CACHE_TTL_SECONDS)
+    except redis.RedisError as e:
+        logger.warning("message_count_cache_error", error=str(e))
+
+    return CountResponse(count=count, exact=exact)
+
+
 @router.get("/analytics", response_model=AnalyticsResponse)
 async def get_analytics(
     company_id: str = Query(..., description="ID компании"),
@@ -291,17 +370,14 @@ async def get_analytics(
     - Распределение по состояниям сессий
     - Конверсию (% сессий с записью)
     """
-    async with db.session() as db_session:
-        retention_service = DataRetentionService(db_session)
-
-        stats = await retention_service.get_data_statistics(company_id)
+    stats = await DataRetentionService.get_dashboard_summary(db, company_id)
 
-        logger.info(
-            "analytics_retrieved",
-            company_id=company_id
-        )
+    logger.info(
+        "analytics_retrieved",
+        company_id=company_id
+    )
 
-        return AnalyticsResponse(**stats)
+    return AnalyticsResponse(**stats)
 
 
 @router.get("/analytics/daily")
@@ -353,7 +429,8 @@ async def cleanup_old_data(
     )
 
     async with db.session() as db_session:
-        retention_service = DataRetentionService(db_session)
+        # Пачки удаления фиксируются в собственных сессиях из db
+        retention_service = DataRetentionService(db_session, database=db)
 
         result = await retention_service.cleanup_company_data(
             company_id=company_id,
@@ -404,3 +481,28 @@ async def estimate_cleanup(
         )
 
         return estimate
+
+
+@router.post("/maintenance/partitions")
+async def maintain_partitions(
+    months_ahead: int = Query(3, ge=1, le=12, description="Создать партиции на N месяцев вперед"),
+    _: str = Depends(verify_api_key),
+):
+    """
+    Обслуживание месячных партиций таблицы messages
+
+    Предназначено для вызова по расписанию (cron). Идемпотентно:
+    - создает партиции на текущий и months_ahead следующих месяцев
+    - удаляет партиции старше самого длинного срока хранения
+    """
+    async with db.session() as db_session:
+        retention_service = DataRetentionService(db_session)
+
+        result = await retention_service.maintain_message_partitions(months_ahead)
+
+        logger.info(
+            "message_partitions_maintained",
+            dropped=result["dropped"]
+        )
+
+        return result
@@ -2,24 +2,133 @@
 Telegram Webhook Router (Multi-tenant)
 """
 
+import asyncio
+from typing import Any, Dict
+
 from fastapi import APIRouter, Request, HTTPException
 import structlog
 import uuid
 import httpx
 
 from shared.models.message import Message, MessageType, Channel
-from shared.database.connection import Database
 from shared.services.company_service import CompanyService
 from ...config import settings
+from ...core.database import db
 
 router = APIRouter()
 logger = structlog.get_logger(__name__)
 
-# Database connection
-db = Database(settings.postgres_url)
-
 # HTTP client for AI Agent
-ai_agent_client = httpx.AsyncClient(base_url=settings.ai_agent_url, timeout=30.0)
+# Keep-alive пул: каждое сообщение - запрос к AI Agent, без переустановки соединений
+ai_agent_client = httpx.AsyncClient(
+    base_url=settings.ai_agent_url,
+    timeout=httpx.Timeout(30.0, connect=5.0),
+    limits=httpx.Limits(
+        max_keepalive_connections=50,
+        max_connections=200,
+        keepalive_expiry=75.0,
+    ),
+)
+
+PROCESSING_ERROR_TEXT = "Извините, произошла ошибка при обработке сообщения."
+
+
+# Максимум обновлений в одном пакетном запросе
+MAX_BATCH_SIZE = 100
+
+
+async def _resolve_company_id(webhook_token: str) -> str:
+    """
+    MULTI-TENANT: Определить company_id по webhook токену
+
+    Raises:
+        HTTPException: 404 - канал не найден, 403 - канал отключен
+    """
+    async with db.session() as db_session:
+        company_service = CompanyService(db_session)
+        channel = await company_service.get_channel_by_token(webhook_token)
+
+    if not channel:
+        logger.warning("channel_not_found", webhook_token=webhook_token)
+        raise HTTPException(status_code=404, detail="Channel not found")
+
+    if not channel.is_active:
+        logger.warning("channel_inactive", webhook_token=webhook_token)
+        raise HTTPException(status_code=403, detail="Channel is inactive")
+
+    return str(channel.company_id)
+
+
+async def _process_update(company_id: str, update: Dict[str, Any]) -> Dict[str, Any]:
+    """Преобразовать Telegram update в Message и передать в AI Agent"""
+    # 2. Извлекаем сообщение из Telegram update
+    if "message" not in update:
+        logger.debug("no_message_in_update", update_id=update.get("update_id"))
+        return {"ok": True}
+
+    tg_message = update["message"]
+    tg_user = tg_message.get("from", {})
+    tg_user_id = str(tg_user.get("id"))
+
+    # 3. MULTI-TENANT: Создаем Message с company_id
+    message = Message(
+        id=str(uuid.uuid4()),
+        session_id=f"tg_{tg_user_id}",
+        channel=Channel.TELEGRAM,
+        type=MessageType.TEXT,
+        text=tg_message.get("text", ""),
+        from_user_id=tg_user_id,
+        from_user_name=tg_user.get("first_name"),
+        company_id=company_id,  # MULTI-TENANT!
+        metadata={
+            "telegram_chat_id": tg_message.get("chat", {}).get("id"),
+            "telegram_message_id": tg_message.get("message_id")
+        }
+    )
+
+    logger.info(
+        "telegram_message_created",
+        message_id=message.id,
+        company_id=company_id,
+        user_id=tg_user_id
+    )
+
+    # 4. Передать в AI Agent
+    try:
+        response = await ai_agent_client.post(
+            "/process",
+            json=message.model_dump(mode='json')
+        )
+        response.raise_for_status()
+        result = response.json()
+
+        logger.info(
+            "ai_agent_response_received",
+            message_id=message.id,
+            has_function_call=result.get("function_called", False),
+            response_text=result.get("text", "")[:100] if result.get("text") else None
+        )
+
+        # Возвращаем ответ от AI агента (для Telegram bot)
+        return {
+            "ok": True,
+            "response": result.get("text") or "Обрабатываю ваш запрос...",
+            "function_called": result.get("function_called", False),
+            "message_id": message.id
+        }
+
+    except httpx.HTTPError as e:
+        logger.error(
+            "ai_agent_request_error",
+            message_id=message.id,
+            error=str(e)
+        )
+        # Возвращаем ошибку
+        return {
+            "ok": False,
+            "response": PROCESSING_ERROR_TEXT,
+            "error": str(e)
+        }
 
 
 @router.post("/webhook/{webhook_token}")
@@ -40,88 +149,9 @@ async def telegram_webhook(webhook_token: str, request: Request):
         )
 
         # 1. MULTI-TENANT: Определяем company_id по webhook токену
-        async with db.session() as db_session:
-            company_service = CompanyService(db_session)
-            channel = await company_service.get_channel_by_token(webhook_token)
-
-            if not channel:
-                logger.warning("channel_not_found", webhook_token=webhook_token)
-                raise HTTPException(status_code=404, detail="Channel not found")
-
-            if not channel.is_active:
-                logger.warning("channel_inactive", webhook_token=webhook_token)
-                raise HTTPException(status_code=403, detail="Channel is inactive")
-
-            company_id = str(channel.company_id)
-
-            # 2. Извлекаем сообщение из Telegram update
-            if "message" not in update:
-                logger.debug("no_message_in_update", update_id=update.get("update_id"))
-                return {"ok": True}
-
-            tg_message = update["message"]
-            tg_user = tg_message.get("from", {})
-            tg_user_id = str(tg_user.get("id"))
-
-            # 3. MULTI-TENANT: Создаем Message с company_id
-            message = Message(
-                id=str(uuid.uuid4()),
-                session_id=f"tg_{tg_user_id}",
-                channel=Channel.TELEGRAM,
-                type=MessageType.TEXT,
-                text=tg_message.get("text", ""),
-                from_user_id=tg_user_id,
-                from_user_name=tg_user.get("first_name"),
-                company_id=company_id,  # MULTI-TENANT!
-                metadata={
-                    "telegram_chat_id": tg_message.get("chat", {}).get("id"),
-                    "telegram_message_id": tg_message.get("message_id")
-                }
-            )
-
-            logger.info(
-                "telegram_message_created",
-                message_id=message.id,
-                company_id=company_id,
-                user_id=tg_user_id
-            )
+        company_id = await _resolve_company_id(webhook_token)
 
-            # 4. Передать в AI Agent
-            try:
-                response = await ai_agent_client.post(
-                    "/process",
-                    json=message.model_dump(mode='json')
-                )
-                response.raise_for_status()
-                result = response.json()
-
-                logger.info(
-                    "ai_agent_response_received",
-                    message_id=message.id,
-                    has_function_call=result.get("function_called", False),
-                    response_text=result.get("text", "")[:100] if result.get("text") else None
-                )
-
-                # Возвращаем ответ от AI агента (для Telegram bot)
-                return {
-                    "ok": True,
-                    "response": result.get("text") or "Обрабатываю ваш запрос...",
-                    "function_called": result.get("function_called", False),
-                    "message_id": message.id
-                }
-
-            except httpx.HTTPError as e:
-                logger.error(
-                    "ai_agent_request_error",
-                    message_id=message.id,
-                    error=str(e)
-                )
-                # Возвращаем ошибку
-                return {
-                    "ok": False,
-                    "response": "Извините, произошла ошибка при обработке сообщения.",
-                    "error": str(e)
-                }
+        return await _process_update(company_id, update)
 
     except HTTPException:
         raise
@@ -130,6 +160,61 @@ async def telegram_webhook(webhook_token: str, request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/webhook/{webhook_token}/batch")
+async def telegram_webhook_batch(webhook_token: str, request: Request):
+    """
+    Пакетный webhook (Multi-tenant)
+
+    Принимает массив Telegram updates одного канала (используется
+    telegram_bot для объединения сообщений, пришедших одновременно).
+    Канал определяется один раз, updates обрабатываются параллельно.
+
+    Returns:
+        Массив ответов в порядке updates (формат как у /webhook/{webhook_token})
+    """
+    try:
+        updates = await request.json()
+
+        if not isinstance(updates, list):
+            raise HTTPException(status_code=422, detail="Expected a list of updates")
+        if len(updates) > MAX_BATCH_SIZE:
+            raise HTTPException(status_code=413, detail=f"Batch size exceeds {MAX_BATCH_SIZE}")
+
+        logger.info(
+            "telegram_update_batch_received",
+            count=len(updates),
+            webhook_token=webhook_token
+        )
+
+        # 1. MULTI-TENANT: Определяем company_id по webhook токену
+        company_id = await _resolve_company_id(webhook_token)
+
+        results = await asyncio.gather(
+            *(_process_update(company_id, update) for update in updates),
+            return_exceptions=True,
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("telegram_webhook_batch_error", error=str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    responses = []
+    for index, result in enumerate(results):
+        if isinstance(result, Exception):
+            # Ошибка одного update не должна ронять весь пакет
+            logger.error(
+                "telegram_webhook_batch_item_error",
+                index=index,
+                error=str(result)
+            )
+            result = {"ok": False, "response": PROCESSING_ERROR_TEXT, "error": str(result)}
+        responses.append(result)
+
+    return responses
+
+
 @router.get("/webhook")
 async def telegram_webhook_info():
     """Информация о webhook"""
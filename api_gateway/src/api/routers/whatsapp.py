@@ -7,16 +7,12 @@ import structlog
 import uuid
 
 from shared.models.message import Message, MessageType, Channel
-from shared.database.connection import Database
 from shared.services.company_service import CompanyService
-from ...config import settings
+from ...core.database import db
 
 router = APIRouter()
 logger = structlog.get_logger(__name__)
 
-# Database connection
-db = Database(settings.postgres_url)
-
 
 @router.get("/webhook/{webhook_token}")
 async def whatsapp_webhook_verify(
@@ -46,6 +46,8 @@ class Settings(BaseSettings):
     postgres_db: str = Field(default="ai_admin")
     postgres_user: str = Field(default="ai_admin")
     postgres_password: str = Field(..., description="PostgreSQL password")
+    postgres_pool_size: int = Field(default=20, description="Connection pool size")
+    postgres_max_overflow: int = Field(default=10, description="Extra connections above pool size")
     
     # Gemini
     gemini_api_key: str = Field(..., description="Gemini API Key")
@@ -0,0 +1,36 @@
+"""
+Redis cache for API Gateway
+
+Один клиент Redis на процесс для кэширования ответов роутеров.
+Кэш необязателен: при недоступности Redis роутеры работают без него.
+"""
+
+from typing import Optional
+import redis.asyncio as redis
+
+from ..config import settings
+
+_redis: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Get or create Redis client"""
+    global _redis
+
+    if _redis is None:
+        _redis = redis.from_url(
+            settings.redis_url,
+            encoding="utf-8",
+            decode_responses=True
+        )
+
+    return _redis
+
+
+async def close_redis() -> None:
+    """Close Redis client"""
+    global _redis
+
+    if _redis is not None:
+        await _redis.close()
+        _redis = None
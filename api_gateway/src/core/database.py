@@ -0,0 +1,16 @@
+"""
+Database access for API Gateway
+
+Один engine и один пул соединений PostgreSQL на процесс,
+общий для всех роутеров.
+"""
+
+from shared.database.connection import get_database
+from ..config import settings
+
+db = get_database(
+    settings.postgres_url,
+    pool_size=settings.postgres_pool_size,
+    max_overflow=settings.postgres_max_overflow,
+)
+
@@ -15,6 +15,8 @@ import logging
 import structlog
 
 from .config import settings
+from .core.database import db
+from .core.cache import close_redis
 from .api.routers import message, health, telegram, whatsapp, history
 from .middleware.rate_limit import RateLimitMiddleware
 
@@ -79,11 +81,20 @@ async def startup_event():
         port=settings.api_port
     )
 
+    # Прогреваем пул соединений PostgreSQL
+    try:
+        await db.warmup()
+        logger.info("postgres_pool_warmed_up", pool_size=db.pool_size)
+    except Exception as e:
+        logger.warning("postgres_pool_warmup_failed", error=str(e))
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Событие при остановке приложения"""
     logger.info("api_gateway_shutting_down")
+    await db.close()
+    await close_redis()
 
 
 @app.get("/")
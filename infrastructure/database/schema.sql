@@ -165,10 +165,17 @@ CREATE INDEX idx_sessions_company ON sessions(company_id);
 CREATE INDEX idx_sessions_user ON sessions(company_id, user_id, channel);
 CREATE INDEX idx_sessions_last_activity ON sessions(last_activity_at);
 CREATE INDEX idx_sessions_expires_at ON sessions(expires_at);
+-- Keyset-пагинация истории: WHERE company_id = ? AND (last_activity_at, id) < cursor
+CREATE INDEX idx_sessions_company_activity_id ON sessions(company_id, last_activity_at DESC, id DESC);
+-- Последние сессии пользователя: top-N прямо из индекса
+CREATE INDEX idx_sessions_user_activity ON sessions(company_id, user_id, last_activity_at DESC);
+-- Index-only аналитика и конверсия за период
+CREATE INDEX idx_sessions_company_created_covering ON sessions(company_id, created_at) INCLUDE (state, channel, crm_appointment_id);
 
 -- Messages (история сообщений)
+-- Партиционирована по месяцам: удаление старых данных = DROP партиции
 CREATE TABLE messages (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     session_id UUID NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
     company_id UUID NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
     
@@ -189,12 +196,103 @@ CREATE TABLE messages (
     
     -- Extra data
     message_metadata JSONB DEFAULT '{}',
-    created_at TIMESTAMP DEFAULT NOW()
-);
+    created_at TIMESTAMP NOT NULL DEFAULT timezone('utc', now()),  -- UTC
+
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE messages_default PARTITION OF messages DEFAULT;
+
+-- Создание месячной партиции messages_YYYY_MM
+-- Строки этого месяца, уже попавшие в messages_default, переносятся в новую партицию
+CREATE OR REPLACE FUNCTION create_messages_partition(p_month DATE)
+RETURNS TEXT AS $$
+DECLARE
+    v_start DATE := date_trunc('month', p_month)::DATE;
+    v_end DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::DATE;
+    v_name TEXT := 'messages_' || to_char(v_start, 'YYYY_MM');
+BEGIN
+    IF to_regclass(v_name) IS NOT NULL THEN
+        RETURN v_name;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE messages INCLUDING DEFAULTS)', v_name);
+    EXECUTE format(
+        'WITH moved AS ('
+        '    DELETE FROM messages_default WHERE created_at >= %L AND created_at < %L RETURNING *'
+        ') INSERT INTO %I SELECT * FROM moved',
+        v_start, v_end, v_name
+    );
+    EXECUTE format(
+        'ALTER TABLE messages ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        v_name, v_start, v_end
+    );
+    RETURN v_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Текущий месяц + 3 месяца вперед
+SELECT create_messages_partition((date_trunc('month', NOW()) + make_interval(months => m))::DATE)
+FROM generate_series(0, 3) AS m;
 
 CREATE INDEX idx_messages_session ON messages(session_id);
 CREATE INDEX idx_messages_company ON messages(company_id);
-CREATE INDEX idx_messages_created ON messages(created_at DESC);
+CREATE INDEX idx_messages_created_brin ON messages USING brin (created_at);  -- append-only: BRIN вместо btree
+-- Keyset-пагинация истории: WHERE company_id = ? AND (created_at, id) < cursor
+CREATE INDEX idx_messages_company_created_id ON messages(company_id, created_at DESC, id DESC);
+CREATE INDEX idx_messages_company_channel_created_id ON messages(company_id, channel, created_at DESC, id DESC);
+-- Index-only подсчеты за период (в т.ч. по каналам)
+CREATE INDEX idx_messages_company_created_covering ON messages(company_id, created_at) INCLUDE (channel);
+
+-- Количество сообщений по дням (сводка для аналитики)
+-- Поддерживается statement-триггерами на INSERT/DELETE в messages
+CREATE TABLE messages_daily_count (
+    company_id UUID NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    channel VARCHAR(50) NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (company_id, day, channel)
+);
+
+CREATE OR REPLACE FUNCTION messages_daily_count_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO messages_daily_count AS d (company_id, day, channel, count)
+    SELECT company_id, created_at::DATE, channel, COUNT(*)
+    FROM new_rows
+    GROUP BY 1, 2, 3
+    ON CONFLICT (company_id, day, channel)
+    DO UPDATE SET count = d.count + EXCLUDED.count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION messages_daily_count_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE messages_daily_count AS d
+    SET count = d.count - o.count
+    FROM (
+        SELECT company_id, created_at::DATE AS day, channel, COUNT(*) AS count
+        FROM old_rows
+        GROUP BY 1, 2, 3
+    ) AS o
+    WHERE d.company_id = o.company_id
+      AND d.day = o.day
+      AND d.channel = o.channel;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER messages_daily_count_insert
+    AFTER INSERT ON messages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION messages_daily_count_insert();
+
+CREATE TRIGGER messages_daily_count_delete
+    AFTER DELETE ON messages
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION messages_daily_count_delete();
 
 -- Function Calls Log (для аналитики)
 CREATE TABLE function_calls_log (
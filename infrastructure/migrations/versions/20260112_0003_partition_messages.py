@@ -0,0 +1,163 @@
+"""Partition messages by created_at (monthly)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-01-12
+
+Converts messages into a RANGE-partitioned table:
+- One partition per month: messages_YYYY_MM
+- messages_default catches rows outside of existing partitions
+- create_messages_partition(date) creates a month partition on demand
+
+Retention of whole months becomes DROP TABLE of a partition instead of
+a row-by-row DELETE, and every created_at filter gets partition pruning.
+
+Sessions are not partitioned: messages.session_id references sessions.id,
+and a partitioned sessions table would need created_at in its primary key.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Сколько месяцев вперед создавать партиции при миграции
+MONTHS_AHEAD = 3
+
+MESSAGES_INDEXES = [
+    ('idx_messages_session', ['session_id']),
+    ('idx_messages_company_id', ['company_id']),
+    ('idx_messages_created_at', ['created_at']),
+    ('idx_messages_company_created', ['company_id', 'created_at']),
+    ('idx_messages_session_created', ['session_id', 'created_at']),
+    ('idx_messages_is_from_bot', ['is_from_bot']),
+]
+
+
+# Явный список колонок: копирование не зависит от их порядка в таблицах
+MESSAGES_COLUMNS = (
+    'id, session_id, company_id, channel, message_type, text, audio_url, '
+    'image_url, file_url, is_from_bot, from_user_id, from_user_name, '
+    'message_metadata'
+)
+
+
+def _create_messages_indexes() -> None:
+    for name, columns in MESSAGES_INDEXES:
+        op.create_index(name, 'messages', columns)
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE messages RENAME TO messages_legacy")
+    op.execute("ALTER TABLE messages_legacy RENAME CONSTRAINT messages_pkey TO messages_legacy_pkey")
+    for name, _ in MESSAGES_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+    # Первичный ключ партиционированной таблицы обязан включать ключ партиционирования
+    op.execute("""
+        CREATE TABLE messages (
+            LIKE messages_legacy INCLUDING DEFAULTS,
+            CONSTRAINT messages_pkey PRIMARY KEY (id, created_at),
+            CONSTRAINT messages_session_id_fkey FOREIGN KEY (session_id)
+                REFERENCES sessions(id) ON DELETE CASCADE,
+            CONSTRAINT messages_company_id_fkey FOREIGN KEY (company_id)
+                REFERENCES companies(id) ON DELETE CASCADE
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER TABLE messages ALTER COLUMN created_at SET NOT NULL")
+    op.execute("ALTER TABLE messages ALTER COLUMN created_at SET DEFAULT NOW()")
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION create_messages_partition(p_month DATE)
+        RETURNS TEXT AS $$
+        DECLARE
+            v_start DATE := date_trunc('month', p_month)::DATE;
+            v_end DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::DATE;
+            v_name TEXT := 'messages_' || to_char(v_start, 'YYYY_MM');
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+                v_name, v_start, v_end
+            );
+            RETURN v_name;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    op.execute(f"""
+        DO $$
+        DECLARE
+            v_month DATE;
+        BEGIN
+            SELECT COALESCE(date_trunc('month', MIN(created_at)), date_trunc('month', NOW()))::DATE
+            INTO v_month
+            FROM messages_legacy;
+
+            WHILE v_month <= (date_trunc('month', NOW()) + INTERVAL '{MONTHS_AHEAD} months')::DATE LOOP
+                PERFORM create_messages_partition(v_month);
+                v_month := (v_month + INTERVAL '1 month')::DATE;
+            END LOOP;
+        END;
+        $$
+    """)
+    op.execute("CREATE TABLE messages_default PARTITION OF messages DEFAULT")
+
+    # created_at в исходной схеме nullable: такие сообщения не теряются,
+    # а получают время миграции (UTC, как default модели)
+    op.execute(f"""
+        INSERT INTO messages ({MESSAGES_COLUMNS}, created_at)
+        SELECT {MESSAGES_COLUMNS}, COALESCE(created_at, timezone('utc', now()))
+        FROM messages_legacy
+    """)
+
+    # Старая таблица удаляется только если скопированы все строки
+    op.execute("""
+        DO $$
+        DECLARE
+            v_legacy BIGINT;
+            v_copied BIGINT;
+        BEGIN
+            SELECT COUNT(*) INTO v_legacy FROM messages_legacy;
+            SELECT COUNT(*) INTO v_copied FROM messages;
+            IF v_legacy <> v_copied THEN
+                RAISE EXCEPTION 'messages copy mismatch: % legacy rows, % copied', v_legacy, v_copied;
+            END IF;
+        END;
+        $$
+    """)
+    op.execute("DROP TABLE messages_legacy")
+
+    _create_messages_indexes()
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE messages RENAME TO messages_partitioned")
+    op.execute("ALTER TABLE messages_partitioned RENAME CONSTRAINT messages_pkey TO messages_partitioned_pkey")
+    for name, _ in MESSAGES_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+    op.execute("""
+        CREATE TABLE messages (
+            LIKE messages_partitioned INCLUDING DEFAULTS,
+            CONSTRAINT messages_pkey PRIMARY KEY (id),
+            CONSTRAINT messages_session_id_fkey FOREIGN KEY (session_id)
+                REFERENCES sessions(id) ON DELETE CASCADE,
+            CONSTRAINT messages_company_id_fkey FOREIGN KEY (company_id)
+                REFERENCES companies(id) ON DELETE CASCADE
+        )
+    """)
+    op.execute("ALTER TABLE messages ALTER COLUMN created_at DROP NOT NULL")
+    op.execute(f"""
+        INSERT INTO messages ({MESSAGES_COLUMNS}, created_at)
+        SELECT {MESSAGES_COLUMNS}, created_at FROM messages_partitioned
+    """)
+    op.execute("DROP TABLE messages_partitioned CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS create_messages_partition(DATE)")
+
+    _create_messages_indexes()
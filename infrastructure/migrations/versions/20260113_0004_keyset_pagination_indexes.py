@@ -0,0 +1,46 @@
+"""Add keyset pagination indexes for history
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-01-13
+
+History endpoints paginate with a (timestamp, id) cursor instead of OFFSET.
+Both queries read "company rows older than the cursor, newest first",
+which these indexes serve as a single backward-ordered index range scan:
+- messages: (company_id, created_at DESC, id DESC)
+- sessions: (company_id, last_activity_at DESC, id DESC)
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset-пагинация сообщений компании (created_at, id) DESC
+    op.create_index(
+        'idx_messages_company_created_id',
+        'messages',
+        ['company_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        postgresql_concurrently=False
+    )
+
+    # Keyset-пагинация сессий компании (last_activity_at, id) DESC
+    op.create_index(
+        'idx_sessions_company_activity_id',
+        'sessions',
+        ['company_id', sa.text('last_activity_at DESC'), sa.text('id DESC')],
+        postgresql_concurrently=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_messages_company_created_id')
+    op.drop_index('idx_sessions_company_activity_id')
@@ -0,0 +1,101 @@
+"""Add messages_daily_count summary table
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-01-14
+
+Daily message counts per (company_id, day, channel), maintained by
+statement-level triggers on messages:
+- AFTER INSERT adds the counts of the inserted rows (COPY included)
+- AFTER DELETE subtracts the counts of the deleted rows
+
+Dashboards read O(days) rows from this table instead of grouping
+O(messages) rows. Partitions dropped by retention are removed from the
+summary by MessageRepository.drop_expired_partitions.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'messages_daily_count',
+        sa.Column('company_id', postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey('companies.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('day', sa.Date, nullable=False),
+        sa.Column('channel', sa.String(50), nullable=False),
+        sa.Column('count', sa.BigInteger, nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('company_id', 'day', 'channel'),
+    )
+
+    # Statement-level: одна агрегация на INSERT/COPY, а не UPDATE на каждую строку
+    op.execute("""
+        CREATE OR REPLACE FUNCTION messages_daily_count_insert()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO messages_daily_count AS d (company_id, day, channel, count)
+            SELECT company_id, created_at::DATE, channel, COUNT(*)
+            FROM new_rows
+            GROUP BY 1, 2, 3
+            ON CONFLICT (company_id, day, channel)
+            DO UPDATE SET count = d.count + EXCLUDED.count;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION messages_daily_count_delete()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            UPDATE messages_daily_count AS d
+            SET count = d.count - o.count
+            FROM (
+                SELECT company_id, created_at::DATE AS day, channel, COUNT(*) AS count
+                FROM old_rows
+                GROUP BY 1, 2, 3
+            ) AS o
+            WHERE d.company_id = o.company_id
+              AND d.day = o.day
+              AND d.channel = o.channel;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER messages_daily_count_insert
+        AFTER INSERT ON messages
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION messages_daily_count_insert()
+    """)
+    op.execute("""
+        CREATE TRIGGER messages_daily_count_delete
+        AFTER DELETE ON messages
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION messages_daily_count_delete()
+    """)
+
+    # Заполнение по существующим сообщениям
+    op.execute("""
+        INSERT INTO messages_daily_count (company_id, day, channel, count)
+        SELECT company_id, created_at::DATE, channel, COUNT(*)
+        FROM messages
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS messages_daily_count_delete ON messages")
+    op.execute("DROP TRIGGER IF EXISTS messages_daily_count_insert ON messages")
+    op.execute("DROP FUNCTION IF EXISTS messages_daily_count_delete()")
+    op.execute("DROP FUNCTION IF EXISTS messages_daily_count_insert()")
+    op.drop_table('messages_daily_count')
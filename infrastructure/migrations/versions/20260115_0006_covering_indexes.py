@@ -0,0 +1,81 @@
+"""Add covering indexes for analytics and filtered history
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-01-15
+
+Index-only scans for the hot analytics queries:
+- messages (company_id, created_at) INCLUDE (channel) replaces
+  idx_messages_company_created: count_messages and count_by_channel
+  over a period no longer touch the heap
+- sessions (company_id, created_at) INCLUDE (state, channel,
+  crm_appointment_id): count_sessions, count_by_state, count_by_channel
+  and get_conversion_stats over a period
+
+Keyset pagination with a channel filter:
+- messages (company_id, channel, created_at DESC, id DESC)
+
+CONCURRENTLY is not used: PostgreSQL does not support it for
+partitioned tables (messages).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ========================================
+    # MESSAGES INDEXES
+    # ========================================
+
+    # Покрывающий индекс для подсчетов за период (в т.ч. по каналам)
+    op.create_index(
+        'idx_messages_company_created_covering',
+        'messages',
+        ['company_id', 'created_at'],
+        postgresql_include=['channel'],
+        postgresql_concurrently=False
+    )
+    op.drop_index('idx_messages_company_created')
+
+    # Keyset-пагинация сообщений с фильтром по каналу
+    op.create_index(
+        'idx_messages_company_channel_created_id',
+        'messages',
+        ['company_id', 'channel', sa.text('created_at DESC'), sa.text('id DESC')],
+        postgresql_concurrently=False
+    )
+
+    # ========================================
+    # SESSIONS INDEXES
+    # ========================================
+
+    # Покрывающий индекс для аналитики сессий и конверсии за период
+    op.create_index(
+        'idx_sessions_company_created_covering',
+        'sessions',
+        ['company_id', 'created_at'],
+        postgresql_include=['state', 'channel', 'crm_appointment_id'],
+        postgresql_concurrently=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_sessions_company_created_covering')
+    op.drop_index('idx_messages_company_channel_created_id')
+
+    op.create_index(
+        'idx_messages_company_created',
+        'messages',
+        ['company_id', 'created_at'],
+        postgresql_concurrently=False
+    )
+    op.drop_index('idx_messages_company_created_covering')
@@ -0,0 +1,73 @@
+"""Let create_messages_partition absorb rows from messages_default
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-01-16
+
+CREATE TABLE ... PARTITION OF fails when messages_default already holds
+rows for the new month. The function now creates the month table
+standalone, moves the matching rows out of messages_default and attaches
+it, so the monthly maintenance job can always create partitions ahead.
+
+Rows move partition-to-partition, so the statement triggers on messages
+(messages_daily_count) do not fire and the summary stays correct.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION create_messages_partition(p_month DATE)
+        RETURNS TEXT AS $$
+        DECLARE
+            v_start DATE := date_trunc('month', p_month)::DATE;
+            v_end DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::DATE;
+            v_name TEXT := 'messages_' || to_char(v_start, 'YYYY_MM');
+        BEGIN
+            IF to_regclass(v_name) IS NOT NULL THEN
+                RETURN v_name;
+            END IF;
+
+            EXECUTE format('CREATE TABLE %I (LIKE messages INCLUDING DEFAULTS)', v_name);
+            EXECUTE format(
+                'WITH moved AS ('
+                '    DELETE FROM messages_default WHERE created_at >= %L AND created_at < %L RETURNING *'
+                ') INSERT INTO %I SELECT * FROM moved',
+                v_start, v_end, v_name
+            );
+            EXECUTE format(
+                'ALTER TABLE messages ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                v_name, v_start, v_end
+            );
+            RETURN v_name;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION create_messages_partition(p_month DATE)
+        RETURNS TEXT AS $$
+        DECLARE
+            v_start DATE := date_trunc('month', p_month)::DATE;
+            v_end DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::DATE;
+            v_name TEXT := 'messages_' || to_char(v_start, 'YYYY_MM');
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+                v_name, v_start, v_end
+            );
+            RETURN v_name;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
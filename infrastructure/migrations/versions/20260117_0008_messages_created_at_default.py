@@ -0,0 +1,32 @@
+"""Fill messages.created_at in UTC on the database side
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-01-17
+
+messages.created_at is a timestamp without time zone holding UTC.
+The previous DEFAULT NOW() converted to the session TimeZone; the
+application now omits created_at on insert and relies on the default,
+so it must be UTC regardless of server settings.
+
+The column type stays timestamp: created_at is the partition key and
+its type cannot be altered.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE messages ALTER COLUMN created_at SET DEFAULT timezone('utc', now())")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE messages ALTER COLUMN created_at SET DEFAULT NOW()")
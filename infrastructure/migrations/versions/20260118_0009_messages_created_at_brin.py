@@ -0,0 +1,39 @@
+"""Replace the messages created_at btree with a BRIN index
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-01-18
+
+Messages are append-only and created_at grows with the physical row
+order, so a BRIN index (one summary per block range) serves time-range
+scans at a fraction of the btree size and insert cost.
+
+Per-company period queries use the composite (company_id, created_at)
+indexes, and daily counts come from messages_daily_count, so the
+standalone created_at index is only needed for company-wide time ranges.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'idx_messages_created_at_brin',
+        'messages',
+        ['created_at'],
+        postgresql_using='brin',
+    )
+    op.drop_index('idx_messages_created_at')
+
+
+def downgrade() -> None:
+    op.create_index('idx_messages_created_at', 'messages', ['created_at'])
+    op.drop_index('idx_messages_created_at_brin')
@@ -0,0 +1,40 @@
+"""Index user sessions by last activity
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-01-19
+
+get_user_sessions / get_latest_user_session read "sessions of a user,
+most recently active first, LIMIT N". (company_id, user_id,
+last_activity_at DESC) returns the top N straight from the index
+instead of sorting every session of the user.
+
+idx_sessions_company_user (company_id, user_id) is a prefix of the new
+index and is dropped.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'idx_sessions_user_activity',
+        'sessions',
+        ['company_id', 'user_id', sa.text('last_activity_at DESC')],
+        postgresql_concurrently=False
+    )
+    op.drop_index('idx_sessions_company_user')
+
+
+def downgrade() -> None:
+    op.create_index('idx_sessions_company_user', 'sessions', ['company_id', 'user_id'])
+    op.drop_index('idx_sessions_user_activity')
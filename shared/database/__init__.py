@@ -9,6 +9,7 @@ from .models import (
     CompanyChannel,
     Session,
     Message,
+    MessageDailyCount,
 )
 
 __all__ = [
@@ -18,4 +19,5 @@ __all__ = [
     "CompanyChannel",
     "Session",
     "Message",
+    "MessageDailyCount",
 ]
@@ -4,15 +4,41 @@ SQLAlchemy models для multi-tenant архитектуры
 
 from datetime import datetime, timezone
 from typing import Optional
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, Text, ForeignKey, DECIMAL
+from sqlalchemy import Column, String, Boolean, DateTime, Date, Integer, BigInteger, Text, ForeignKey, DECIMAL, func
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy.types import TypeDecorator
 import uuid
 
+_UTC = timezone.utc
+
 
 def utcnow():
     """Helper function for SQLAlchemy default"""
-    return datetime.now(timezone.utc)
+    return datetime.now(_UTC)
+
+
+class UTCDateTime(TypeDecorator):
+    """
+    timestamp without time zone, в котором хранится UTC
+
+    Колонки в БД naive, а код работает с aware datetime: asyncpg отказывается
+    передавать aware значение в timestamp-параметр. Тип приводит параметры
+    к naive UTC на входе и возвращает aware UTC на выходе.
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(_UTC).replace(tzinfo=None)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=_UTC)
+        return value
+
 
 Base = declarative_base()
 
@@ -29,11 +55,11 @@ class Company(Base):
     # Subscription
     subscription_plan = Column(String(50), default="free")
     subscription_status = Column(String(50), default="active")
-    subscription_expires_at = Column(DateTime)
+    subscription_expires_at = Column(UTCDateTime)
     
     # Metadata
-    created_at = Column(DateTime, default=utcnow)
-    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+    created_at = Column(UTCDateTime, default=utcnow)
+    updated_at = Column(UTCDateTime, default=utcnow, onupdate=utcnow)
     is_active = Column(Boolean, default=True)
     
     billing_email = Column(String(255))
@@ -62,13 +88,13 @@ class CompanyCRMSettings(Base):
     
     # Status
     is_active = Column(Boolean, default=True)
-    last_sync_at = Column(DateTime)
+    last_sync_at = Column(UTCDateTime)
     last_sync_status = Column(String(50))
     last_sync_error = Column(Text)
     
     # Metadata
-    created_at = Column(DateTime, default=utcnow)
-    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+    created_at = Column(UTCDateTime, default=utcnow)
+    updated_at = Column(UTCDateTime, default=utcnow, onupdate=utcnow)
     
     # Relationships
     company = relationship("Company", back_populates="crm_settings")
@@ -111,8 +137,8 @@ class CompanyAgentSettings(Base):
     features = Column(JSONB, default={"auto_booking": True, "consultation": True, "reminders": True})
     
     # Metadata
-    created_at = Column(DateTime, default=utcnow)
-    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+    created_at = Column(UTCDateTime, default=utcnow)
+    updated_at = Column(UTCDateTime, default=utcnow, onupdate=utcnow)
     
     # Relationships
     company = relationship("Company", back_populates="agent_settings")
@@ -142,11 +168,11 @@ class CompanyChannel(Base):
     # Statistics
     messages_received = Column(Integer, default=0)
     messages_sent = Column(Integer, default=0)
-    last_activity_at = Column(DateTime)
+    last_activity_at = Column(UTCDateTime)
     
     # Metadata
-    created_at = Column(DateTime, default=utcnow)
-    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+    created_at = Column(UTCDateTime, default=utcnow)
+    updated_at = Column(UTCDateTime, default=utcnow, onupdate=utcnow)
     
     # Relationships
     company = relationship("Company", back_populates="channels")
@@ -172,10 +198,10 @@ class Session(Base):
     crm_appointment_id = Column(String(255))
     
     # Timestamps
-    created_at = Column(DateTime, default=utcnow)
-    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
-    last_activity_at = Column(DateTime, default=utcnow)
-    expires_at = Column(DateTime)
+    created_at = Column(UTCDateTime, default=utcnow)
+    updated_at = Column(UTCDateTime, default=utcnow, onupdate=utcnow)
+    last_activity_at = Column(UTCDateTime, default=utcnow)
+    expires_at = Column(UTCDateTime)
     
     # Relationships
     company = relationship("Company", back_populates="sessions")
@@ -183,8 +209,14 @@ class Session(Base):
 
 
 class Message(Base):
-    """Сообщение"""
+    """
+    Сообщение
+
+    Таблица партиционирована по месяцам (RANGE по created_at),
+    поэтому created_at входит в первичный ключ.
+    """
     __tablename__ = "messages"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     session_id = Column(UUID(as_uuid=True), ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False)
@@ -207,7 +239,26 @@ class Message(Base):
     
     # Extra data
     message_metadata = Column(JSONB, default={})
-    created_at = Column(DateTime, default=utcnow)
+    # Заполняется в БД (DEFAULT), значение возвращается через RETURNING
+    created_at = Column(
+        UTCDateTime,
+        server_default=func.timezone("utc", func.now()),
+        primary_key=True,
+    )
     
     # Relationships
     session = relationship("Session", back_populates="messages")
+
+
+class MessageDailyCount(Base):
+    """
+    Количество сообщений за день по каналу
+
+    Заполняется триггерами на INSERT/DELETE в messages - из кода не пишется.
+    """
+    __tablename__ = "messages_daily_count"
+
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    channel = Column(String(50), primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
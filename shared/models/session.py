@@ -5,7 +5,7 @@ Session models для управления состоянием диалогов
 from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class SessionState(str, Enum):
@@ -54,8 +54,8 @@ class Session(BaseModel):
     # TTL для Redis (в секундах) - например, 24 часа
     ttl: int = Field(default=86400, description="Time to live в секундах")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "id": "sess_123",
                 "user_id": "user_456",
@@ -70,3 +70,5 @@ class Session(BaseModel):
                 "crm_client_id": "crm_client_789"
             }
         }
+    )
+
@@ -5,18 +5,22 @@ Shared services
 - CompanyService: работа с компаниями и их настройками
 - MessageRepository: персистентное хранение сообщений
 - SessionRepository: персистентное хранение сессий
+- SessionStateBuffer: отложенная пакетная запись состояния сессий
 - DataRetentionService: управление политикой хранения данных
 """
 
-from .company_service import CompanyService
+from .company_service import CompanyService, invalidate_channel_cache
 from .message_repository import MessageRepository
 from .session_repository import SessionRepository
+from .session_state_buffer import SessionStateBuffer
 from .data_retention_service import DataRetentionService, RetentionPolicy
 
 __all__ = [
     "CompanyService",
+    "invalidate_channel_cache",
     "MessageRepository",
     "SessionRepository",
+    "SessionStateBuffer",
     "DataRetentionService",
     "RetentionPolicy",
 ]
@@ -2,8 +2,9 @@
 Company Service - работа с настройками компаний
 """
 
-from typing import Optional, Dict, Any
-from sqlalchemy import select
+import time
+from typing import Optional, Dict, Any, List, Tuple
+from sqlalchemy import select, lambda_stmt
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 import structlog
@@ -18,6 +19,67 @@ from ..utils.crypto import get_crypto_service, CryptoService
 
 logger = structlog.get_logger(__name__)
 
+# Кэш webhook_token -> канал (in-process, общий для всех экземпляров сервиса)
+CHANNEL_CACHE_TTL_SECONDS = 30
+CHANNEL_CACHE_MAX_SIZE = 2048
+
+_channel_cache: Dict[str, Tuple[CompanyChannel, float]] = {}
+
+
+def invalidate_channel_cache(webhook_token: Optional[str] = None) -> None:
+    """
+    Сбросить кэш каналов
+
+    Args:
+        webhook_token: Токен канала. Если None - очищается весь кэш
+    """
+    if webhook_token is None:
+        _channel_cache.clear()
+    else:
+        _channel_cache.pop(webhook_token, None)
+
+
+# Поля CompanyAgentSettings, которые попадают в контекст агента как есть
+_AGENT_CONTEXT_FIELDS = (
+    # Basic Info
+    "company_description",
+    "business_type",
+    "target_audience",
+    "working_hours",
+    "address",
+    "phone_display",
+    # Business Context
+    "business_highlights",
+    # Agent Behavior
+    "greeting_message",
+    "farewell_message",
+    "custom_instructions",
+    # AI Settings
+    "max_tokens",
+)
+
+
+def _build_company_context(company: Company) -> Dict[str, Any]:
+    """Собрать контекст AI агента из компании с загруженными agent_settings"""
+    agent_settings = company.agent_settings
+
+    if not agent_settings:
+        return {
+            "company_id": str(company.id),
+            "company_name": company.name,
+        }
+
+    temperature = agent_settings.temperature
+
+    return {
+        "company_id": str(company.id),
+        "company_name": company.name,
+        **{field: getattr(agent_settings, field) for field in _AGENT_CONTEXT_FIELDS},
+        "services_catalog": agent_settings.services_catalog or [],
+        "products_catalog": agent_settings.products_catalog or [],
+        "temperature": float(temperature) if temperature else 0.7,
+    }
+
 
 class CompanyService:
     """Сервис для работы с компаниями и их настройками"""
@@ -32,11 +94,13 @@ class CompanyService:
     async def get_company_by_id(self, company_id: str) -> Optional[Company]:
         """Получить компанию по ID"""
         result = await self.session.execute(
-            select(Company)
-            .where(Company.id == company_id)
-            .options(
-                selectinload(Company.crm_settings),
-                selectinload(Company.agent_settings),
+            lambda_stmt(
+                lambda: select(Company)
+                .where(Company.id == company_id)
+                .options(
+                    selectinload(Company.crm_settings),
+                    selectinload(Company.agent_settings),
+                )
             )
         )
         return result.scalar_one_or_none()
@@ -44,9 +108,11 @@ class CompanyService:
     async def get_crm_settings(self, company_id: str) -> Optional[CompanyCRMSettings]:
         """Получить CRM настройки компании"""
         result = await self.session.execute(
-            select(CompanyCRMSettings).where(
-                CompanyCRMSettings.company_id == company_id,
-                CompanyCRMSettings.is_active == True
+            lambda_stmt(
+                lambda: select(CompanyCRMSettings).where(
+                    CompanyCRMSettings.company_id == company_id,
+                    CompanyCRMSettings.is_active == True
+                )
             )
         )
         return result.scalar_one_or_none()
@@ -54,21 +120,46 @@ class CompanyService:
     async def get_agent_settings(self, company_id: str) -> Optional[CompanyAgentSettings]:
         """Получить настройки агента компании"""
         result = await self.session.execute(
-            select(CompanyAgentSettings).where(
-                CompanyAgentSettings.company_id == company_id
+            lambda_stmt(
+                lambda: select(CompanyAgentSettings).where(
+                    CompanyAgentSettings.company_id == company_id
+                )
             )
         )
         return result.scalar_one_or_none()
     
     async def get_channel_by_token(self, webhook_token: str) -> Optional[CompanyChannel]:
-        """Получить канал по webhook токену"""
+        """
+        Получить канал по webhook токену
+
+        Вызывается на каждый входящий webhook, поэтому найденные каналы
+        кэшируются в памяти процесса на CHANNEL_CACHE_TTL_SECONDS.
+        """
+        now = time.monotonic()
+        cached = _channel_cache.get(webhook_token)
+        if cached is not None and now - cached[1] < CHANNEL_CACHE_TTL_SECONDS:
+            return cached[0]
+
         result = await self.session.execute(
-            select(CompanyChannel).where(
-                CompanyChannel.webhook_token == webhook_token,
-                CompanyChannel.is_active == True
+            lambda_stmt(
+                lambda: select(CompanyChannel).where(
+                    CompanyChannel.webhook_token == webhook_token,
+                    CompanyChannel.is_active == True
+                )
             )
         )
-        return result.scalar_one_or_none()
+        channel = result.scalar_one_or_none()
+
+        _channel_cache.pop(webhook_token, None)
+        if channel is None:
+            return None
+
+        if len(_channel_cache) >= CHANNEL_CACHE_MAX_SIZE:
+            # Вытесняем самую старую запись
+            _channel_cache.pop(next(iter(_channel_cache)))
+        _channel_cache[webhook_token] = (channel, now)
+
+        return channel
     
     async def get_company_context(self, company_id: str) -> Dict[str, Any]:
         """Получить полный контекст компании для AI агента"""
@@ -77,40 +168,44 @@ class CompanyService:
         if not company:
             logger.error("company_not_found", company_id=company_id)
             return {}
-        
-        agent_settings = company.agent_settings
-        
-        context = {
-            "company_id": str(company.id),
-            "company_name": company.name,
+
+        return _build_company_context(company)
+
+    async def get_company_contexts(self, company_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Получить контексты нескольких компаний одним запросом
+
+        Используется при пакетной обработке сообщений вместо
+        N вызовов get_company_context.
+
+        Args:
+            company_ids: ID компаний
+
+        Returns:
+            {company_id: контекст}. Ненайденные компании отсутствуют в результате
+        """
+        unique_ids = list(dict.fromkeys(company_ids))
+        if not unique_ids:
+            return {}
+
+        result = await self.session.execute(
+            select(Company)
+            .where(Company.id.in_(unique_ids))
+            .options(selectinload(Company.agent_settings))
+        )
+
+        contexts = {
+            str(company.id): _build_company_context(company)
+            for company in result.scalars()
         }
-        
-        if agent_settings:
-            context.update({
-                # Basic Info
-                "company_description": agent_settings.company_description,
-                "business_type": agent_settings.business_type,
-                "target_audience": agent_settings.target_audience,
-                "working_hours": agent_settings.working_hours,
-                "address": agent_settings.address,
-                "phone_display": agent_settings.phone_display,
-
-                # Business Context
-                "services_catalog": agent_settings.services_catalog or [],
-                "products_catalog": agent_settings.products_catalog or [],
-                "business_highlights": agent_settings.business_highlights,
-
-                # Agent Behavior
-                "greeting_message": agent_settings.greeting_message,
-                "farewell_message": agent_settings.farewell_message,
-                "custom_instructions": agent_settings.custom_instructions,
-
-                # AI Settings
-                "temperature": float(agent_settings.temperature) if agent_settings.temperature else 0.7,
-                "max_tokens": agent_settings.max_tokens,
-            })
-
-        return context
+
+        if len(contexts) < len(unique_ids):
+            logger.error(
+                "companies_not_found",
+                company_ids=[cid for cid in unique_ids if cid not in contexts]
+            )
+
+        return contexts
     
     def decrypt_api_key(self, encrypted_key: str) -> str:
         """
@@ -133,6 +228,7 @@ class CompanyService:
                 )
                 return encrypted_key
 
+            # CryptoService кэширует расшифрованные значения (ограниченно по времени)
             return crypto.decrypt(encrypted_key)
         except Exception as e:
             logger.error("api_key_decryption_failed", error=str(e))
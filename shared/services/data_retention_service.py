@@ -8,12 +8,14 @@ Data Retention Service - управление политикой хранени
 - Логирование операций
 """
 
+import asyncio
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from dataclasses import dataclass
 from sqlalchemy.ext.asyncio import AsyncSession
 import structlog
 
+from ..database.connection import Database
 from .message_repository import MessageRepository
 from .session_repository import SessionRepository
 
@@ -43,6 +45,63 @@ class RetentionPolicy:
         )
 
 
+# Максимум одновременных запросов (соединений пула) в get_dashboard_summary
+STATISTICS_CONCURRENCY = 8
+
+
+def _statistics_queries(now: datetime) -> List[Tuple[type, str, Dict[str, Any]]]:
+    """Запросы статистики компании: (класс репозитория, метод, kwargs)"""
+    last_30_days = now - timedelta(days=30)
+
+    return [
+        # Общее количество
+        (MessageRepository, "count_messages", {}),
+        (SessionRepository, "count_sessions", {}),
+        # За последние 30 дней
+        (MessageRepository, "count_messages", {"start_date": last_30_days}),
+        (SessionRepository, "count_sessions", {"start_date": last_30_days}),
+        # По каналам
+        (MessageRepository, "count_by_channel", {}),
+        (SessionRepository, "count_by_channel", {}),
+        # Сессии по состояниям
+        (SessionRepository, "count_by_state", {}),
+        # Конверсия
+        (SessionRepository, "get_conversion_rate", {}),
+    ]
+
+
+def _build_statistics(now: datetime, results: List[Any]) -> Dict[str, Any]:
+    """Собрать ответ статистики из результатов _statistics_queries (в том же порядке)"""
+    (
+        total_messages,
+        total_sessions,
+        messages_30d,
+        sessions_30d,
+        messages_by_channel,
+        sessions_by_channel,
+        sessions_by_state,
+        conversion_rate,
+    ) = results
+
+    return {
+        "totals": {
+            "messages": total_messages,
+            "sessions": total_sessions,
+        },
+        "last_30_days": {
+            "messages": messages_30d,
+            "sessions": sessions_30d,
+        },
+        "by_channel": {
+            "messages": messages_by_channel,
+            "sessions": sessions_by_channel,
+        },
+        "sessions_by_state": sessions_by_state,
+        "conversion_rate_30d": conversion_rate,
+        "generated_at": now.isoformat(),
+    }
+
+
 class DataRetentionService:
     """
     Сервис для управления политикой хранения данных
@@ -73,12 +132,16 @@ class DataRetentionService:
         ),
     }
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, database: Optional[Database] = None):
         """
         Args:
             session: AsyncSession from Database context manager
+            database: Database для cleanup_company_data: каждая пачка удаления
+                выполняется в своей сессии и фиксируется отдельно, не затрагивая
+                session. None - очистка целиком в транзакции session
         """
         self.session = session
+        self.database = database
         self.message_repo = MessageRepository(session)
         self.session_repo = SessionRepository(session)
 
@@ -127,17 +190,37 @@ class DataRetentionService:
             sessions_retention=policy.sessions_retention_days
         )
 
-        # Сначала удаляем старые сообщения (они ссылаются на сессии)
-        deleted_messages = await self.message_repo.delete_old_messages(
-            company_id=company_id,
-            retention_days=policy.messages_retention_days,
-        )
+        if self.database is None:
+            # Сначала удаляем старые сообщения (они ссылаются на сессии)
+            deleted_messages = await self.message_repo.delete_old_messages(
+                company_id=company_id,
+                retention_days=policy.messages_retention_days,
+                batch_size=policy.batch_size,
+            )
 
-        # Затем удаляем старые сессии
-        deleted_sessions = await self.session_repo.delete_old_sessions(
-            company_id=company_id,
-            retention_days=policy.sessions_retention_days,
-        )
+            # Затем удаляем старые сессии
+            deleted_sessions = await self.session_repo.delete_old_sessions(
+                company_id=company_id,
+                retention_days=policy.sessions_retention_days,
+                batch_size=policy.batch_size,
+            )
+        else:
+            now = datetime.now(timezone.utc)
+
+            deleted_messages = await self._delete_in_batches(
+                MessageRepository,
+                "delete_old_messages_batch",
+                company_id,
+                now - timedelta(days=policy.messages_retention_days),
+                policy.batch_size,
+            )
+            deleted_sessions = await self._delete_in_batches(
+                SessionRepository,
+                "delete_old_sessions_batch",
+                company_id,
+                now - timedelta(days=policy.sessions_retention_days),
+                policy.batch_size,
+            )
 
         result = {
             "deleted_messages": deleted_messages,
@@ -152,6 +235,70 @@ class DataRetentionService:
 
         return result
 
+    async def _delete_in_batches(
+        self,
+        repository_cls: type,
+        method: str,
+        company_id: str,
+        cutoff_date: datetime,
+        batch_size: int,
+    ) -> int:
+        """
+        Удалять пачками до исчерпания, каждая пачка - отдельная транзакция
+
+        Долгая очистка не держит одну огромную транзакцию (блокировки,
+        VACUUM, репликация), а сессия сервиса при этом не фиксируется.
+
+        Args:
+            repository_cls: Класс репозитория
+            method: Метод удаления одной пачки (*_batch)
+        """
+        count = 0
+        while True:
+            async with self.database.session() as session:
+                repository = repository_cls(session)
+                deleted = await getattr(repository, method)(company_id, cutoff_date, batch_size)
+            count += deleted
+            if deleted < batch_size:
+                return count
+
+    async def drop_expired_message_partitions(self) -> List[str]:
+        """
+        Удалить месячные партиции сообщений, вышедшие за самый длинный срок хранения
+
+        Партиции содержат сообщения всех компаний, поэтому граница берется
+        по максимальному messages_retention_days среди планов подписки.
+        Более короткие сроки отдельных компаний обеспечивает cleanup_company_data.
+
+        Returns:
+            Имена удаленных партиций
+        """
+        max_retention_days = max(
+            policy.messages_retention_days
+            for policy in self.DEFAULT_POLICIES.values()
+        )
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=max_retention_days)
+
+        return await self.message_repo.drop_expired_partitions(cutoff_date)
+
+    async def maintain_message_partitions(self, months_ahead: int = 3) -> Dict[str, List[str]]:
+        """
+        Обслуживание партиций messages (запускать раз в сутки/месяц по cron)
+
+        Создает партиции на months_ahead месяцев вперед и удаляет
+        партиции, вышедшие за самый длинный срок хранения.
+
+        Returns:
+            {"ensured": [...], "dropped": [...]}
+        """
+        ensured = await self.message_repo.create_future_partitions(months_ahead)
+        dropped = await self.drop_expired_message_partitions()
+
+        return {
+            "ensured": ensured,
+            "dropped": dropped,
+        }
+
     async def delete_all_company_data(self, company_id: str) -> Dict[str, int]:
         """
         Удалить ВСЕ данные компании (GDPR: право на забвение)
@@ -197,6 +344,9 @@ class DataRetentionService:
         """
         Получить статистику по данным компании
 
+        Запросы выполняются последовательно в сессии сервиса.
+        Для дашбордов см. get_dashboard_summary (параллельно).
+
         Args:
             company_id: ID компании
 
@@ -204,48 +354,50 @@ class DataRetentionService:
             Статистика по сообщениям и сессиям
         """
         now = datetime.now(timezone.utc)
-        last_30_days = now - timedelta(days=30)
-        last_90_days = now - timedelta(days=90)
+        repositories = {
+            MessageRepository: self.message_repo,
+            SessionRepository: self.session_repo,
+        }
 
-        # Общее количество
-        total_messages = await self.message_repo.count_messages(company_id)
-        total_sessions = await self.session_repo.count_sessions(company_id)
+        results = [
+            await getattr(repositories[repository_cls], method)(company_id, **kwargs)
+            for repository_cls, method, kwargs in _statistics_queries(now)
+        ]
 
-        # За последние 30 дней
-        messages_30d = await self.message_repo.count_messages(
-            company_id, start_date=last_30_days
-        )
-        sessions_30d = await self.session_repo.count_sessions(
-            company_id, start_date=last_30_days
-        )
+        return _build_statistics(now, results)
 
-        # Сообщения по каналам
-        messages_by_channel = await self.message_repo.count_by_channel(company_id)
-        sessions_by_channel = await self.session_repo.count_by_channel(company_id)
+    @staticmethod
+    async def get_dashboard_summary(database: Database, company_id: str) -> Dict[str, Any]:
+        """
+        Получить статистику по данным компании параллельными запросами
 
-        # Сессии по состояниям
-        sessions_by_state = await self.session_repo.count_by_state(company_id)
+        Запросы независимы, поэтому выполняются одновременно - каждый
+        в своей сессии из пула (одна AsyncSession не выполняет запросы
+        параллельно). Время ответа ~ самый долгий запрос, а не их сумма.
+        Одновременно занимается не больше STATISTICS_CONCURRENCY соединений.
 
-        # Конверсия
-        conversion_rate = await self.session_repo.get_conversion_rate(company_id)
+        Args:
+            database: Database, из пула которого берутся сессии
+            company_id: ID компании
 
-        return {
-            "totals": {
-                "messages": total_messages,
-                "sessions": total_sessions,
-            },
-            "last_30_days": {
-                "messages": messages_30d,
-                "sessions": sessions_30d,
-            },
-            "by_channel": {
-                "messages": messages_by_channel,
-                "sessions": sessions_by_channel,
-            },
-            "sessions_by_state": sessions_by_state,
-            "conversion_rate_30d": conversion_rate,
-            "generated_at": now.isoformat(),
-        }
+        Returns:
+            Статистика в формате get_data_statistics
+        """
+        now = datetime.now(timezone.utc)
+        semaphore = asyncio.Semaphore(STATISTICS_CONCURRENCY)
+
+        async def run_query(repository_cls, method: str, kwargs: Dict[str, Any]) -> Any:
+            async with semaphore:
+                async with database.session() as session:
+                    repository = repository_cls(session)
+                    return await getattr(repository, method)(company_id, **kwargs)
+
+        results = await asyncio.gather(*(
+            run_query(repository_cls, method, kwargs)
+            for repository_cls, method, kwargs in _statistics_queries(now)
+        ))
+
+        return _build_statistics(now, results)
 
     async def estimate_cleanup(
         self,
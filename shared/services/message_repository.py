@@ -8,18 +8,78 @@ Message Repository - работа с сообщениями в PostgreSQL
 - Data retention (удаление старых данных)
 """
 
-from datetime import datetime, timezone, timedelta
-from typing import Optional, List, Dict, Any, Tuple
+import json
+import re
+from datetime import date, datetime, timezone, timedelta
+from typing import AsyncIterator, Optional, List, Dict, Any, Tuple, Union
 from uuid import UUID, uuid4
-from sqlalchemy import select, delete, func, and_, desc
+from sqlalchemy import Row, Select, lambda_stmt, select, delete, func, and_, desc, text, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 import structlog
 
-from ..database.models import Message as MessageModel, Session as SessionModel
+from ..database.models import (
+    Message as MessageModel,
+    MessageDailyCount,
+    Session as SessionModel,
+)
+from ..utils.ids import to_uuid
+from ..utils.pagination import Cursor, encode_cursor, estimate_row_count
 
 
 logger = structlog.get_logger(__name__)
 
+# Месячные партиции таблицы messages: messages_YYYY_MM
+_PARTITION_NAME_RE = re.compile(r"messages_(\d{4})_(\d{2})")
+
+_UTC = timezone.utc
+
+
+# Строк в одной пачке серверного курсора iter_company_messages
+STREAM_YIELD_PER = 1000
+
+# С какого размера пачки save_messages_bulk использует COPY
+BULK_COPY_MIN_ROWS = 100
+
+# Порядок колонок записей для COPY в save_messages_bulk
+_MESSAGE_COPY_COLUMNS = [
+    "id",
+    "session_id",
+    "company_id",
+    "channel",
+    "message_type",
+    "text",
+    "audio_url",
+    "image_url",
+    "file_url",
+    "is_from_bot",
+    "from_user_id",
+    "from_user_name",
+    "message_metadata",
+    "created_at",
+]
+
+
+def _partition_upper_bound(partition_name: str) -> date:
+    """Первый день месяца, следующего за месячной партицией messages_YYYY_MM"""
+    match = _PARTITION_NAME_RE.fullmatch(partition_name)
+    year, month = int(match.group(1)), int(match.group(2))
+    return date(year + month // 12, month % 12 + 1, 1)
+
+
+# Колонки сообщения для списков API: без message_metadata (JSONB) и URL вложений
+MESSAGE_LIST_COLUMNS = (
+    MessageModel.id,
+    MessageModel.session_id,
+    MessageModel.company_id,
+    MessageModel.channel,
+    MessageModel.message_type,
+    MessageModel.text,
+    MessageModel.is_from_bot,
+    MessageModel.from_user_id,
+    MessageModel.from_user_name,
+    MessageModel.created_at,
+)
+
 
 class MessageRepository:
     """
@@ -45,8 +105,8 @@ class MessageRepository:
 
     async def save_message(
         self,
-        session_id: str,
-        company_id: str,
+        session_id: Union[str, UUID],
+        company_id: Union[str, UUID],
         channel: str,
         text: Optional[str],
         is_from_bot: bool,
@@ -61,9 +121,11 @@ class MessageRepository:
         """
         Сохранить сообщение в PostgreSQL
 
+        created_at заполняется в БД (DEFAULT) и возвращается через RETURNING.
+
         Args:
-            session_id: ID сессии диалога
-            company_id: ID компании (multi-tenant)
+            session_id: ID сессии диалога (str или UUID)
+            company_id: ID компании (multi-tenant, str или UUID)
             channel: Канал (telegram, whatsapp, voice, web)
             text: Текст сообщения
             is_from_bot: True если сообщение от бота
@@ -80,8 +142,8 @@ class MessageRepository:
         """
         message = MessageModel(
             id=uuid4(),
-            session_id=UUID(session_id) if isinstance(session_id, str) else session_id,
-            company_id=UUID(company_id) if isinstance(company_id, str) else company_id,
+            session_id=to_uuid(session_id),
+            company_id=to_uuid(company_id),
             channel=channel,
             message_type=message_type,
             text=text,
@@ -92,7 +154,6 @@ class MessageRepository:
             from_user_id=from_user_id,
             from_user_name=from_user_name,
             message_metadata=metadata or {},
-            created_at=datetime.now(timezone.utc),
         )
 
         self.session.add(message)
@@ -110,8 +171,8 @@ class MessageRepository:
 
     async def save_user_message(
         self,
-        session_id: str,
-        company_id: str,
+        session_id: Union[str, UUID],
+        company_id: Union[str, UUID],
         channel: str,
         text: str,
         from_user_id: str,
@@ -132,8 +193,8 @@ class MessageRepository:
 
     async def save_bot_message(
         self,
-        session_id: str,
-        company_id: str,
+        session_id: Union[str, UUID],
+        company_id: Union[str, UUID],
         channel: str,
         text: str,
         metadata: Optional[Dict[str, Any]] = None,
@@ -150,20 +211,91 @@ class MessageRepository:
             metadata=metadata,
         )
 
+    async def save_messages_bulk(self, messages: List[Dict[str, Any]]) -> List[UUID]:
+        """
+        Сохранить пачку сообщений одной операцией
+
+        ID и created_at генерируются в Python, поэтому RETURNING не нужен.
+        Пачки от BULK_COPY_MIN_ROWS строк пишутся через COPY (asyncpg
+        copy_records_to_table) - один поток данных вместо N INSERT.
+        Меньшие пачки добавляются через ORM одним flush.
+
+        COPY выполняется на соединении текущей сессии, то есть в ее транзакции.
+
+        Args:
+            messages: Словари с аргументами save_message
+                (session_id, company_id, channel, text, is_from_bot, ...)
+
+        Returns:
+            ID сохраненных сообщений в порядке входного списка
+        """
+        if not messages:
+            return []
+
+        # created_at - timestamp without time zone, храним UTC
+        created_at = datetime.now(_UTC).replace(tzinfo=None)
+
+        records = [
+            (
+                uuid4(),
+                to_uuid(message["session_id"]),
+                to_uuid(message["company_id"]),
+                message["channel"],
+                message.get("message_type", "text"),
+                message.get("text"),
+                message.get("audio_url"),
+                message.get("image_url"),
+                message.get("file_url"),
+                message.get("is_from_bot", False),
+                message.get("from_user_id"),
+                message.get("from_user_name"),
+                message.get("metadata") or {},
+                created_at,
+            )
+            for message in messages
+        ]
+
+        if len(records) < BULK_COPY_MIN_ROWS:
+            self.session.add_all([
+                MessageModel(**dict(zip(_MESSAGE_COPY_COLUMNS, record)))
+                for record in records
+            ])
+            await self.session.flush()
+        else:
+            connection = await self.session.connection()
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                MessageModel.__tablename__,
+                records=[
+                    record[:-2] + (json.dumps(record[-2]), record[-1])
+                    for record in records
+                ],
+                columns=_MESSAGE_COPY_COLUMNS,
+            )
+
+        logger.debug(
+            "messages_bulk_saved",
+            count=len(records),
+            copy=len(records) >= BULK_COPY_MIN_ROWS
+        )
+
+        return [record[0] for record in records]
+
     # ========================================
     # READ
     # ========================================
 
-    async def get_message_by_id(self, message_id: str) -> Optional[MessageModel]:
+    async def get_message_by_id(self, message_id: Union[str, UUID]) -> Optional[MessageModel]:
         """Получить сообщение по ID"""
+        message_id = to_uuid(message_id)
         result = await self.session.execute(
-            select(MessageModel).where(MessageModel.id == message_id)
+            lambda_stmt(lambda: select(MessageModel).where(MessageModel.id == message_id))
         )
         return result.scalar_one_or_none()
 
     async def get_session_messages(
         self,
-        session_id: str,
+        session_id: Union[str, UUID],
         limit: int = 100,
         offset: int = 0,
         order_desc: bool = False,
@@ -180,21 +312,75 @@ class MessageRepository:
         Returns:
             Список сообщений
         """
-        query = (
-            select(MessageModel)
+        session_id = to_uuid(session_id)
+        query = lambda_stmt(
+            lambda: select(MessageModel)
             .where(MessageModel.session_id == session_id)
             .offset(offset)
             .limit(limit)
         )
 
         if order_desc:
-            query = query.order_by(desc(MessageModel.created_at))
+            query += lambda s: s.order_by(desc(MessageModel.created_at))
         else:
-            query = query.order_by(MessageModel.created_at)
+            query += lambda s: s.order_by(MessageModel.created_at)
 
         result = await self.session.execute(query)
         return list(result.scalars().all())
 
+    async def list_session_messages_lite(
+        self,
+        session_id: Union[str, UUID],
+        limit: int = 100,
+    ) -> List[Row]:
+        """
+        Получить сообщения сессии для отображения (от старых к новым)
+
+        Выбирает только MESSAGE_LIST_COLUMNS и возвращает Row без
+        ORM-объектов: не декодируется JSONB metadata, не заполняется
+        identity map. Атрибуты Row совпадают с именами колонок модели.
+
+        Args:
+            session_id: ID сессии
+            limit: Максимум сообщений
+
+        Returns:
+            Список Row
+        """
+        session_id = to_uuid(session_id)
+        query = lambda_stmt(
+            lambda: select(*MESSAGE_LIST_COLUMNS)
+            .where(MessageModel.session_id == session_id)
+            .order_by(MessageModel.created_at)
+            .limit(limit)
+        )
+
+        result = await self.session.execute(query)
+        return list(result.all())
+
+    @staticmethod
+    def _company_messages_query(
+        company_id: str,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        channel: Optional[str],
+    ) -> Select:
+        """Сообщения компании с фильтрами, новые первыми"""
+        conditions = [MessageModel.company_id == company_id]
+
+        if start_date:
+            conditions.append(MessageModel.created_at >= start_date)
+        if end_date:
+            conditions.append(MessageModel.created_at <= end_date)
+        if channel:
+            conditions.append(MessageModel.channel == channel)
+
+        return (
+            select(MessageModel)
+            .where(and_(*conditions))
+            .order_by(desc(MessageModel.created_at))
+        )
+
     async def get_company_messages(
         self,
         company_id: str,
@@ -207,6 +393,9 @@ class MessageRepository:
         """
         Получить сообщения компании с фильтрацией
 
+        Для выгрузки большого количества сообщений используйте
+        iter_company_messages.
+
         Args:
             company_id: ID компании
             start_date: Начало периода
@@ -218,19 +407,8 @@ class MessageRepository:
         Returns:
             Список сообщений
         """
-        conditions = [MessageModel.company_id == company_id]
-
-        if start_date:
-            conditions.append(MessageModel.created_at >= start_date)
-        if end_date:
-            conditions.append(MessageModel.created_at <= end_date)
-        if channel:
-            conditions.append(MessageModel.channel == channel)
-
         query = (
-            select(MessageModel)
-            .where(and_(*conditions))
-            .order_by(desc(MessageModel.created_at))
+            self._company_messages_query(company_id, start_date, end_date, channel)
             .offset(offset)
             .limit(limit)
         )
@@ -238,22 +416,60 @@ class MessageRepository:
         result = await self.session.execute(query)
         return list(result.scalars().all())
 
+    async def iter_company_messages(
+        self,
+        company_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        channel: Optional[str] = None,
+    ) -> AsyncIterator[MessageModel]:
+        """
+        Потоково перебрать сообщения компании (для выгрузок)
+
+        Строки читаются серверным курсором пачками по STREAM_YIELD_PER,
+        в памяти одновременно находится не больше одной пачки.
+        Курсор живет в транзакции сессии: не делайте commit до конца перебора.
+
+        Args:
+            company_id: ID компании
+            start_date: Начало периода
+            end_date: Конец периода
+            channel: Фильтр по каналу
+
+        Yields:
+            MessageModel, новые первыми
+        """
+        query = self._company_messages_query(
+            company_id, start_date, end_date, channel
+        ).execution_options(yield_per=STREAM_YIELD_PER)
+
+        result = await self.session.stream_scalars(query)
+        try:
+            async for message in result:
+                yield message
+        finally:
+            await result.close()
+
     async def get_messages_with_pagination(
         self,
         company_id: str,
-        page: int = 1,
+        cursor: Optional[Cursor] = None,
         per_page: int = 50,
         session_id: Optional[str] = None,
         channel: Optional[str] = None,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-    ) -> Tuple[List[MessageModel], int]:
+    ) -> Tuple[List[Row], Optional[str]]:
         """
-        Получить сообщения с пагинацией для API
+        Получить сообщения с keyset-пагинацией для API
+
+        Сортировка: created_at DESC, id DESC. Следующая страница
+        начинается строго после записи, закодированной в курсоре.
+        Выбираются только MESSAGE_LIST_COLUMNS (Row вместо ORM-объектов).
 
         Args:
             company_id: ID компании
-            page: Номер страницы (начиная с 1)
+            cursor: (created_at, id) последней записи предыдущей страницы
             per_page: Сообщений на страницу
             session_id: Фильтр по сессии
             channel: Фильтр по каналу
@@ -261,7 +477,7 @@ class MessageRepository:
             end_date: Конец периода
 
         Returns:
-            Tuple[список сообщений, общее количество]
+            Tuple[список сообщений, курсор следующей страницы или None]
         """
         conditions = [MessageModel.company_id == company_id]
 
@@ -273,26 +489,30 @@ class MessageRepository:
             conditions.append(MessageModel.created_at >= start_date)
         if end_date:
             conditions.append(MessageModel.created_at <= end_date)
+        if cursor:
+            # Обычный tuple справа: параметры получают типы колонок (UTCDateTime)
+            conditions.append(
+                tuple_(MessageModel.created_at, MessageModel.id) < tuple(cursor)
+            )
 
-        # Общее количество
-        count_query = select(func.count(MessageModel.id)).where(and_(*conditions))
-        total = await self.session.execute(count_query)
-        total_count = total.scalar() or 0
-
-        # Данные с пагинацией
-        offset = (page - 1) * per_page
+        # Лишняя строка сверх per_page показывает, есть ли следующая страница
         data_query = (
-            select(MessageModel)
+            select(*MESSAGE_LIST_COLUMNS)
             .where(and_(*conditions))
-            .order_by(desc(MessageModel.created_at))
-            .offset(offset)
-            .limit(per_page)
+            .order_by(desc(MessageModel.created_at), desc(MessageModel.id))
+            .limit(per_page + 1)
         )
 
         result = await self.session.execute(data_query)
-        messages = list(result.scalars().all())
+        messages = list(result.all())
+
+        next_cursor = None
+        if len(messages) > per_page:
+            messages = messages[:per_page]
+            last = messages[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
 
-        return messages, total_count
+        return messages, next_cursor
 
     # ========================================
     # ANALYTICS
@@ -304,43 +524,92 @@ class MessageRepository:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         channel: Optional[str] = None,
+        session_id: Optional[str] = None,
     ) -> int:
         """Подсчитать количество сообщений"""
-        conditions = [MessageModel.company_id == company_id]
+        query = lambda_stmt(
+            lambda: select(func.count())
+            .select_from(MessageModel)
+            .where(MessageModel.company_id == company_id)
+        )
 
+        if session_id:
+            query += lambda s: s.where(MessageModel.session_id == session_id)
         if start_date:
-            conditions.append(MessageModel.created_at >= start_date)
+            query += lambda s: s.where(MessageModel.created_at >= start_date)
         if end_date:
-            conditions.append(MessageModel.created_at <= end_date)
+            query += lambda s: s.where(MessageModel.created_at <= end_date)
         if channel:
-            conditions.append(MessageModel.channel == channel)
+            query += lambda s: s.where(MessageModel.channel == channel)
 
-        query = select(func.count(MessageModel.id)).where(and_(*conditions))
         result = await self.session.execute(query)
         return result.scalar() or 0
 
-    async def count_by_channel(
+    async def count_messages_approx(
         self,
         company_id: str,
+        session_id: Optional[str] = None,
+        channel: Optional[str] = None,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-    ) -> Dict[str, int]:
-        """Подсчитать сообщения по каналам"""
+    ) -> int:
+        """
+        Оценить количество сообщений по статистике планировщика
+
+        Выполняет EXPLAIN вместо COUNT(*): запрос не читает строки,
+        поэтому время не зависит от размера выборки. Точность - как у
+        статистики ANALYZE, для отображения "~N сообщений" ее достаточно.
+        """
         conditions = [MessageModel.company_id == company_id]
 
+        if session_id:
+            conditions.append(MessageModel.session_id == session_id)
+        if channel:
+            conditions.append(MessageModel.channel == channel)
         if start_date:
             conditions.append(MessageModel.created_at >= start_date)
         if end_date:
             conditions.append(MessageModel.created_at <= end_date)
 
-        query = (
-            select(MessageModel.channel, func.count(MessageModel.id))
-            .where(and_(*conditions))
-            .group_by(MessageModel.channel)
+        return await estimate_row_count(
+            self.session,
+            select(MessageModel.id).where(and_(*conditions))
         )
 
+    async def count_by_channel(
+        self,
+        company_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict[str, int]:
+        """
+        Подсчитать сообщения по каналам
+
+        Без фильтра по периоду читается сводная таблица messages_daily_count.
+        """
+        if start_date is None and end_date is None:
+            query = (
+                select(MessageDailyCount.channel, func.sum(MessageDailyCount.count))
+                .where(MessageDailyCount.company_id == company_id)
+                .group_by(MessageDailyCount.channel)
+                .having(func.sum(MessageDailyCount.count) > 0)
+            )
+        else:
+            conditions = [MessageModel.company_id == company_id]
+
+            if start_date:
+                conditions.append(MessageModel.created_at >= start_date)
+            if end_date:
+                conditions.append(MessageModel.created_at <= end_date)
+
+            query = (
+                select(MessageModel.channel, func.count())
+                .where(and_(*conditions))
+                .group_by(MessageModel.channel)
+            )
+
         result = await self.session.execute(query)
-        return {row[0]: row[1] for row in result.all()}
+        return {row[0]: int(row[1]) for row in result.all()}
 
     async def get_daily_message_count(
         self,
@@ -350,6 +619,9 @@ class MessageRepository:
         """
         Получить количество сообщений по дням
 
+        Читает сводную таблицу messages_daily_count (поддерживается
+        триггерами на messages) вместо группировки самих сообщений.
+
         Args:
             company_id: ID компании
             days: Количество дней для анализа
@@ -357,23 +629,24 @@ class MessageRepository:
         Returns:
             Список {date, count}
         """
-        start_date = datetime.now(timezone.utc) - timedelta(days=days)
+        start_day = (datetime.now(_UTC) - timedelta(days=days)).date()
 
         query = (
             select(
-                func.date(MessageModel.created_at).label('date'),
-                func.count(MessageModel.id).label('count')
+                MessageDailyCount.day.label('date'),
+                func.sum(MessageDailyCount.count).label('count')
             )
             .where(and_(
-                MessageModel.company_id == company_id,
-                MessageModel.created_at >= start_date
+                MessageDailyCount.company_id == company_id,
+                MessageDailyCount.day >= start_day
             ))
-            .group_by(func.date(MessageModel.created_at))
-            .order_by(func.date(MessageModel.created_at))
+            .group_by(MessageDailyCount.day)
+            .having(func.sum(MessageDailyCount.count) > 0)
+            .order_by(MessageDailyCount.day)
         )
 
         result = await self.session.execute(query)
-        return [{"date": str(row.date), "count": row.count} for row in result.all()]
+        return [{"date": str(row.date), "count": int(row.count)} for row in result.all()]
 
     # ========================================
     # DATA RETENTION
@@ -383,35 +656,34 @@ class MessageRepository:
         self,
         company_id: str,
         retention_days: int,
+        batch_size: int = 1000,
     ) -> int:
         """
         Удалить сообщения старше указанного срока
 
+        Удаление идет пачками по batch_size строк в транзакции текущей сессии
+        (commit делает вызывающий код). Чтобы фиксировать каждую пачку
+        отдельно, DataRetentionService вызывает delete_old_messages_batch
+        в своей сессии на пачку.
+
         Args:
             company_id: ID компании
             retention_days: Хранить сообщения не старше N дней
+            batch_size: Строк в одном DELETE
 
         Returns:
             Количество удаленных сообщений
         """
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        cutoff_date = datetime.now(_UTC) - timedelta(days=retention_days)
 
-        # Подсчитаем сначала
-        count_query = select(func.count(MessageModel.id)).where(and_(
-            MessageModel.company_id == company_id,
-            MessageModel.created_at < cutoff_date
-        ))
-        count_result = await self.session.execute(count_query)
-        count = count_result.scalar() or 0
+        count = 0
+        while True:
+            deleted = await self.delete_old_messages_batch(company_id, cutoff_date, batch_size)
+            count += deleted
+            if deleted < batch_size:
+                break
 
         if count > 0:
-            # Удаляем
-            delete_query = delete(MessageModel).where(and_(
-                MessageModel.company_id == company_id,
-                MessageModel.created_at < cutoff_date
-            ))
-            await self.session.execute(delete_query)
-
             logger.info(
                 "old_messages_deleted",
                 company_id=company_id,
@@ -421,6 +693,35 @@ class MessageRepository:
 
         return count
 
+    async def delete_old_messages_batch(
+        self,
+        company_id: str,
+        cutoff_date: datetime,
+        batch_size: int,
+    ) -> int:
+        """
+        Удалить одну пачку сообщений, созданных раньше cutoff_date
+
+        Returns:
+            Количество удаленных сообщений (< batch_size - удалять больше нечего)
+        """
+        # created_at в ключе пачки - для отсечения партиций
+        batch = (
+            select(MessageModel.id, MessageModel.created_at)
+            .where(and_(
+                MessageModel.company_id == company_id,
+                MessageModel.created_at < cutoff_date
+            ))
+            .order_by(MessageModel.created_at)
+            .limit(batch_size)
+        )
+        result = await self.session.execute(
+            delete(MessageModel).where(
+                tuple_(MessageModel.id, MessageModel.created_at).in_(batch)
+            )
+        )
+        return result.rowcount
+
     async def delete_all_company_messages(self, company_id: str) -> int:
         """
         Удалить все сообщения компании (для GDPR compliance)
@@ -431,18 +732,13 @@ class MessageRepository:
         Returns:
             Количество удаленных сообщений
         """
-        count_query = select(func.count(MessageModel.id)).where(
+        delete_query = delete(MessageModel).where(
             MessageModel.company_id == company_id
         )
-        count_result = await self.session.execute(count_query)
-        count = count_result.scalar() or 0
+        result = await self.session.execute(delete_query)
+        count = result.rowcount
 
         if count > 0:
-            delete_query = delete(MessageModel).where(
-                MessageModel.company_id == company_id
-            )
-            await self.session.execute(delete_query)
-
             logger.warning(
                 "all_company_messages_deleted",
                 company_id=company_id,
@@ -450,3 +746,83 @@ class MessageRepository:
             )
 
         return count
+
+    async def create_future_partitions(self, months_ahead: int = 3) -> List[str]:
+        """
+        Создать месячные партиции messages на текущий и months_ahead следующих месяцев
+
+        Без партиции на месяц его сообщения попадают в messages_default,
+        где не работает отсечение партиций и DROP по сроку хранения.
+        create_messages_partition идемпотентна и переносит в новую
+        партицию строки, уже попавшие в messages_default.
+
+        Args:
+            months_ahead: На сколько месяцев вперед
+
+        Returns:
+            Имена партиций (существующих и созданных)
+        """
+        today = datetime.now(_UTC).date()
+        partitions = []
+
+        for offset in range(months_ahead + 1):
+            year, month = divmod(today.month - 1 + offset, 12)
+            result = await self.session.execute(
+                text("SELECT create_messages_partition(:month)"),
+                {"month": date(today.year + year, month + 1, 1)}
+            )
+            partitions.append(result.scalar())
+
+        logger.info("message_partitions_ensured", partitions=partitions)
+
+        return partitions
+
+    async def drop_expired_partitions(self, cutoff_date: datetime) -> List[str]:
+        """
+        Удалить месячные партиции messages, целиком лежащие до cutoff_date
+
+        DROP партиции выполняется за константное время и не оставляет
+        мертвых строк для VACUUM. Партиция, в которую попадает cutoff_date,
+        не трогается - ее хвост удаляется обычным DELETE.
+
+        Партиции общие для всех компаний, поэтому cutoff_date должен
+        соответствовать самому длинному сроку хранения.
+
+        Args:
+            cutoff_date: Граница хранения
+
+        Returns:
+            Имена удаленных партиций
+        """
+        result = await self.session.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'messages'::regclass"
+        ))
+
+        cutoff_day = cutoff_date.date()
+        dropped = []
+
+        for (partition_name,) in result.all():
+            if not _PARTITION_NAME_RE.fullmatch(partition_name):
+                continue  # messages_default и прочие
+
+            if _partition_upper_bound(partition_name) <= cutoff_day:
+                await self.session.execute(text(f'DROP TABLE "{partition_name}"'))
+                dropped.append(partition_name)
+
+        if dropped:
+            # DROP партиции не вызывает триггеры - чистим сводку вручную
+            await self.session.execute(
+                delete(MessageDailyCount).where(
+                    MessageDailyCount.day < max(_partition_upper_bound(name) for name in dropped)
+                )
+            )
+
+            logger.info(
+                "message_partitions_dropped",
+                cutoff_date=cutoff_date.isoformat(),
+                partitions=dropped
+            )
+
+        return sorted(dropped)
@@ -7,19 +7,30 @@ Session Repository - работа с сессиями в PostgreSQL
 - Data retention (удаление старых сессий)
 """
 
+import time
 from datetime import datetime, timezone, timedelta
-from typing import Optional, List, Dict, Any, Tuple
+from typing import AsyncIterator, Optional, List, Dict, Any, Tuple, Union
 from uuid import UUID, uuid4
-from sqlalchemy import select, delete, update, func, and_, desc
+from sqlalchemy import Select, String, lambda_stmt, select, delete, update, func, and_, or_, desc, tuple_, values, column
+from sqlalchemy.dialects.postgresql import JSONB, UUID as PG_UUID, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 import structlog
 
-from ..database.models import Session as SessionModel, Message as MessageModel
+from ..database.models import Session as SessionModel, Message as MessageModel, UTCDateTime
+from ..utils.ids import to_uuid
+from ..utils.pagination import Cursor, encode_cursor
+from .message_repository import STREAM_YIELD_PER
 
 
 logger = structlog.get_logger(__name__)
 
+# Кэш (company_id, days) -> (total, completed) для конверсии (in-process)
+CONVERSION_CACHE_TTL_SECONDS = 120
+CONVERSION_CACHE_MAX_SIZE = 1024
+
+_conversion_cache: Dict[Tuple[str, int], Tuple[Tuple[int, int], float]] = {}
+
 
 class SessionRepository:
     """
@@ -56,6 +67,9 @@ class SessionRepository:
         """
         Создать или обновить сессию
 
+        Один INSERT ... ON CONFLICT (id) DO UPDATE: атомарно и без
+        предварительного SELECT.
+
         Args:
             session_id: ID сессии
             company_id: ID компании
@@ -69,56 +83,77 @@ class SessionRepository:
         Returns:
             SessionModel
         """
-        # Проверяем существование
-        existing = await self.get_session_by_id(session_id)
+        now = datetime.now(timezone.utc)
+
+        stmt = pg_insert(SessionModel).values(
+            id=to_uuid(session_id),
+            company_id=to_uuid(company_id),
+            user_id=user_id,
+            channel=channel,
+            state=state,
+            context=context or {},
+            crm_client_id=crm_client_id,
+            crm_appointment_id=crm_appointment_id,
+            created_at=now,
+            updated_at=now,
+            last_activity_at=now,
+        )
 
-        if existing:
-            # Обновляем
-            existing.state = state
-            existing.context = context or existing.context
-            existing.crm_client_id = crm_client_id or existing.crm_client_id
-            existing.crm_appointment_id = crm_appointment_id or existing.crm_appointment_id
-            existing.last_activity_at = datetime.now(timezone.utc)
-            existing.updated_at = datetime.now(timezone.utc)
+        # Пустые значения не затирают уже сохраненные
+        update_values = {
+            "state": stmt.excluded.state,
+            "last_activity_at": stmt.excluded.last_activity_at,
+            "updated_at": stmt.excluded.updated_at,
+        }
+        if context:
+            update_values["context"] = stmt.excluded.context
+        if crm_client_id:
+            update_values["crm_client_id"] = stmt.excluded.crm_client_id
+        if crm_appointment_id:
+            update_values["crm_appointment_id"] = stmt.excluded.crm_appointment_id
+
+        stmt = (
+            stmt.on_conflict_do_update(
+                index_elements=[SessionModel.id],
+                set_=update_values,
+            )
+            .returning(SessionModel)
+            .execution_options(populate_existing=True)
+        )
 
-            await self.session.flush()
+        result = await self.session.execute(stmt)
+        upserted = result.scalar_one()
 
-            logger.debug(
-                "session_updated_in_postgres",
-                session_id=session_id,
-                state=state
-            )
-            return existing
-        else:
-            # Создаем
-            new_session = SessionModel(
-                id=UUID(session_id) if isinstance(session_id, str) else session_id,
-                company_id=UUID(company_id) if isinstance(company_id, str) else company_id,
-                user_id=user_id,
-                channel=channel,
-                state=state,
-                context=context or {},
-                crm_client_id=crm_client_id,
-                crm_appointment_id=crm_appointment_id,
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc),
-                last_activity_at=datetime.now(timezone.utc),
-            )
+        logger.debug(
+            "session_upserted_in_postgres",
+            session_id=str(session_id),
+            company_id=str(company_id),
+            state=state
+        )
+        return upserted
 
-            self.session.add(new_session)
-            await self.session.flush()
+    async def touch_session(self, session_id: Union[str, UUID]) -> bool:
+        """
+        Обновить last_activity_at сессии без предварительного чтения
 
-            logger.debug(
-                "session_created_in_postgres",
-                session_id=session_id,
-                company_id=company_id,
-                channel=channel
-            )
-            return new_session
+        Args:
+            session_id: ID сессии
+
+        Returns:
+            True если сессия найдена
+        """
+        query = (
+            update(SessionModel)
+            .where(SessionModel.id == to_uuid(session_id))
+            .values(last_activity_at=datetime.now(timezone.utc))
+        )
+
+        result = await self.session.execute(query)
+        return result.rowcount > 0
 
     async def update_session_state(
         self,
-        session_id: str,
+        session_id: Union[str, UUID],
         state: str,
         context: Optional[Dict[str, Any]] = None,
     ) -> bool:
@@ -144,20 +179,68 @@ class SessionRepository:
 
         query = (
             update(SessionModel)
-            .where(SessionModel.id == session_id)
+            .where(SessionModel.id == to_uuid(session_id))
             .values(**update_data)
         )
 
         result = await self.session.execute(query)
         return result.rowcount > 0
 
+    async def update_session_states_bulk(
+        self,
+        updates: List[Tuple[UUID, str, Optional[Dict[str, Any]], datetime]],
+    ) -> int:
+        """
+        Обновить состояния нескольких сессий одним UPDATE ... FROM (VALUES ...)
+
+        Args:
+            updates: (session_id, state, context, activity_at). context=None
+                оставляет сохраненный контекст
+
+        Записи старше last_activity_at сессии (сессию уже обновили напрямую
+        позже буфера) пропускаются: время активности не идет назад.
+
+        Returns:
+            Количество обновленных сессий
+        """
+        if not updates:
+            return 0
+
+        rows = values(
+            column("id", PG_UUID(as_uuid=True)),
+            column("state", String),
+            column("context", JSONB(none_as_null=True)),
+            column("activity_at", UTCDateTime),
+            name="v",
+        ).data(updates)
+
+        query = (
+            update(SessionModel)
+            .where(
+                SessionModel.id == rows.c.id,
+                or_(
+                    SessionModel.last_activity_at.is_(None),
+                    SessionModel.last_activity_at <= rows.c.activity_at,
+                ),
+            )
+            .values(
+                state=rows.c.state,
+                context=func.coalesce(rows.c.context, SessionModel.context),
+                last_activity_at=rows.c.activity_at,
+                updated_at=rows.c.activity_at,
+            )
+        )
+
+        result = await self.session.execute(query)
+        return result.rowcount
+
     # ========================================
     # READ
     # ========================================
 
     async def get_session_by_id(
         self,
-        session_id: str,
+        session_id: Union[str, UUID],
         include_messages: bool = False,
     ) -> Optional[SessionModel]:
         """
@@ -170,10 +253,11 @@ class SessionRepository:
         Returns:
             SessionModel или None
         """
-        query = select(SessionModel).where(SessionModel.id == session_id)
+        session_id = to_uuid(session_id)
+        query = lambda_stmt(lambda: select(SessionModel).where(SessionModel.id == session_id))
 
         if include_messages:
-            query = query.options(selectinload(SessionModel.messages))
+            query += lambda s: s.options(selectinload(SessionModel.messages))
 
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
@@ -195,8 +279,8 @@ class SessionRepository:
         Returns:
             Список сессий
         """
-        query = (
-            select(SessionModel)
+        query = lambda_stmt(
+            lambda: select(SessionModel)
             .where(and_(
                 SessionModel.company_id == company_id,
                 SessionModel.user_id == user_id
@@ -208,26 +292,41 @@ class SessionRepository:
         result = await self.session.execute(query)
         return list(result.scalars().all())
 
-    async def get_active_sessions(
+    async def get_latest_user_session(
         self,
         company_id: str,
-        since: Optional[datetime] = None,
-    ) -> List[SessionModel]:
+        user_id: str,
+    ) -> Optional[SessionModel]:
         """
-        Получить активные сессии
+        Получить последнюю активную сессию пользователя
 
         Args:
             company_id: ID компании
-            since: Активные с указанной даты
+            user_id: ID пользователя
 
         Returns:
-            Список активных сессий
+            SessionModel или None
         """
+        result = await self.session.execute(
+            lambda_stmt(
+                lambda: select(SessionModel)
+                .where(and_(
+                    SessionModel.company_id == company_id,
+                    SessionModel.user_id == user_id
+                ))
+                .order_by(desc(SessionModel.last_activity_at))
+                .limit(1)
+            )
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    def _active_sessions_query(company_id: str, since: Optional[datetime]) -> Select:
+        """Сессии компании, активные с since (по умолчанию - последние 24 часа)"""
         if since is None:
-            # По умолчанию - последние 24 часа
             since = datetime.now(timezone.utc) - timedelta(hours=24)
 
-        query = (
+        return (
             select(SessionModel)
             .where(and_(
                 SessionModel.company_id == company_id,
@@ -236,24 +335,75 @@ class SessionRepository:
             .order_by(desc(SessionModel.last_activity_at))
         )
 
-        result = await self.session.execute(query)
+    async def get_active_sessions(
+        self,
+        company_id: str,
+        since: Optional[datetime] = None,
+    ) -> List[SessionModel]:
+        """
+        Получить активные сессии
+
+        Args:
+            company_id: ID компании
+            since: Активные с указанной даты
+
+        Returns:
+            Список активных сессий
+        """
+        result = await self.session.execute(self._active_sessions_query(company_id, since))
         return list(result.scalars().all())
 
+    async def iter_active_sessions(
+        self,
+        company_id: str,
+        since: Optional[datetime] = None,
+    ) -> AsyncIterator[SessionModel]:
+        """
+        Потоково перебрать активные сессии
+
+        Строки читаются серверным курсором пачками по STREAM_YIELD_PER.
+        Курсор живет в транзакции сессии: не делайте commit до конца перебора.
+
+        Args:
+            company_id: ID компании
+            since: Активные с указанной даты
+
+        Yields:
+            SessionModel, недавно активные первыми
+        """
+        query = self._active_sessions_query(company_id, since).execution_options(
+            yield_per=STREAM_YIELD_PER
+        )
+
+        result = await self.session.stream_scalars(query)
+        try:
+            async for session in result:
+                yield session
+        finally:
+            await result.close()
+
     async def get_sessions_with_pagination(
         self,
         company_id: str,
-        page: int = 1,
+        cursor: Optional[Cursor] = None,
         per_page: int = 50,
         channel: Optional[str] = None,
         state: Optional[str] = None,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-    ) -> Tuple[List[SessionModel], int]:
+    ) -> Tuple[List[SessionModel], Optional[str]]:
         """
-        Получить сессии с пагинацией для API
+        Получить сессии с keyset-пагинацией для API
+
+        Сортировка: last_activity_at DESC, id DESC.
+
+        Args:
+            company_id: ID компании
+            cursor: (last_activity_at, id) последней записи предыдущей страницы
+            per_page: Сессий на страницу
 
         Returns:
-            Tuple[список сессий, общее количество]
+            Tuple[список сессий, курсор следующей страницы или None]
         """
         conditions = [SessionModel.company_id == company_id]
 
@@ -265,26 +415,30 @@ class SessionRepository:
             conditions.append(SessionModel.created_at >= start_date)
         if end_date:
             conditions.append(SessionModel.created_at <= end_date)
+        if cursor:
+            # Обычный tuple справа: параметры получают типы колонок (UTCDateTime)
+            conditions.append(
+                tuple_(SessionModel.last_activity_at, SessionModel.id) < tuple(cursor)
+            )
 
-        # Общее количество
-        count_query = select(func.count(SessionModel.id)).where(and_(*conditions))
-        total = await self.session.execute(count_query)
-        total_count = total.scalar() or 0
-
-        # Данные с пагинацией
-        offset = (page - 1) * per_page
+        # Лишняя строка сверх per_page показывает, есть ли следующая страница
         data_query = (
             select(SessionModel)
             .where(and_(*conditions))
-            .order_by(desc(SessionModel.last_activity_at))
-            .offset(offset)
-            .limit(per_page)
+            .order_by(desc(SessionModel.last_activity_at), desc(SessionModel.id))
+            .limit(per_page + 1)
         )
 
         result = await self.session.execute(data_query)
         sessions = list(result.scalars().all())
 
-        return sessions, total_count
+        next_cursor = None
+        if len(sessions) > per_page:
+            sessions = sessions[:per_page]
+            last = sessions[-1]
+            next_cursor = encode_cursor(last.last_activity_at, last.id)
+
+        return sessions, next_cursor
 
     # ========================================
     # ANALYTICS
@@ -297,14 +451,16 @@ class SessionRepository:
         end_date: Optional[datetime] = None,
     ) -> int:
         """Подсчитать количество сессий"""
-        conditions = [SessionModel.company_id == company_id]
+        query = lambda_stmt(
+            lambda: select(func.count())
+            .select_from(SessionModel)
+            .where(SessionModel.company_id == company_id)
+        )
 
         if start_date:
-            conditions.append(SessionModel.created_at >= start_date)
+            query += lambda s: s.where(SessionModel.created_at >= start_date)
         if end_date:
-            conditions.append(SessionModel.created_at <= end_date)
-
-        query = select(func.count(SessionModel.id)).where(and_(*conditions))
+            query += lambda s: s.where(SessionModel.created_at <= end_date)
         result = await self.session.execute(query)
         return result.scalar() or 0
 
@@ -323,7 +479,7 @@ class SessionRepository:
             conditions.append(SessionModel.created_at <= end_date)
 
         query = (
-            select(SessionModel.state, func.count(SessionModel.id))
+            select(SessionModel.state, func.count())
             .where(and_(*conditions))
             .group_by(SessionModel.state)
         )
@@ -346,7 +502,7 @@ class SessionRepository:
             conditions.append(SessionModel.created_at <= end_date)
 
         query = (
-            select(SessionModel.channel, func.count(SessionModel.id))
+            select(SessionModel.channel, func.count())
             .where(and_(*conditions))
             .group_by(SessionModel.channel)
         )
@@ -354,23 +510,60 @@ class SessionRepository:
         result = await self.session.execute(query)
         return {row[0]: row[1] for row in result.all()}
 
-    async def get_completed_sessions_count(
+    async def get_conversion_stats(
         self,
         company_id: str,
         days: int = 30,
-    ) -> int:
-        """Количество успешно завершенных сессий (с записью)"""
+    ) -> Tuple[int, int]:
+        """
+        Всего сессий и успешно завершенных (с записью) за период
+
+        Оба числа считаются одним проходом (COUNT ... FILTER). Результат
+        кэшируется в памяти процесса на CONVERSION_CACHE_TTL_SECONDS:
+        конверсия меняется медленно, а дашборды опрашивают ее часто.
+
+        Returns:
+            (total, completed)
+        """
+        cache_key = (str(company_id), days)
+        now = time.monotonic()
+        cached = _conversion_cache.get(cache_key)
+        if cached is not None and now - cached[1] < CONVERSION_CACHE_TTL_SECONDS:
+            return cached[0]
+
         start_date = datetime.now(timezone.utc) - timedelta(days=days)
 
-        query = select(func.count(SessionModel.id)).where(and_(
+        query = select(
+            func.count().label("total"),
+            func.count().filter(and_(
+                SessionModel.state == "COMPLETED",
+                SessionModel.crm_appointment_id.isnot(None),
+            )).label("completed"),
+        ).where(and_(
             SessionModel.company_id == company_id,
-            SessionModel.state == "COMPLETED",
-            SessionModel.crm_appointment_id.isnot(None),
             SessionModel.created_at >= start_date
         ))
 
         result = await self.session.execute(query)
-        return result.scalar() or 0
+        row = result.one()
+        stats = (row.total or 0, row.completed or 0)
+
+        _conversion_cache.pop(cache_key, None)
+        if len(_conversion_cache) >= CONVERSION_CACHE_MAX_SIZE:
+            # Вытесняем самую старую запись
+            _conversion_cache.pop(next(iter(_conversion_cache)))
+        _conversion_cache[cache_key] = (stats, now)
+
+        return stats
+
+    async def get_completed_sessions_count(
+        self,
+        company_id: str,
+        days: int = 30,
+    ) -> int:
+        """Количество успешно завершенных сессий (с записью)"""
+        _, completed = await self.get_conversion_stats(company_id, days)
+        return completed
 
     async def get_conversion_rate(
         self,
@@ -383,27 +576,11 @@ class SessionRepository:
         Returns:
             Процент конверсии (0.0 - 100.0)
         """
-        start_date = datetime.now(timezone.utc) - timedelta(days=days)
-
-        total_query = select(func.count(SessionModel.id)).where(and_(
-            SessionModel.company_id == company_id,
-            SessionModel.created_at >= start_date
-        ))
-        total_result = await self.session.execute(total_query)
-        total = total_result.scalar() or 0
+        total, completed = await self.get_conversion_stats(company_id, days)
 
         if total == 0:
             return 0.0
 
-        completed_query = select(func.count(SessionModel.id)).where(and_(
-            SessionModel.company_id == company_id,
-            SessionModel.state == "COMPLETED",
-            SessionModel.crm_appointment_id.isnot(None),
-            SessionModel.created_at >= start_date
-        ))
-        completed_result = await self.session.execute(completed_query)
-        completed = completed_result.scalar() or 0
-
         return round((completed / total) * 100, 2)
 
     # ========================================
@@ -414,37 +591,34 @@ class SessionRepository:
         self,
         company_id: str,
         retention_days: int,
+        batch_size: int = 1000,
     ) -> int:
         """
         Удалить сессии старше указанного срока
 
         ВАЖНО: Сообщения удаляются каскадно (ON DELETE CASCADE)
 
+        Удаление идет пачками по batch_size сессий в транзакции текущей
+        сессии (commit делает вызывающий код), см. delete_old_sessions_batch.
+
         Args:
             company_id: ID компании
             retention_days: Хранить сессии не старше N дней
+            batch_size: Сессий в одном DELETE
 
         Returns:
             Количество удаленных сессий
         """
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=retention_days)
 
-        # Подсчитаем сначала
-        count_query = select(func.count(SessionModel.id)).where(and_(
-            SessionModel.company_id == company_id,
-            SessionModel.last_activity_at < cutoff_date
-        ))
-        count_result = await self.session.execute(count_query)
-        count = count_result.scalar() or 0
+        count = 0
+        while True:
+            deleted = await self.delete_old_sessions_batch(company_id, cutoff_date, batch_size)
+            count += deleted
+            if deleted < batch_size:
+                break
 
         if count > 0:
-            # Удаляем (сообщения удалятся каскадно)
-            delete_query = delete(SessionModel).where(and_(
-                SessionModel.company_id == company_id,
-                SessionModel.last_activity_at < cutoff_date
-            ))
-            await self.session.execute(delete_query)
-
             logger.info(
                 "old_sessions_deleted",
                 company_id=company_id,
@@ -454,6 +628,33 @@ class SessionRepository:
 
         return count
 
+    async def delete_old_sessions_batch(
+        self,
+        company_id: str,
+        cutoff_date: datetime,
+        batch_size: int,
+    ) -> int:
+        """
+        Удалить одну пачку сессий, неактивных с cutoff_date
+
+        Returns:
+            Количество удаленных сессий (< batch_size - удалять больше нечего)
+        """
+        batch = (
+            select(SessionModel.id)
+            .where(and_(
+                SessionModel.company_id == company_id,
+                SessionModel.last_activity_at < cutoff_date
+            ))
+            .order_by(SessionModel.last_activity_at)
+            .limit(batch_size)
+        )
+        # Сообщения удалятся каскадно
+        result = await self.session.execute(
+            delete(SessionModel).where(SessionModel.id.in_(batch))
+        )
+        return result.rowcount
+
     async def delete_all_company_sessions(self, company_id: str) -> int:
         """
         Удалить все сессии компании (для GDPR compliance)
@@ -464,18 +665,13 @@ class SessionRepository:
         Returns:
             Количество удаленных сессий
         """
-        count_query = select(func.count(SessionModel.id)).where(
+        delete_query = delete(SessionModel).where(
             SessionModel.company_id == company_id
         )
-        count_result = await self.session.execute(count_query)
-        count = count_result.scalar() or 0
+        result = await self.session.execute(delete_query)
+        count = result.rowcount
 
         if count > 0:
-            delete_query = delete(SessionModel).where(
-                SessionModel.company_id == company_id
-            )
-            await self.session.execute(delete_query)
-
             logger.warning(
                 "all_company_sessions_deleted",
                 company_id=company_id,
@@ -0,0 +1,181 @@
+"""
+Session State Buffer - отложенная запись состояния сессий в PostgreSQL
+
+Каждое сообщение диалога обновляет state/context/last_activity_at сессии.
+Вместо UPDATE на каждое сообщение последнее состояние пишется в Redis,
+а фоновая задача раз в flush_interval переносит накопленные сессии
+в PostgreSQL одним UPDATE ... FROM (VALUES ...).
+
+Ключи Redis:
+- session:{id}:state - JSON с последним состоянием (TTL STATE_TTL_SECONDS)
+- sessions:dirty - множество ID сессий, ожидающих записи
+
+Состояние, не успевшее попасть в PostgreSQL, живет в Redis: при падении
+процесса оно будет записано следующим экземпляром, при потере Redis -
+потеряно (последние секунды активности).
+"""
+
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple
+from uuid import UUID
+
+import redis.asyncio as aioredis
+import structlog
+
+from ..database.connection import Database
+from ..utils.ids import to_uuid
+from .session_repository import SessionRepository
+
+
+logger = structlog.get_logger(__name__)
+
+DIRTY_SESSIONS_KEY = "sessions:dirty"
+
+# Как долго хранить состояние в Redis (с запасом на недоступность PostgreSQL)
+STATE_TTL_SECONDS = 3600
+
+
+def _state_key(session_id: str) -> str:
+    """Ключ последнего состояния сессии в Redis"""
+    return f"session:{session_id}:state"
+
+
+class SessionStateBuffer:
+    """
+    Буфер обновлений состояния сессий (Redis -> пакетный UPDATE в PostgreSQL)
+
+    Usage:
+        buffer = SessionStateBuffer(redis, database)
+        buffer.start()
+        await buffer.update_session_state(session_id, state, context)
+        ...
+        await buffer.stop()  # дописывает оставшееся
+    """
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        database: Database,
+        flush_interval: float = 5.0,
+        batch_size: int = 500,
+    ):
+        """
+        Args:
+            redis: Клиент Redis (decode_responses=True)
+            database: Database для записи в PostgreSQL
+            flush_interval: Период записи в PostgreSQL, секунды
+            batch_size: Максимум сессий в одном UPDATE
+        """
+        self.redis = redis
+        self.database = database
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def update_session_state(
+        self,
+        session_id: str,
+        state: str,
+        context: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        Запомнить новое состояние сессии (запись в PostgreSQL отложена)
+
+        Args:
+            session_id: ID сессии
+            state: Новое состояние
+            context: Обновленный контекст (None - не менять)
+
+        Returns:
+            True если состояние принято буфером. False - Redis недоступен,
+            вызывающий код должен записать состояние напрямую
+        """
+        payload = json.dumps({
+            "state": state,
+            "context": context,
+            "ts": datetime.now(timezone.utc).isoformat(),
+        })
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(_state_key(session_id), payload, ex=STATE_TTL_SECONDS)
+                pipe.sadd(DIRTY_SESSIONS_KEY, str(session_id))
+                await pipe.execute()
+        except aioredis.RedisError as e:
+            logger.warning("session_state_buffer_unavailable", session_id=str(session_id), error=str(e))
+            return False
+
+        return True
+
+    async def flush(self) -> int:
+        """
+        Записать накопленные состояния в PostgreSQL
+
+        Returns:
+            Количество обновленных сессий
+        """
+        total = 0
+
+        while True:
+            session_ids: List[str] = await self.redis.spop(DIRTY_SESSIONS_KEY, self.batch_size)
+            if not session_ids:
+                break
+
+            payloads = await self.redis.mget([_state_key(session_id) for session_id in session_ids])
+
+            updates: List[Tuple[UUID, str, Optional[Dict[str, Any]], datetime]] = []
+            for session_id, payload in zip(session_ids, payloads):
+                # Ключ истек по TTL - записывать нечего
+                if payload is None:
+                    continue
+                data = json.loads(payload)
+                updates.append((
+                    to_uuid(session_id),
+                    data["state"],
+                    data["context"],
+                    datetime.fromisoformat(data["ts"]),
+                ))
+
+            try:
+                async with self.database.session() as session:
+                    total += await SessionRepository(session).update_session_states_bulk(updates)
+            except Exception:
+                # Вернуть сессии в очередь: запишутся при следующем flush
+                await self.redis.sadd(DIRTY_SESSIONS_KEY, *session_ids)
+                raise
+
+            if len(session_ids) < self.batch_size:
+                break
+
+        if total:
+            logger.debug("session_states_flushed", count=total)
+
+        return total
+
+    def start(self) -> None:
+        """Запустить фоновую запись"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановить фоновую запись и дописать оставшиеся состояния"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self.flush()
+
+    async def _run(self) -> None:
+        """Цикл фоновой записи"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("session_states_flush_failed", error=str(e), exc_info=True)
@@ -3,5 +3,14 @@ Shared utilities
 """
 
 from .crypto import CryptoService, get_crypto_service
+from .ids import to_uuid
+from .pagination import Cursor, encode_cursor, decode_cursor
 
-__all__ = ["CryptoService", "get_crypto_service"]
+__all__ = [
+    "CryptoService",
+    "get_crypto_service",
+    "to_uuid",
+    "Cursor",
+    "encode_cursor",
+    "decode_cursor",
+]
@@ -1,28 +1,119 @@
 """
 Cryptographic utilities for secure API key storage
 
-Uses Fernet symmetric encryption (AES-128-CBC with HMAC-SHA256)
+Uses AES-256-GCM authenticated encryption. Values encrypted by earlier
+versions with Fernet (AES-128-CBC with HMAC-SHA256) are still decrypted.
 """
 
 import os
 import base64
-from typing import Optional
+import binascii
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet, InvalidToken
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 import structlog
 
+try:
+    # Optional: end-to-end Rust Fernet implementation (same token format)
+    import rfernet
+except ImportError:
+    rfernet = None
+
 logger = structlog.get_logger(__name__)
 
+# Set USE_RFERNET=false to force pyca Fernet even when rfernet is installed
+USE_RFERNET = os.getenv("USE_RFERNET", "true").lower() not in ("0", "false", "no")
+
+# Use a fixed salt for deterministic key derivation
+# In production, you might want to use a per-installation salt
+_KDF_SALT = b"ai-admin-salt-v1"
+_KDF_ITERATIONS = 480000  # OWASP recommended minimum for PBKDF2-SHA256
+
+# Derived key material: sha256(master_key, salt, iterations) -> (raw key, Fernet key).
+# PBKDF2 and the base64 step run once per master key per process,
+# not once per CryptoService
+_derived_key_cache: Dict[bytes, Tuple[bytes, bytes]] = {}
+_derived_key_lock = threading.Lock()
+
+# Standard -> urlsafe base64 alphabet
+_URLSAFE_B64_TABLE = bytes.maketrans(b"+/", b"-_")
+
+# Token format: _AESGCM_PREFIX + urlsafe_b64(nonce || ciphertext || tag)
+_AESGCM_PREFIX = "aesgcm1:"
+_AESGCM_PREFIX_BYTES = _AESGCM_PREFIX.encode()
+_AESGCM_NONCE_SIZE = 12
+# Separates the AES-GCM key from the Fernet key derived from the same master key
+_AESGCM_KEY_INFO = b"ai-admin-aesgcm-v1"
+
+# Decrypted values are kept in memory for a bounded time and count
+DECRYPT_CACHE_TTL_SECONDS = 300
+DECRYPT_CACHE_MAX_SIZE = 1024
+
+# Legacy Fernet tokens are base64 of version byte 0x80 + timestamp
+_FERNET_PREFIX = "gAAAAA"
+
+_ENCRYPTED_PREFIXES = (_AESGCM_PREFIX, _FERNET_PREFIX)
+_ENCRYPTED_PREFIXES_BYTES = tuple(prefix.encode() for prefix in _ENCRYPTED_PREFIXES)
+
+
+def _derive_key_material(
+    master_key: str,
+    salt: bytes = _KDF_SALT,
+    iterations: int = _KDF_ITERATIONS,
+) -> Tuple[bytes, bytes]:
+    """
+    Derive key material from the master key (cached)
+
+    Uses PBKDF2 to derive a proper encryption key from the master key
+
+    Returns:
+        (raw 32-byte key, the same key as urlsafe-base64 for Fernet)
+    """
+    cache_key = hashlib.sha256(
+        master_key.encode() + b"\0" + salt + b"\0" + str(iterations).encode()
+    ).digest()
+
+    with _derived_key_lock:
+        material = _derived_key_cache.get(cache_key)
+        if material is None:
+            secret = bytearray(master_key.encode())
+            try:
+                raw = hashlib.pbkdf2_hmac("sha256", secret, salt, iterations, dklen=32)
+            finally:
+                _zeroize(secret)
+            fernet_key = binascii.b2a_base64(raw, newline=False).translate(_URLSAFE_B64_TABLE)
+            material = (raw, fernet_key)
+            _derived_key_cache[cache_key] = material
+
+    return material
+
+
+def _derive_key(master_key: str, salt: bytes = _KDF_SALT, iterations: int = _KDF_ITERATIONS) -> bytes:
+    """Derive a urlsafe-base64 Fernet key from the master key (cached)"""
+    return _derive_key_material(master_key, salt, iterations)[1]
+
+
+def _zeroize(buffer: bytearray) -> None:
+    """Overwrite a mutable buffer holding key material in place"""
+    buffer[:] = bytes(len(buffer))
+
 
 class CryptoService:
     """
     Service for encrypting and decrypting sensitive data (API keys, etc.)
 
-    Uses Fernet symmetric encryption which provides:
-    - AES-128-CBC encryption
-    - HMAC-SHA256 authentication
-    - Automatic IV generation
+    Uses AES-256-GCM which provides:
+    - Authenticated encryption in a single pass (AES-NI / PCLMULQDQ)
+    - Random 96-bit nonce per value
+
+    Fernet tokens (gAAAAA...) written by earlier versions are still
+    decrypted; encrypt_if_needed re-encrypts them with AES-GCM.
 
     Usage:
         crypto = CryptoService(master_key="your-secret-master-key")
@@ -38,37 +129,33 @@ class CryptoService:
             master_key: Master encryption key. If not provided, uses
                        ENCRYPTION_MASTER_KEY environment variable
         """
-        self._master_key = master_key or os.getenv("ENCRYPTION_MASTER_KEY")
+        master_key = master_key or os.getenv("ENCRYPTION_MASTER_KEY")
 
-        if not self._master_key:
+        if not master_key:
             raise ValueError(
                 "ENCRYPTION_MASTER_KEY is required. "
                 "Set it via environment variable or pass to constructor."
             )
 
-        self._fernet = self._create_fernet(self._master_key)
+        # Only the ciphers are kept; the master key is not stored on the instance
+        raw_key, fernet_key = _derive_key_material(master_key)
+        self._fernet = self._create_fernet(fernet_key)
+        self._aead = AESGCM(hmac.new(raw_key, _AESGCM_KEY_INFO, hashlib.sha256).digest())
+        # ciphertext -> (plaintext, expires_at monotonic), LRU order
+        self._decrypt_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._decrypt_cache_lock = threading.Lock()
         logger.info("crypto_service_initialized")
 
-    def _create_fernet(self, master_key: str) -> Fernet:
+    def _create_fernet(self, key: bytes):
         """
-        Create Fernet cipher from master key
+        Create Fernet cipher from the derived key (legacy tokens only)
 
-        Uses PBKDF2 to derive a proper encryption key from the master key
+        The key comes from the cached PBKDF2 derivation (see _derive_key_material).
+        Uses rfernet when installed and USE_RFERNET is enabled; both
+        implement the Fernet spec, so tokens are interchangeable.
         """
-        # Use a fixed salt for deterministic key derivation
-        # In production, you might want to use a per-installation salt
-        salt = b"ai-admin-salt-v1"
-
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=480000,  # OWASP recommended minimum for PBKDF2-SHA256
-        )
-
-        # Derive key from master_key
-        key = base64.urlsafe_b64encode(kdf.derive(master_key.encode()))
-
+        if rfernet is not None and USE_RFERNET:
+            return rfernet.Fernet(key.decode())
         return Fernet(key)
 
     def encrypt(self, plaintext: str) -> str:
@@ -79,14 +166,30 @@ class CryptoService:
             plaintext: String to encrypt
 
         Returns:
-            Base64-encoded encrypted string
+            _AESGCM_PREFIX + base64-encoded nonce and ciphertext
         """
         if not plaintext:
             return ""
 
+        return self.encrypt_bytes(plaintext.encode()).decode()
+
+    def encrypt_bytes(self, plaintext: bytes) -> bytes:
+        """
+        Encrypt bytes without str conversions
+
+        Args:
+            plaintext: Bytes to encrypt
+
+        Returns:
+            Token bytes (same format as encrypt)
+        """
+        if not plaintext:
+            return b""
+
         try:
-            encrypted = self._fernet.encrypt(plaintext.encode())
-            return encrypted.decode()
+            nonce = os.urandom(_AESGCM_NONCE_SIZE)
+            encrypted = self._aead.encrypt(nonce, plaintext, None)
+            return _AESGCM_PREFIX_BYTES + base64.urlsafe_b64encode(nonce + encrypted)
         except Exception as e:
             logger.error("encryption_failed", error=str(e))
             raise
@@ -95,8 +198,12 @@ class CryptoService:
         """
         Decrypt a string
 
+        The same ciphertext (e.g. a CRM API key read on every request) is
+        decrypted once per DECRYPT_CACHE_TTL_SECONDS; at most
+        DECRYPT_CACHE_MAX_SIZE plaintexts are held in memory.
+
         Args:
-            ciphertext: Base64-encoded encrypted string
+            ciphertext: Value returned by encrypt (or a legacy Fernet token)
 
         Returns:
             Decrypted plaintext string
@@ -107,9 +214,59 @@ class CryptoService:
         if not ciphertext:
             return ""
 
+        now = time.monotonic()
+        with self._decrypt_cache_lock:
+            cached = self._decrypt_cache.get(ciphertext)
+            if cached is not None:
+                if cached[1] > now:
+                    self._decrypt_cache.move_to_end(ciphertext)
+                    return cached[0]
+                del self._decrypt_cache[ciphertext]
+
+        plaintext = self._decrypt_uncached(ciphertext)
+
+        with self._decrypt_cache_lock:
+            self._decrypt_cache[ciphertext] = (plaintext, now + DECRYPT_CACHE_TTL_SECONDS)
+            if len(self._decrypt_cache) > DECRYPT_CACHE_MAX_SIZE:
+                self._decrypt_cache.popitem(last=False)
+
+        return plaintext
+
+    def clear_decrypt_cache(self) -> None:
+        """Drop all cached plaintexts (e.g. after key rotation)"""
+        with self._decrypt_cache_lock:
+            self._decrypt_cache.clear()
+
+    def _decrypt_uncached(self, ciphertext: str) -> str:
+        """Decrypt a string without the cache"""
+        return self.decrypt_bytes(ciphertext.encode()).decode()
+
+    def decrypt_bytes(self, ciphertext: bytes) -> bytes:
+        """
+        Decrypt a token given as bytes, without str conversions or caching
+
+        Args:
+            ciphertext: Token bytes (from encrypt_bytes, encrypt or legacy Fernet)
+
+        Returns:
+            Decrypted bytes
+
+        Raises:
+            InvalidToken: If decryption fails (wrong key or corrupted data)
+        """
+        if not ciphertext:
+            return b""
+
         try:
-            decrypted = self._fernet.decrypt(ciphertext.encode())
-            return decrypted.decode()
+            if ciphertext.startswith(_AESGCM_PREFIX_BYTES):
+                try:
+                    data = base64.urlsafe_b64decode(ciphertext[len(_AESGCM_PREFIX_BYTES):])
+                    return self._aead.decrypt(
+                        data[:_AESGCM_NONCE_SIZE], data[_AESGCM_NONCE_SIZE:], None
+                    )
+                except (InvalidTag, binascii.Error, ValueError) as e:
+                    raise InvalidToken from e
+            return self._decrypt_fernet(ciphertext)
         except InvalidToken:
             logger.error("decryption_failed", reason="invalid_token")
             raise
@@ -117,6 +274,15 @@ class CryptoService:
             logger.error("decryption_failed", error=str(e))
             raise
 
+    def _decrypt_fernet(self, ciphertext: bytes) -> bytes:
+        """Decrypt a legacy Fernet token (pyca or rfernet backend)"""
+        if isinstance(self._fernet, Fernet):
+            return self._fernet.decrypt(ciphertext)
+        try:
+            return bytes(self._fernet.decrypt(ciphertext.decode()))
+        except rfernet.DecryptionError as e:
+            raise InvalidToken from e
+
     def is_encrypted(self, value: str) -> bool:
         """
         Check if a value appears to be encrypted
@@ -125,32 +291,47 @@ class CryptoService:
             value: String to check
 
         Returns:
-            True if value looks like Fernet-encrypted data
+            True if value looks like AES-GCM or legacy Fernet encrypted data
         """
-        if not value:
-            return False
+        return bool(value) and value.startswith(_ENCRYPTED_PREFIXES)
 
-        # Fernet tokens are base64-encoded and start with 'gAAAAA'
-        try:
-            if value.startswith("gAAAAA"):
-                return True
-            return False
-        except Exception:
-            return False
+    @staticmethod
+    def is_encrypted_bytes(value: bytes) -> bool:
+        """
+        Check if a bytes value appears to be encrypted (see is_encrypted)
+
+        Args:
+            value: Bytes to check
+
+        Returns:
+            True if value looks like AES-GCM or legacy Fernet encrypted data
+        """
+        return bool(value) and value.startswith(_ENCRYPTED_PREFIXES_BYTES)
 
     def encrypt_if_needed(self, value: str) -> str:
         """
         Encrypt value only if it's not already encrypted
 
+        Legacy Fernet tokens are re-encrypted with AES-GCM, so values pass
+        through here migrate to the new format on their next write.
+
         Args:
             value: String to encrypt
 
         Returns:
             Encrypted string
         """
-        if self.is_encrypted(value):
-            return value
-        return self.encrypt(value)
+        if not self.is_encrypted(value):
+            return self.encrypt(value)
+
+        if value.startswith(_FERNET_PREFIX):
+            try:
+                return self.encrypt(self.decrypt(value))
+            except InvalidToken:
+                # Not decryptable with this key - leave it untouched
+                return value
+
+        return value
 
     @staticmethod
     def generate_master_key() -> str:
@@ -165,6 +346,7 @@ class CryptoService:
 
 # Singleton instance
 _crypto_service: Optional[CryptoService] = None
+_crypto_service_lock = threading.Lock()
 
 
 def get_crypto_service(master_key: Optional[str] = None) -> CryptoService:
@@ -180,6 +362,9 @@ def get_crypto_service(master_key: Optional[str] = None) -> CryptoService:
     global _crypto_service
 
     if _crypto_service is None:
-        _crypto_service = CryptoService(master_key)
+        # Threads racing on first access must not each build an instance
+        with _crypto_service_lock:
+            if _crypto_service is None:
+                _crypto_service = CryptoService(master_key)
 
     return _crypto_service
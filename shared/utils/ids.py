@@ -0,0 +1,31 @@
+"""
+Преобразование идентификаторов
+
+Колонки ID в БД - UUID. Репозитории принимают ID как str или UUID
+и приводят их к UUID один раз, до построения запроса: параметр уходит
+в asyncpg в бинарном формате uuid, без текстового приведения.
+"""
+
+from functools import lru_cache
+from typing import Union
+from uuid import UUID
+
+
+@lru_cache(maxsize=4096)
+def _parse_uuid(value: str) -> UUID:
+    return UUID(value)
+
+
+def to_uuid(value: Union[str, UUID]) -> UUID:
+    """
+    Привести ID к UUID
+
+    Строки разбираются через кэш: одни и те же session_id/company_id
+    приходят на каждое сообщение диалога.
+
+    Raises:
+        ValueError: Если строка не является UUID
+    """
+    if isinstance(value, UUID):
+        return value
+    return _parse_uuid(str(value))
@@ -3,24 +3,89 @@ Telegram Bot handlers
 """
 
 import logging
+import re
+from functools import lru_cache
+from typing import Tuple
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.storage.redis import RedisStorage
 
-from .config import settings
-from .gateway_client import gateway_client
+from .config import get_settings
+from .gateway_client import get_gateway_client
 from .keyboards import (
     create_time_slots_keyboard,
     create_services_keyboard,
     create_confirmation_keyboard,
+    unpack_slot_datetime,
+    unpack_slot_uuids,
 )
 
 logger = logging.getLogger(__name__)
 
+# Форматы callback_data (разбираются фильтром при регистрации handler'а).
+# Слот (см. keyboards.slot_callback_data): su:{все поля упакованы},
+# s:{дата и время упакованы}:... или полный slot:{date}:{time}:...
+# Время само содержит ":", поэтому employee_id и service_id
+# берутся с конца строки
+SLOT_CALLBACK_RE = re.compile(
+    r"^(?:su:(?P<uuids>[A-Za-z0-9_-]{51})"
+    r"|(?:s:(?P<packed>[A-Za-z0-9_-]{8})|slot:(?P<date>[^:]+):(?P<time>.+))"
+    r":(?P<employee_id>[^:]*):(?P<service_id>[^:]*))$"
+)
+SERVICE_CALLBACK_RE = re.compile(r"^service:(?P<service_id>.+)$")
+
+# Фильтры handlers (собираются один раз при импорте).
+# Команды ("/...") не попадают в handle_text_message
+TEXT_MESSAGE_FILTER = F.text & ~F.text.startswith("/")
+# match передается в handler как slot / service
+SLOT_CALLBACK_FILTER = F.data.regexp(SLOT_CALLBACK_RE).as_("slot")
+SERVICE_CALLBACK_FILTER = F.data.regexp(SERVICE_CALLBACK_RE).as_("service")
+MALFORMED_CALLBACK_FILTER = F.data.startswith(("su:", "s:", "slot:", "service:"))
+
+
+# Команды меню бота (создаются один раз при импорте)
+BOT_COMMANDS = [
+    types.BotCommand(command="start", description="Начать диалог"),
+    types.BotCommand(command="help", description="Помощь"),
+]
+
+
+def parse_slot_callback(slot: re.Match) -> Tuple[str, str, str, str]:
+    """
+    Поля слота из результата SLOT_CALLBACK_RE
+
+    Returns:
+        (date, time, employee_id, service_id)
+
+    Raises:
+        ValueError: Если упакованные данные повреждены
+    """
+    uuids, packed, date, time, employee_id, service_id = slot.group(
+        "uuids", "packed", "date", "time", "employee_id", "service_id"
+    )
+    if uuids is not None:
+        return unpack_slot_uuids(uuids)
+    if packed is not None:
+        date, time = unpack_slot_datetime(packed)
+    return date, time, employee_id, service_id
+
+
+def _debug_traceback() -> bool:
+    """
+    Писать traceback в лог только на уровне DEBUG
+
+    Форматирование traceback дорогое, а при массовых ошибках
+    (например, недоступен Gateway) логируется каждое сообщение.
+    """
+    return logger.isEnabledFor(logging.DEBUG)
+
 
 async def cmd_start(message: Message):
     """Обработчик команды /start"""
+    settings = get_settings()
+    gateway_client = get_gateway_client()
+
     welcome_text = (
         "👋 Здравствуйте! Я AI-администратор.\n\n"
         "Я помогу вам записаться на услуги, проконсультирую "
@@ -42,7 +107,7 @@ async def cmd_start(message: Message):
                 message_id=message.message_id
             )
     except Exception as e:
-        logger.error(f"Ошибка при отправке /start в Gateway: {e}")
+        logger.error("Ошибка при отправке /start в Gateway: %s", e)
 
 
 async def cmd_help(message: Message):
@@ -62,6 +127,9 @@ async def handle_text_message(message: Message):
 
     Отправляет сообщение в API Gateway и возвращает ответ пользователю
     """
+    settings = get_settings()
+    gateway_client = get_gateway_client()
+
     if not settings.webhook_token:
         await message.answer(
             "⚠️ Бот не настроен (отсутствует webhook_token). "
@@ -77,8 +145,9 @@ async def handle_text_message(message: Message):
         )
 
         logger.info(
-            f"Получено сообщение от пользователя {message.from_user.id}: "
-            f"'{message.text}'"
+            "Получено сообщение от пользователя %s: '%s'",
+            message.from_user.id,
+            message.text,
         )
 
         # Отправляем в API Gateway
@@ -95,39 +164,37 @@ async def handle_text_message(message: Message):
         # Проверяем наличие ответа от AI агента
         if response and "response" in response:
             ai_response = response["response"]
-            logger.info(f"Ответ от AI: '{ai_response}'")
+            logger.info("Ответ от AI: '%s'", ai_response)
             await message.answer(ai_response)
         else:
-            logger.warning(f"Неожиданный формат ответа: {response}")
+            logger.warning("Неожиданный формат ответа: %s", response)
             await message.answer(
                 "✅ Ваше сообщение принято в обработку!"
             )
 
     except Exception as e:
-        logger.error(f"Ошибка при обработке сообщения: {e}", exc_info=True)
+        logger.error("Ошибка при обработке сообщения: %s", e, exc_info=_debug_traceback())
         await message.answer(
             "❌ Произошла ошибка при обработке вашего сообщения. "
             "Пожалуйста, попробуйте позже."
         )
 
 
-async def handle_slot_callback(callback: CallbackQuery):
+async def handle_slot_callback(callback: CallbackQuery, slot: re.Match):
     """
     Обработчик выбора слота времени
 
-    callback_data формат: slot:{date}:{time}:{employee_id}:{service_id}
+    callback_data формат: su:{packed}, s:{packed}:{employee_id}:{service_id}
+    или slot:{date}:{time}:{employee_id}:{service_id}
+    (slot - результат SLOT_CALLBACK_RE)
     """
+    settings = get_settings()
+    gateway_client = get_gateway_client()
+
     await callback.answer()
 
     try:
-        parts = callback.data.split(":")
-        if len(parts) < 5:
-            await callback.message.edit_text(
-                "❌ Ошибка: неверный формат данных слота"
-            )
-            return
-
-        _, date, time, employee_id, service_id = parts[:5]
+        date, time, employee_id, service_id = parse_slot_callback(slot)
 
         # Формируем сообщение подтверждения
         confirmation_text = (
@@ -160,29 +227,26 @@ async def handle_slot_callback(callback: CallbackQuery):
             )
 
     except Exception as e:
-        logger.error(f"Ошибка обработки слота: {e}", exc_info=True)
+        logger.error("Ошибка обработки слота: %s", e, exc_info=_debug_traceback())
         await callback.message.edit_text(
             "❌ Произошла ошибка. Попробуйте еще раз."
         )
 
 
-async def handle_service_callback(callback: CallbackQuery):
+async def handle_service_callback(callback: CallbackQuery, service: re.Match):
     """
     Обработчик выбора услуги
 
     callback_data формат: service:{service_id}
+    (service - результат SERVICE_CALLBACK_RE)
     """
+    settings = get_settings()
+    gateway_client = get_gateway_client()
+
     await callback.answer()
 
     try:
-        parts = callback.data.split(":")
-        if len(parts) < 2:
-            await callback.message.edit_text(
-                "❌ Ошибка: неверный формат данных"
-            )
-            return
-
-        service_id = parts[1]
+        service_id = service.group("service_id")
 
         await callback.message.edit_text(
             "⏳ Загружаю доступное время..."
@@ -204,7 +268,7 @@ async def handle_service_callback(callback: CallbackQuery):
                 await callback.message.edit_text(response["response"])
 
     except Exception as e:
-        logger.error(f"Ошибка обработки услуги: {e}", exc_info=True)
+        logger.error("Ошибка обработки услуги: %s", e, exc_info=_debug_traceback())
         await callback.message.edit_text(
             "❌ Произошла ошибка. Попробуйте еще раз."
         )
@@ -212,6 +276,9 @@ async def handle_service_callback(callback: CallbackQuery):
 
 async def handle_confirm_callback(callback: CallbackQuery):
     """Обработчик подтверждения записи"""
+    settings = get_settings()
+    gateway_client = get_gateway_client()
+
     await callback.answer("✅ Запись подтверждена!")
 
     try:
@@ -236,13 +303,22 @@ async def handle_confirm_callback(callback: CallbackQuery):
                 )
 
     except Exception as e:
-        logger.error(f"Ошибка подтверждения: {e}", exc_info=True)
+        logger.error("Ошибка подтверждения: %s", e, exc_info=_debug_traceback())
         await callback.message.edit_text(
             "❌ Произошла ошибка при подтверждении. "
             "Пожалуйста, свяжитесь с нами напрямую."
         )
 
 
+async def handle_malformed_callback(callback: CallbackQuery):
+    """Обработчик callback_data su:/s:/slot:/service: неверного формата"""
+    await callback.answer()
+
+    await callback.message.edit_text(
+        "❌ Ошибка: неверный формат данных"
+    )
+
+
 async def handle_cancel_callback(callback: CallbackQuery):
     """Обработчик отмены"""
     await callback.answer("Отменено")
@@ -261,17 +337,20 @@ def setup_handlers(dp: Dispatcher):
     dp.message.register(cmd_help, Command("help"))
 
     # Текстовые сообщения
-    dp.message.register(handle_text_message, F.text)
+    dp.message.register(handle_text_message, TEXT_MESSAGE_FILTER)
 
     # Callback queries (inline кнопки)
-    dp.callback_query.register(handle_slot_callback, F.data.startswith("slot:"))
-    dp.callback_query.register(handle_service_callback, F.data.startswith("service:"))
+    dp.callback_query.register(handle_slot_callback, SLOT_CALLBACK_FILTER)
+    dp.callback_query.register(handle_service_callback, SERVICE_CALLBACK_FILTER)
     dp.callback_query.register(handle_confirm_callback, F.data == "confirm_booking")
     dp.callback_query.register(handle_cancel_callback, F.data == "cancel_booking")
+    dp.callback_query.register(handle_malformed_callback, MALFORMED_CALLBACK_FILTER)
 
 
 async def on_startup(bot: Bot):
     """Вызывается при запуске бота"""
+    gateway_client = get_gateway_client()
+
     logger.info("Бот запущен")
 
     # Проверяем доступность API Gateway
@@ -281,20 +360,26 @@ async def on_startup(bot: Bot):
         logger.warning("⚠️ API Gateway недоступен")
 
     # Устанавливаем команды бота
-    await bot.set_my_commands([
-        types.BotCommand(command="start", description="Начать диалог"),
-        types.BotCommand(command="help", description="Помощь"),
-    ])
+    await bot.set_my_commands(BOT_COMMANDS)
 
 
 async def on_shutdown(bot: Bot):
     """Вызывается при остановке бота"""
+    gateway_client = get_gateway_client()
+
     logger.info("Бот остановлен")
     await gateway_client.close()
 
 
+@lru_cache(maxsize=1)
 def create_bot_and_dispatcher() -> tuple[Bot, Dispatcher]:
-    """Создает и настраивает бота и диспетчер"""
+    """
+    Создает и настраивает бота и диспетчер
+
+    Результат кэшируется на процесс: Bot, storage и Dispatcher
+    с зарегистрированными handlers создаются один раз.
+    """
+    settings = get_settings()
 
     # Создаем бота
     bot = Bot(token=settings.telegram_bot_token)
@@ -302,9 +387,9 @@ def create_bot_and_dispatcher() -> tuple[Bot, Dispatcher]:
     # Создаем Redis storage для FSM (если нужно)
     try:
         storage = RedisStorage.from_url(settings.redis_url)
-        logger.info(f"Используется Redis storage: {settings.redis_url}")
+        logger.info("Используется Redis storage: %s", settings.redis_url)
     except Exception as e:
-        logger.warning(f"Не удалось подключиться к Redis: {e}. Используется MemoryStorage")
+        logger.warning("Не удалось подключиться к Redis: %s. Используется MemoryStorage", e)
         from aiogram.fsm.storage.memory import MemoryStorage
         storage = MemoryStorage()
 
@@ -2,6 +2,8 @@
 Конфигурация Telegram бота
 """
 
+from functools import cached_property, lru_cache
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -26,6 +28,14 @@ class Settings(BaseSettings):
         default="http://localhost:8000",
         description="URL API Gateway"
     )
+    gateway_batching: bool = Field(
+        default=False,
+        description=(
+            "Объединять одновременные сообщения в пакеты для API Gateway. "
+            "Ответы пакета приходят вместе - каждый пользователь ждет самый "
+            "медленный ответ AI"
+        )
+    )
 
     # Webhook (для production)
     webhook_url: str | None = Field(
@@ -64,13 +74,20 @@ class Settings(BaseSettings):
     # Logging
     log_level: str = Field(default="INFO", description="Logging level")
 
-    @property
+    @cached_property
     def redis_url(self) -> str:
-        """Собирает Redis URL из компонентов"""
+        """Собирает Redis URL из компонентов (один раз - настройки не меняются)"""
         if self.redis_password:
             return f"redis://:{self.redis_password}@{self.redis_host}:{self.redis_port}/{self.redis_db}"
         return f"redis://{self.redis_host}:{self.redis_port}/{self.redis_db}"
 
 
-# Global settings instance
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Настройки бота (создаются и валидируются при первом вызове)
+
+    Не при импорте модуля: тесты успевают подставить переменные окружения,
+    а импорт handlers не требует полной конфигурации.
+    """
+    return Settings()
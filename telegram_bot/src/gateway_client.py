@@ -2,25 +2,153 @@
 HTTP клиент для взаимодействия с API Gateway
 """
 
+import asyncio
 import logging
-from typing import Dict, Any
-import httpx
-from datetime import datetime, timezone
+from functools import lru_cache
+from time import time as _time
+from typing import Dict, Any, List, Optional, Set, Tuple
+import aiohttp
+import orjson
 
-from .config import settings
+from .config import get_settings
 
 logger = logging.getLogger(__name__)
 
+_JSON_HEADERS = {"Content-Type": "application/json"}
 
-class GatewayClient:
-    """Клиент для отправки сообщений в API Gateway"""
+# Пакетная отправка: сообщения, пришедшие за BATCH_WINDOW_SECONDS,
+# уходят в API Gateway одним запросом (не более BATCH_MAX_SIZE)
+BATCH_WINDOW_SECONDS = 0.01
+BATCH_MAX_SIZE = 16
+
+# (webhook_token, update, future ответа)
+_PendingUpdate = Tuple[str, Dict[str, Any], asyncio.Future]
+
+# Тело 404 FastAPI для несуществующего пути (в отличие от 404 самого endpoint,
+# например {"detail": "Channel not found"})
+_ROUTE_NOT_FOUND_DETAIL = "Not Found"
+
+# Сколько пользователей держать в кэше шаблонов from/chat
+USER_TEMPLATES_CACHE_SIZE = 10_000
+
+
+@lru_cache(maxsize=USER_TEMPLATES_CACHE_SIZE)
+def _user_templates(
+    telegram_user_id: int,
+    telegram_username: str | None,
+    telegram_first_name: str | None,
+    telegram_last_name: str | None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Блоки "from" и "chat" Telegram Update для пользователя
+
+    Не меняются между сообщениями одного пользователя, поэтому
+    собираются один раз. Возвращаемые dict общие - не изменять.
+    """
+    username = telegram_username or ""
+    first_name = telegram_first_name or ""
+    last_name = telegram_last_name or ""
+
+    from_user = {
+        "id": telegram_user_id,
+        "is_bot": False,
+        "first_name": first_name,
+        "last_name": last_name,
+        "username": username,
+    }
+    chat = {
+        "id": telegram_user_id,
+        "type": "private",
+        "username": username,
+        "first_name": first_name,
+        "last_name": last_name,
+    }
+    return from_user, chat
 
-    def __init__(self):
-        self.base_url = settings.api_gateway_url
-        self.client = httpx.AsyncClient(
-            base_url=self.base_url,
-            timeout=30.0
+
+class GatewayResponseError(aiohttp.ClientResponseError):
+    """HTTP ошибка API Gateway (с телом ответа)"""
+
+    def __init__(self, response: aiohttp.ClientResponse, body: bytes):
+        super().__init__(
+            response.request_info,
+            response.history,
+            status=response.status,
+            message=response.reason or "",
+            headers=response.headers,
         )
+        self.body = body
+
+
+def _is_missing_route(body: bytes) -> bool:
+    """404 означает отсутствие endpoint, а не ошибку, которую вернул сам endpoint"""
+    try:
+        detail = orjson.loads(body).get("detail")
+    except (orjson.JSONDecodeError, AttributeError):
+        # Не JSON FastAPI (например, прокси) - endpoint до Gateway не дошел
+        return True
+    return detail is None or detail == _ROUTE_NOT_FOUND_DETAIL
+
+
+def _fail_closed(items: List[_PendingUpdate]) -> None:
+    """Завершить ожидание неотправленных сообщений ошибкой (клиент закрыт)"""
+    for _, _, future in items:
+        if not future.done():
+            future.set_exception(RuntimeError("GatewayClient закрыт"))
+
+
+class GatewayClient:
+    """
+    Клиент для отправки сообщений в API Gateway
+
+    По умолчанию каждое сообщение уходит отдельным запросом. С batching=True
+    сообщения, пришедшие в пределах batch_window, объединяются и уходят
+    одним POST /api/v1/telegram/webhook/{token}/batch (по пакету на токен).
+    Если Gateway не поддерживает пакетный endpoint (404 без ответа
+    самого endpoint), для этого токена используется отправка по одному.
+    Пакет отвечает целиком, поэтому каждый пользователь в нем ждет
+    самый медленный ответ AI.
+    """
+
+    def __init__(
+        self,
+        batching: bool = False,
+        batch_window: float = BATCH_WINDOW_SECONDS,
+        batch_max_size: int = BATCH_MAX_SIZE,
+    ):
+        """
+        Args:
+            batching: Объединять одновременные сообщения в пакеты
+            batch_window: Сколько ждать другие сообщения для пакета, секунды
+            batch_max_size: Максимум сообщений в пакете
+        """
+        self.base_url = get_settings().api_gateway_url
+        self.batching = batching
+        self.batch_window = batch_window
+        self.batch_max_size = batch_max_size
+        # aiohttp.ClientSession создается внутри event loop - при первом запросе
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Очередь и фоновая задача пакетной отправки (тоже при первом запросе)
+        self._queue: Optional[asyncio.Queue[_PendingUpdate]] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        self._send_tasks: Set[asyncio.Task] = set()
+        self._batch_unsupported: Set[str] = set()
+
+    @property
+    def client(self) -> aiohttp.ClientSession:
+        """HTTP сессия с пулом keep-alive соединений к API Gateway"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                base_url=self.base_url,
+                connector=aiohttp.TCPConnector(
+                    limit=200,
+                    keepalive_timeout=75,
+                    ttl_dns_cache=300,
+                ),
+                # Недоступный Gateway обнаруживается за 5 секунд, а не за 30
+                timeout=aiohttp.ClientTimeout(total=30, connect=5),
+            )
+        return self._session
 
     async def send_message(
         self,
@@ -47,73 +175,207 @@ class GatewayClient:
         Returns:
             Ответ от API Gateway
         """
+        from_user, chat = _user_templates(
+            telegram_user_id,
+            telegram_username,
+            telegram_first_name,
+            telegram_last_name,
+        )
+
         # Формируем Telegram Update объект
         telegram_update = {
             "update_id": message_id,
             "message": {
                 "message_id": message_id,
-                "from": {
-                    "id": telegram_user_id,
-                    "is_bot": False,
-                    "first_name": telegram_first_name or "",
-                    "last_name": telegram_last_name or "",
-                    "username": telegram_username or "",
-                },
-                "chat": {
-                    "id": telegram_user_id,
-                    "type": "private",
-                    "username": telegram_username or "",
-                    "first_name": telegram_first_name or "",
-                    "last_name": telegram_last_name or "",
-                },
-                "date": int(datetime.now(timezone.utc).timestamp()),
+                "from": from_user,
+                "chat": chat,
+                "date": int(_time()),
                 "text": text,
             }
         }
 
+        logger.info(
+            "Отправка сообщения в API Gateway: webhook_token=%s..., user_id=%s, text='%.50s...'",
+            webhook_token[:8],
+            telegram_user_id,
+            text,
+        )
+
+        if not self.batching:
+            return await self._post_update(webhook_token, telegram_update)
+
+        # Ответ придет, когда пакет с этим сообщением будет обработан
+        future = asyncio.get_running_loop().create_future()
+        self._get_queue().put_nowait((webhook_token, telegram_update, future))
+        return await future
+
+    def _get_queue(self) -> asyncio.Queue:
+        """Очередь пакетной отправки (запускает фоновую задачу при необходимости)"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._batch_task is None or self._batch_task.done():
+            self._batch_task = asyncio.create_task(self._batch_loop())
+        return self._queue
+
+    async def _batch_loop(self) -> None:
+        """Собирает сообщения в пакеты и отправляет их в фоне"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch: List[_PendingUpdate] = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.batch_window
+
+                while len(batch) < self.batch_max_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # close() во время сбора пакета: сообщения уже вынуты из очереди
+                # и не будут отправлены - вызывающий код не должен ждать вечно
+                _fail_closed(batch)
+                raise
+
+            by_token: Dict[str, List[_PendingUpdate]] = {}
+            for item in batch:
+                by_token.setdefault(item[0], []).append(item)
+
+            # Отправка не блокирует сбор следующего пакета
+            for webhook_token, items in by_token.items():
+                task = asyncio.create_task(self._send_batch(webhook_token, items))
+                self._send_tasks.add(task)
+                task.add_done_callback(self._send_tasks.discard)
+
+    async def _send_batch(self, webhook_token: str, items: List[_PendingUpdate]) -> None:
+        """Отправить пакет обновлений одного токена и раздать ответы"""
+        updates = [update for _, update, _ in items]
+
         try:
-            logger.info(
-                f"Отправка сообщения в API Gateway: "
-                f"webhook_token={webhook_token[:8]}..., "
-                f"user_id={telegram_user_id}, "
-                f"text='{text[:50]}...'"
-            )
+            results = None
+            if len(updates) > 1 and webhook_token not in self._batch_unsupported:
+                results = await self._post_batch(webhook_token, updates)
+            if results is None:
+                results = await asyncio.gather(
+                    *(self._post_update(webhook_token, update) for update in updates),
+                    return_exceptions=True,
+                )
+        except Exception as e:
+            results = [e] * len(items)
+
+        for (_, _, future), result in zip(items, results):
+            # Вызывающий код мог перестать ждать ответ
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
 
-            # Отправляем в Telegram webhook endpoint
-            response = await self.client.post(
-                f"/api/v1/telegram/webhook/{webhook_token}",
-                json=telegram_update
+    async def _post_update(self, webhook_token: str, update: Dict[str, Any]) -> Dict[str, Any]:
+        """Отправить одно обновление в Telegram webhook endpoint"""
+        return await self._post(f"/api/v1/telegram/webhook/{webhook_token}", update)
+
+    async def _post_batch(
+        self,
+        webhook_token: str,
+        updates: List[Dict[str, Any]],
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Отправить пакет обновлений одним запросом
+
+        Returns:
+            Ответы в порядке updates. None - пакетный endpoint недоступен
+            для этого токена, нужно отправлять по одному
+        """
+        try:
+            results = await self._post(f"/api/v1/telegram/webhook/{webhook_token}/batch", updates)
+        except GatewayResponseError as e:
+            # 404 от самого endpoint (канал не найден) - ошибка, а не признак
+            # старого Gateway: она уходит вызывающему коду
+            if e.status != 404 or not _is_missing_route(e.body):
+                raise
+            logger.warning(
+                "Пакетный endpoint недоступен, отправка по одному: webhook_token=%s...",
+                webhook_token[:8],
             )
-            response.raise_for_status()
+            self._batch_unsupported.add(webhook_token)
+            return None
+
+        if not isinstance(results, list) or len(results) != len(updates):
+            raise ValueError(f"Неожиданный ответ пакетного endpoint: {results!r}")
+
+        return results
 
-            result = response.json()
-            logger.info(f"Успешный ответ от API Gateway: {result}")
+    async def _post(self, path: str, payload: Any) -> Any:
+        """POST JSON в API Gateway и вернуть разобранный ответ"""
+        try:
+            # Тело сериализуется orjson сразу в bytes
+            async with self.client.post(
+                path,
+                data=orjson.dumps(payload),
+                headers=_JSON_HEADERS,
+            ) as response:
+                if response.status >= 400:
+                    body = await response.read()
+                    logger.error(
+                        "HTTP ошибка при отправке в API Gateway: status=%s, body=%s",
+                        response.status,
+                        body.decode("utf-8", "replace"),
+                    )
+                    raise GatewayResponseError(response, body)
+
+                result = orjson.loads(await response.read())
+
+            # Ответ форматируется только если уровень INFO включен
+            logger.info("Успешный ответ от API Gateway: %s", result)
             return result
 
-        except httpx.HTTPStatusError as e:
-            logger.error(
-                f"HTTP ошибка при отправке в API Gateway: "
-                f"status={e.response.status_code}, "
-                f"body={e.response.text}"
-            )
+        except aiohttp.ClientResponseError:
             raise
         except Exception as e:
-            logger.error(f"Ошибка при отправке в API Gateway: {e}")
+            logger.error("Ошибка при отправке в API Gateway: %s", e)
             raise
 
     async def health_check(self) -> bool:
         """Проверяет доступность API Gateway"""
         try:
-            response = await self.client.get("/health")
-            return response.status_code == 200
+            async with self.client.get("/health") as response:
+                return response.status == 200
         except Exception as e:
-            logger.error(f"Health check failed: {e}")
+            logger.error("Health check failed: %s", e)
             return False
 
     async def close(self):
-        """Закрывает HTTP клиент"""
-        await self.client.aclose()
+        """Закрывает HTTP клиент (дожидается уже отправленных пакетов)"""
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+            try:
+                await self._batch_task
+            except asyncio.CancelledError:
+                pass
+            self._batch_task = None
+
+        # Сообщения, не попавшие в пакет, уже не будут отправлены
+        if self._queue is not None:
+            pending = []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            _fail_closed(pending)
+
+        if self._send_tasks:
+            await asyncio.gather(*self._send_tasks, return_exceptions=True)
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
 
-# Global instance
-gateway_client = GatewayClient()
+@lru_cache(maxsize=1)
+def get_gateway_client() -> GatewayClient:
+    """Общий GatewayClient процесса (создается при первом вызове)"""
+    return GatewayClient(batching=get_settings().gateway_batching)
@@ -2,9 +2,48 @@
 Telegram Inline Keyboards for slot selection and other interactions
 """
 
-from typing import List, Dict, Any
+import base64
+import struct
+from datetime import date
+from typing import List, Dict, Any, Optional, Tuple
+from uuid import UUID
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+
+# Telegram ограничивает callback_data 64 байтами (не символами)
+MAX_CALLBACK_DATA_BYTES = 64
+
+# Клавиатуры собираются напрямую как InlineKeyboardMarkup(inline_keyboard=rows):
+# раскладка фиксирована, InlineKeyboardBuilder с adjust() не нужен.
+# Ряды заполняются прямо в цикле добавления кнопок
+SLOTS_ROW_WIDTH = 3
+DATES_ROW_WIDTH = 2
+
+# Компактный callback_data слота (см. slot_callback_data):
+# - s:{дата и время}:{employee_id}:{service_id} - дата (номер дня) и время
+#   (минута суток) упакованы в 6 байт, 8 символов base64 вместо 16 символов
+#   "YYYY-MM-DD:HH:MM"
+# - su:{дата, время, employee_id, service_id} - то же плюс ID-UUID по 16 байт,
+#   51 символ base64 (два UUID текстом в 64 байта не помещаются)
+SLOT_CALLBACK_PREFIX = "s:"
+SLOT_UUID_CALLBACK_PREFIX = "su:"
+_SLOT_DATETIME_STRUCT = struct.Struct("<IH")
+_SLOT_UUID_STRUCT = struct.Struct("<IH16s16s")
+
+# Кнопка отмены (общая для всех клавиатур: aiogram не изменяет кнопки)
+_CANCEL_BUTTON = InlineKeyboardButton(text="❌ Отмена", callback_data="cancel_booking")
+
+# Клавиатура без свободных слотов (частый случай) - только отмена
+_NO_SLOTS_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[[_CANCEL_BUTTON]])
+
+# Короткие названия дней недели (индекс - date.weekday())
+_WEEKDAYS = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+
+# Короткие названия месяцев (индекс - номер месяца, 0 не используется)
+_MONTHS = (
+    "", "янв", "фев", "мар", "апр", "май", "июн",
+    "июл", "авг", "сен", "окт", "ноя", "дек",
+)
 
 
 def create_time_slots_keyboard(
@@ -22,8 +61,15 @@ def create_time_slots_keyboard(
 
     Returns:
         InlineKeyboardMarkup с кнопками слотов
+
+    Raises:
+        ValueError: Если callback_data слота не помещается в 64 байта
     """
-    builder = InlineKeyboardBuilder()
+    if not slots:
+        return _NO_SLOTS_KEYBOARD
+
+    rows: List[List[InlineKeyboardButton]] = []
+    row: List[InlineKeyboardButton] = []
 
     for slot in slots:
         time = slot.get("time", slot.get("start_time", ""))
@@ -35,26 +81,21 @@ def create_time_slots_keyboard(
         if employee_name:
             button_text += f" ({employee_name})"
 
-        # Callback data: slot:{date}:{time}:{employee_id}:{service_id}
-        callback_data = f"slot:{date}:{time}:{employee_id}:{service_id}"
-
-        builder.button(
+        # Обрезать нельзя: испорченный ID ушел бы в Gateway
+        row.append(InlineKeyboardButton(
             text=button_text,
-            callback_data=callback_data[:64]  # Max callback_data length
-        )
+            callback_data=slot_callback_data(date, time, employee_id, service_id)
+        ))
+        if len(row) == SLOTS_ROW_WIDTH:
+            rows.append(row)
+            row = []
 
-    # 3 buttons per row
-    builder.adjust(3)
+    # Неполный последний ряд + cancel button
+    if row:
+        rows.append(row)
+    rows.append([_CANCEL_BUTTON])
 
-    # Add cancel button
-    builder.row(
-        InlineKeyboardButton(
-            text="❌ Отмена",
-            callback_data="cancel_booking"
-        )
-    )
-
-    return builder.as_markup()
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
 def create_dates_keyboard(
@@ -71,40 +112,32 @@ def create_dates_keyboard(
     Returns:
         InlineKeyboardMarkup с кнопками дат
     """
-    builder = InlineKeyboardBuilder()
-
-    # Словарь дней недели
-    weekdays = {
-        0: "Пн", 1: "Вт", 2: "Ср",
-        3: "Чт", 4: "Пт", 5: "Сб", 6: "Вс"
-    }
+    rows: List[List[InlineKeyboardButton]] = []
+    row: List[InlineKeyboardButton] = []
 
     for date_str in dates:
-        from datetime import datetime
-        dt = datetime.strptime(date_str, "%Y-%m-%d")
-        weekday = weekdays[dt.weekday()]
+        # Формат фиксирован (YYYY-MM-DD) - fromisoformat без разбора шаблона strptime
+        dt = date.fromisoformat(date_str)
+        weekday = _WEEKDAYS[dt.weekday()]
 
         # Формат: "15 янв (Пн)"
         button_text = f"{dt.day} {_month_name(dt.month)} ({weekday})"
         callback_data = f"date:{date_str}:{service_id}"
 
-        builder.button(
+        row.append(InlineKeyboardButton(
             text=button_text,
-            callback_data=callback_data[:64]
-        )
-
-    # 2 buttons per row
-    builder.adjust(2)
+            callback_data=_fit_callback_data(callback_data)
+        ))
+        if len(row) == DATES_ROW_WIDTH:
+            rows.append(row)
+            row = []
 
-    # Cancel button
-    builder.row(
-        InlineKeyboardButton(
-            text="❌ Отмена",
-            callback_data="cancel_booking"
-        )
-    )
+    # Неполный последний ряд + cancel button
+    if row:
+        rows.append(row)
+    rows.append([_CANCEL_BUTTON])
 
-    return builder.as_markup()
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
 def create_services_keyboard(
@@ -119,7 +152,7 @@ def create_services_keyboard(
     Returns:
         InlineKeyboardMarkup с кнопками услуг
     """
-    builder = InlineKeyboardBuilder()
+    rows: List[List[InlineKeyboardButton]] = []
 
     for service in services:
         service_id = service.get("id", "")
@@ -136,23 +169,16 @@ def create_services_keyboard(
 
         callback_data = f"service:{service_id}"
 
-        builder.button(
+        # 1 button per row (services are long)
+        rows.append([InlineKeyboardButton(
             text=button_text,
-            callback_data=callback_data[:64]
-        )
-
-    # 1 button per row (services are long)
-    builder.adjust(1)
+            callback_data=_fit_callback_data(callback_data)
+        )])
 
     # Cancel button
-    builder.row(
-        InlineKeyboardButton(
-            text="❌ Отмена",
-            callback_data="cancel_booking"
-        )
-    )
+    rows.append([_CANCEL_BUTTON])
 
-    return builder.as_markup()
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
 def create_employees_keyboard(
@@ -169,14 +195,17 @@ def create_employees_keyboard(
     Returns:
         InlineKeyboardMarkup
     """
-    builder = InlineKeyboardBuilder()
-
-    # Опция "Любой мастер"
-    builder.button(
+    # Опция "Любой мастер" (зависит от service_id, поэтому не кэшируется)
+    any_employee_button = InlineKeyboardButton(
         text="👤 Любой свободный мастер",
-        callback_data=f"employee:any:{service_id}"
+        callback_data=_fit_callback_data(f"employee:any:{service_id}")
     )
 
+    if not employees:
+        return InlineKeyboardMarkup(inline_keyboard=[[any_employee_button], [_CANCEL_BUTTON]])
+
+    rows: List[List[InlineKeyboardButton]] = [[any_employee_button]]
+
     for emp in employees:
         emp_id = emp.get("id", "")
         name = emp.get("name", "Мастер")
@@ -188,21 +217,14 @@ def create_employees_keyboard(
 
         callback_data = f"employee:{emp_id}:{service_id}"
 
-        builder.button(
+        rows.append([InlineKeyboardButton(
             text=button_text,
-            callback_data=callback_data[:64]
-        )
-
-    builder.adjust(1)
+            callback_data=_fit_callback_data(callback_data)
+        )])
 
-    builder.row(
-        InlineKeyboardButton(
-            text="❌ Отмена",
-            callback_data="cancel_booking"
-        )
-    )
+    rows.append([_CANCEL_BUTTON])
 
-    return builder.as_markup()
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
 def create_confirmation_keyboard(
@@ -217,23 +239,12 @@ def create_confirmation_keyboard(
     Returns:
         InlineKeyboardMarkup
     """
-    builder = InlineKeyboardBuilder()
-
     # Encode appointment data into callback
     # Simplified: just use confirm/cancel with stored context
-    builder.button(
-        text="✅ Подтвердить запись",
-        callback_data="confirm_booking"
-    )
-
-    builder.button(
-        text="❌ Отменить",
-        callback_data="cancel_booking"
-    )
-
-    builder.adjust(1)
-
-    return builder.as_markup()
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="✅ Подтвердить запись", callback_data="confirm_booking")],
+        [InlineKeyboardButton(text="❌ Отменить", callback_data="cancel_booking")],
+    ])
 
 
 def create_cancel_appointment_keyboard(
@@ -248,29 +259,183 @@ def create_cancel_appointment_keyboard(
     Returns:
         InlineKeyboardMarkup
     """
-    builder = InlineKeyboardBuilder()
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(
+            text="❌ Отменить запись",
+            callback_data=_fit_callback_data(f"cancel_appt:{appointment_id}")
+        )],
+        [InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_menu")],
+    ])
+
+
+def slot_callback_data(
+    date_str: str,
+    time_str: str,
+    employee_id: str,
+    service_id: str
+) -> str:
+    """
+    Формирует callback_data кнопки слота в самом компактном формате
 
-    builder.button(
-        text="❌ Отменить запись",
-        callback_data=f"cancel_appt:{appointment_id}"
-    )
+    su:{packed} если ID - UUID, иначе s:{packed}:{employee_id}:{service_id},
+    для нестандартных date/time - slot:{date}:{time}:{employee_id}:{service_id}
 
-    builder.button(
-        text="⬅️ Назад",
-        callback_data="back_to_menu"
-    )
+    Raises:
+        ValueError: Если callback_data не помещается в MAX_CALLBACK_DATA_BYTES
+    """
+    packed = pack_slot_uuids(date_str, time_str, employee_id, service_id)
+    if packed is not None:
+        return f"{SLOT_UUID_CALLBACK_PREFIX}{packed}"
+
+    packed = pack_slot_datetime(date_str, time_str)
+    if packed is not None:
+        callback_data = f"{SLOT_CALLBACK_PREFIX}{packed}:{employee_id}:{service_id}"
+    else:
+        callback_data = f"slot:{date_str}:{time_str}:{employee_id}:{service_id}"
+
+    if len(callback_data.encode("utf-8")) > MAX_CALLBACK_DATA_BYTES:
+        raise ValueError(
+            f"Slot callback_data exceeds {MAX_CALLBACK_DATA_BYTES} bytes: {callback_data!r}"
+        )
+    return callback_data
 
-    builder.adjust(1)
 
-    return builder.as_markup()
+def pack_slot_datetime(date_str: str, time_str: str) -> Optional[str]:
+    """
+    Упаковывает дату и время слота для callback_data
+
+    Args:
+        date_str: Дата в формате YYYY-MM-DD
+        time_str: Время в формате HH:MM
+
+    Returns:
+        8 символов base64 или None, если значения в другом формате
+        (упаковка без потерь невозможна)
+    """
+    fields = _slot_datetime_fields(date_str, time_str)
+    if fields is None:
+        return None
+    return base64.urlsafe_b64encode(_SLOT_DATETIME_STRUCT.pack(*fields)).decode("ascii")
+
+
+def unpack_slot_datetime(token: str) -> Tuple[str, str]:
+    """
+    Распаковывает результат pack_slot_datetime
+
+    Returns:
+        (дата YYYY-MM-DD, время HH:MM)
+
+    Raises:
+        ValueError: Если token поврежден
+    """
+    try:
+        ordinal, minute = _SLOT_DATETIME_STRUCT.unpack(base64.urlsafe_b64decode(token))
+    except struct.error as e:
+        raise ValueError(f"Invalid packed slot: {token!r}") from e
+
+    return _format_slot_datetime(ordinal, minute, token)
+
+
+def pack_slot_uuids(
+    date_str: str,
+    time_str: str,
+    employee_id: str,
+    service_id: str
+) -> Optional[str]:
+    """
+    Упаковывает дату, время и UUID мастера и услуги
+
+    Returns:
+        51 символ base64 или None, если дата/время в другом формате
+        или ID не UUID в каноническом виде
+    """
+    fields = _slot_datetime_fields(date_str, time_str)
+    if fields is None:
+        return None
+
+    try:
+        employee_uuid = UUID(employee_id)
+        service_uuid = UUID(service_id)
+    except ValueError:
+        return None
+
+    # Только обратимая упаковка: UUID в верхнем регистре или без дефисов
+    # остаются в текстовом формате
+    if str(employee_uuid) != employee_id or str(service_uuid) != service_id:
+        return None
+
+    packed = _SLOT_UUID_STRUCT.pack(*fields, employee_uuid.bytes, service_uuid.bytes)
+    return base64.urlsafe_b64encode(packed).rstrip(b"=").decode("ascii")
+
+
+def unpack_slot_uuids(token: str) -> Tuple[str, str, str, str]:
+    """
+    Распаковывает результат pack_slot_uuids
+
+    Returns:
+        (дата YYYY-MM-DD, время HH:MM, employee_id, service_id)
+
+    Raises:
+        ValueError: Если token поврежден
+    """
+    try:
+        ordinal, minute, employee_bytes, service_bytes = _SLOT_UUID_STRUCT.unpack(
+            base64.urlsafe_b64decode(token + "=")
+        )
+    except struct.error as e:
+        raise ValueError(f"Invalid packed slot: {token!r}") from e
+
+    date_str, time_str = _format_slot_datetime(ordinal, minute, token)
+    return date_str, time_str, str(UUID(bytes=employee_bytes)), str(UUID(bytes=service_bytes))
+
+
+def _slot_datetime_fields(date_str: str, time_str: str) -> Optional[Tuple[int, int]]:
+    """
+    (номер дня, минута суток) для упаковки слота
+
+    None, если упаковка не обратима: "9:00", "24:00", "14:60", "14:00:00"
+    остаются в полном формате
+    """
+    try:
+        slot_date = date.fromisoformat(date_str)
+        hours, minutes = time_str.split(":")
+        minute = int(hours) * 60 + int(minutes)
+    except ValueError:
+        return None
+
+    if not 0 <= minute < 24 * 60:
+        return None
+    if slot_date.isoformat() != date_str or _format_minute(minute) != time_str:
+        return None
+
+    return slot_date.toordinal(), minute
+
+
+def _format_slot_datetime(ordinal: int, minute: int, token: str) -> Tuple[str, str]:
+    """Обратное преобразование _slot_datetime_fields (ValueError для поврежденного token)"""
+    if minute >= 24 * 60:
+        raise ValueError(f"Invalid packed slot: {token!r}")
+    return date.fromordinal(ordinal).isoformat(), _format_minute(minute)
+
+
+def _format_minute(minute: int) -> str:
+    """Минута суток -> HH:MM"""
+    hours, minutes = divmod(minute, 60)
+    return f"{hours:02d}:{minutes:02d}"
+
+
+def _fit_callback_data(callback_data: str) -> str:
+    """
+    Обрезает callback_data до MAX_CALLBACK_DATA_BYTES байт
+
+    Обычно данные ASCII и короче лимита - возвращаются без копирования.
+    Иначе обрезаются по байтам, не разрывая многобайтовый символ UTF-8.
+    """
+    if callback_data.isascii() and len(callback_data) <= MAX_CALLBACK_DATA_BYTES:
+        return callback_data
+    return callback_data.encode("utf-8")[:MAX_CALLBACK_DATA_BYTES].decode("utf-8", "ignore")
 
 
 def _month_name(month: int) -> str:
     """Возвращает короткое название месяца на русском"""
-    months = {
-        1: "янв", 2: "фев", 3: "мар",
-        4: "апр", 5: "май", 6: "июн",
-        7: "июл", 8: "авг", 9: "сен",
-        10: "окт", 11: "ноя", 12: "дек"
-    }
-    return months.get(month, "")
+    return _MONTHS[month] if 1 <= month <= 12 else ""
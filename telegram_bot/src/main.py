@@ -11,16 +11,25 @@ Telegram Bot - Entry Point
 
 import asyncio
 import logging
+import signal
 import sys
 
 from aiogram import Bot
-from aiogram.types import BotCommand
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from aiohttp import web
+from aiohttp.http_parser import HttpRequestParser
 
-from .config import settings
+from .config import get_settings
 from .bot import create_bot_and_dispatcher
 
+try:
+    import uvloop
+except ImportError:  # Windows или uvloop не установлен
+    uvloop = None
+
+# Точка входа: настройки нужны сразу (уровень логирования, режим работы)
+settings = get_settings()
+
 # Настройка логирования
 logging.basicConfig(
     level=getattr(logging, settings.log_level.upper()),
@@ -75,8 +84,14 @@ async def run_polling():
         logger.info("Бот остановлен")
 
 
-def run_webhook():
-    """Запуск в режиме webhook (для production)"""
+async def run_webhook():
+    """
+    Запуск в режиме webhook (для production)
+
+    Сервер работает в текущем event loop (uvloop, если установлен):
+    web.run_app создает собственный loop и не может быть запущен
+    из уже работающего asyncio.run(main()).
+    """
     logger.info("🚀 Запуск в режиме WEBHOOK...")
 
     bot, dp = create_bot_and_dispatcher()
@@ -102,13 +117,39 @@ def run_webhook():
     setup_application(app, dp, bot=bot)
 
     # Запускаем сервер
-    logger.info(f"Webhook server: {settings.webhook_host}:{settings.webhook_port}")
-    web.run_app(
-        app,
-        host=settings.webhook_host,
-        port=settings.webhook_port
+    # access_log=None - без строки лога на каждый update от Telegram
+    runner = web.AppRunner(app, access_log=None, keepalive_timeout=75)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.webhook_host, port=settings.webhook_port)
+    await site.start()
+
+    logger.info(
+        "Webhook server: %s:%s (HTTP parser: %s)",
+        settings.webhook_host,
+        settings.webhook_port,
+        "C" if HttpRequestParser.__module__ == "aiohttp._http_parser" else "Python",
     )
 
+    # SIGTERM (docker stop) / SIGINT останавливают сервер штатно: cleanup
+    # вызывает shutdown handlers (удаление webhook, закрытие клиентов)
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    stop_signals = []
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:  # Windows
+            continue
+        stop_signals.append(sig)
+
+    try:
+        await stop_event.wait()
+        logger.info("Получен сигнал остановки")
+    finally:
+        for sig in stop_signals:
+            loop.remove_signal_handler(sig)
+        await runner.cleanup()
+
 
 async def main():
     """Главная функция"""
@@ -140,12 +181,33 @@ async def main():
             )
             sys.exit(1)
 
-        run_webhook()
+        await run_webhook()
     else:
         await run_polling()
 
 
+def install_event_loop_policy() -> bool:
+    """
+    Использовать uvloop (libuv) вместо стандартного asyncio event loop
+
+    Бот почти все время ждет сетевой I/O (Telegram API, API Gateway),
+    uvloop обрабатывает его быстрее. Политика действует для asyncio.run,
+    в том числе для webhook-сервера, работающего в том же loop.
+
+    Returns:
+        True если uvloop установлен (Linux/macOS)
+    """
+    if uvloop is None or sys.platform == "win32":
+        return False
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
 if __name__ == "__main__":
+    if install_event_loop_policy():
+        logger.info("Event loop: uvloop")
+
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -3,19 +3,20 @@ Pytest configuration and fixtures
 """
 
 import os
-import sys
 import pytest
 
-# Add project root to path
-project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, project_root)
-
-# Set test environment variables
-os.environ.setdefault("ENCRYPTION_MASTER_KEY", "test-encryption-key-for-testing")
-os.environ.setdefault("API_KEY_SECRET", "test-api-key-secret")
-os.environ.setdefault("WEBHOOK_SECRET", "test-webhook-secret")
-os.environ.setdefault("GEMINI_API_KEY", "test-gemini-key")
-os.environ.setdefault("POSTGRES_PASSWORD", "test-password")
+# Test environment variables (values already set in the environment win)
+_TEST_ENV_DEFAULTS = {
+    "ENCRYPTION_MASTER_KEY": "test-encryption-key-for-testing",
+    "API_KEY_SECRET": "test-api-key-secret",
+    "WEBHOOK_SECRET": "test-webhook-secret",
+    "GEMINI_API_KEY": "test-gemini-key",
+    "POSTGRES_PASSWORD": "test-password",
+    "TELEGRAM_BOT_TOKEN": "123456:test-telegram-bot-token",
+}
+os.environ.update({
+    name: value for name, value in _TEST_ENV_DEFAULTS.items() if name not in os.environ
+})
 
 
 @pytest.fixture(scope="session")
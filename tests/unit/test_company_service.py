@@ -0,0 +1,164 @@
+"""
+Unit tests for CompanyService
+"""
+
+import pytest
+from shared.services import company_service
+from shared.services.company_service import CompanyService, invalidate_channel_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_channel_cache():
+    """Isolate the process-wide channel cache between tests"""
+    invalidate_channel_cache()
+    yield
+    invalidate_channel_cache()
+
+
+def _result(value, mocker):
+    """Build a mock SQLAlchemy result returning a single scalar"""
+    result = mocker.MagicMock()
+    result.scalar_one_or_none.return_value = value
+    return result
+
+
+class TestChannelCache:
+    """Tests for webhook token -> channel caching"""
+
+    async def test_channel_is_cached(self, mock_db_session, mocker):
+        """Second lookup of the same token does not hit the database"""
+        channel = mocker.MagicMock()
+        mock_db_session.execute.return_value = _result(channel, mocker)
+        service = CompanyService(mock_db_session)
+
+        assert await service.get_channel_by_token("token") is channel
+        assert await service.get_channel_by_token("token") is channel
+        assert mock_db_session.execute.await_count == 1
+
+    async def test_missing_channel_is_not_cached(self, mock_db_session, mocker):
+        """Unknown tokens are looked up again on every call"""
+        mock_db_session.execute.return_value = _result(None, mocker)
+        service = CompanyService(mock_db_session)
+
+        assert await service.get_channel_by_token("unknown") is None
+        assert await service.get_channel_by_token("unknown") is None
+        assert mock_db_session.execute.await_count == 2
+
+    async def test_cache_expires(self, mock_db_session, mocker):
+        """Entries older than the TTL are reloaded"""
+        mock_db_session.execute.return_value = _result(mocker.MagicMock(), mocker)
+        service = CompanyService(mock_db_session)
+        clock = mocker.patch.object(company_service.time, "monotonic", return_value=100.0)
+
+        await service.get_channel_by_token("token")
+        clock.return_value = 100.0 + company_service.CHANNEL_CACHE_TTL_SECONDS
+        await service.get_channel_by_token("token")
+
+        assert mock_db_session.execute.await_count == 2
+
+    async def test_invalidate_single_token(self, mock_db_session, mocker):
+        """Invalidation forces a reload for that token"""
+        mock_db_session.execute.return_value = _result(mocker.MagicMock(), mocker)
+        service = CompanyService(mock_db_session)
+
+        await service.get_channel_by_token("token")
+        invalidate_channel_cache("token")
+        await service.get_channel_by_token("token")
+
+        assert mock_db_session.execute.await_count == 2
+
+
+class TestDecryptApiKey:
+    """Tests for API key decryption"""
+
+    def test_decrypt_roundtrip(self, mock_db_session):
+        """Encrypted keys are decrypted back to plaintext"""
+        service = CompanyService(mock_db_session)
+        encrypted = CompanyService.encrypt_api_key("crm_api_key")
+
+        assert service.decrypt_api_key(encrypted) == "crm_api_key"
+
+    def test_decrypt_is_cached(self, mock_db_session, mocker):
+        """Same ciphertext is decrypted only once while cached"""
+        service = CompanyService(mock_db_session)
+        encrypted = CompanyService.encrypt_api_key("cached_key")
+        crypto = company_service.get_crypto_service()
+        spy = mocker.spy(crypto, "_decrypt_uncached")
+
+        assert service.decrypt_api_key(encrypted) == "cached_key"
+        assert service.decrypt_api_key(encrypted) == "cached_key"
+        assert spy.call_count == 1
+
+    def test_plaintext_key_returned_as_is(self, mock_db_session):
+        """Legacy unencrypted keys are passed through"""
+        service = CompanyService(mock_db_session)
+
+        assert service.decrypt_api_key("plain_key") == "plain_key"
+
+
+class TestCompanyContext:
+    """Tests for AI agent context building"""
+
+    async def test_context_with_agent_settings(self, mock_db_session, mocker):
+        """All agent settings fields are exposed with defaults applied"""
+        company = mocker.MagicMock()
+        company.id = "company-1"
+        company.name = "Салон"
+        settings = company.agent_settings
+        settings.services_catalog = None
+        settings.temperature = None
+        settings.max_tokens = 4096
+        mock_db_session.execute.return_value = _result(company, mocker)
+
+        context = await CompanyService(mock_db_session).get_company_context("company-1")
+
+        assert context["company_id"] == "company-1"
+        assert context["company_name"] == "Салон"
+        assert context["services_catalog"] == []
+        assert context["temperature"] == 0.7
+        assert context["max_tokens"] == 4096
+        assert context["working_hours"] is settings.working_hours
+        assert len(context) == 16
+
+    async def test_context_without_agent_settings(self, mock_db_session, mocker):
+        """Companies without agent settings get only id and name"""
+        company = mocker.MagicMock()
+        company.id = "company-1"
+        company.name = "Салон"
+        company.agent_settings = None
+        mock_db_session.execute.return_value = _result(company, mocker)
+
+        context = await CompanyService(mock_db_session).get_company_context("company-1")
+
+        assert context == {"company_id": "company-1", "company_name": "Салон"}
+
+    async def test_unknown_company(self, mock_db_session, mocker):
+        """Missing company yields an empty context"""
+        mock_db_session.execute.return_value = _result(None, mocker)
+
+        assert await CompanyService(mock_db_session).get_company_context("missing") == {}
+
+    async def test_bulk_contexts_single_query(self, mock_db_session, mocker):
+        """Several companies are loaded with one query and keyed by id"""
+        companies = []
+        for company_id in ("c1", "c2"):
+            company = mocker.MagicMock()
+            company.id = company_id
+            company.agent_settings = None
+            companies.append(company)
+        result = mocker.MagicMock()
+        result.scalars.return_value = iter(companies)
+        mock_db_session.execute.return_value = result
+
+        contexts = await CompanyService(mock_db_session).get_company_contexts(
+            ["c1", "c2", "c1", "missing"]
+        )
+
+        assert set(contexts) == {"c1", "c2"}
+        assert contexts["c2"]["company_id"] == "c2"
+        assert mock_db_session.execute.await_count == 1
+
+    async def test_bulk_contexts_empty(self, mock_db_session):
+        """No ids means no query"""
+        assert await CompanyService(mock_db_session).get_company_contexts([]) == {}
+        mock_db_session.execute.assert_not_awaited()
@@ -5,6 +5,30 @@ Unit tests for CRM Factory
 import pytest
 from crm_integrations.src.factory import CRMFactory, CRMType
 
+# Interface every CRM adapter must implement
+_REQUIRED_ADAPTER_METHODS = {
+    "get_client_by_phone",
+    "create_client",
+    "get_services",
+    "get_available_slots",
+    "create_appointment",
+    "health_check",
+}
+
+
+@pytest.fixture(
+    scope="module",
+    params=CRMFactory.get_available_crm_types(),
+    ids=lambda crm_type: crm_type.value,
+)
+def registered_adapter(request):
+    """One adapter per registered CRM type, shared by the module"""
+    return CRMFactory.create(
+        crm_type=request.param,
+        api_key="test_key",
+        base_url="https://test.example.com"
+    )
+
 
 class TestCRMFactory:
     """Tests for CRM adapter factory"""
@@ -18,48 +42,26 @@ class TestCRMFactory:
         assert CRMType.BITRIX24 in available
         assert CRMType.ONEC in available
 
-    def test_create_yclients_adapter(self):
-        """Test creation of YCLIENTS adapter"""
+    @pytest.mark.parametrize(
+        "crm_type,base_url,expected_name",
+        [
+            (CRMType.YCLIENTS, "https://api.yclients.com", "YClients"),
+            (CRMType.BITRIX24, "https://test.bitrix24.ru", "Bitrix24"),
+            (CRMType.ONEC, "https://1c-server.local", "OneC"),
+            (CRMType.AMOCRM, "https://company.amocrm.ru", "AmoCRM"),
+        ],
+        ids=["yclients", "bitrix24", "1c", "amocrm"],
+    )
+    def test_create_adapter(self, crm_type, base_url, expected_name):
+        """Test creation of each CRM adapter"""
         adapter = CRMFactory.create(
-            crm_type=CRMType.YCLIENTS,
+            crm_type=crm_type,
             api_key="test_key",
-            base_url="https://api.yclients.com"
-        )
-
-        assert adapter is not None
-        assert adapter.get_crm_name() == "YClients"
-
-    def test_create_bitrix24_adapter(self):
-        """Test creation of Bitrix24 adapter"""
-        adapter = CRMFactory.create(
-            crm_type=CRMType.BITRIX24,
-            api_key="test_key",
-            base_url="https://test.bitrix24.ru"
-        )
-
-        assert adapter is not None
-        assert adapter.get_crm_name() == "Bitrix24"
-
-    def test_create_onec_adapter(self):
-        """Test creation of 1C adapter"""
-        adapter = CRMFactory.create(
-            crm_type=CRMType.ONEC,
-            api_key="test_key",
-            base_url="https://1c-server.local"
-        )
-
-        assert adapter is not None
-        assert "OneC" in adapter.get_crm_name() or "1C" in adapter.get_crm_name()
-
-    def test_create_amocrm_adapter(self):
-        """Test creation of amoCRM adapter"""
-        adapter = CRMFactory.create(
-            crm_type=CRMType.AMOCRM,
-            api_key="test_key",
-            base_url="https://company.amocrm.ru"
+            base_url=base_url
         )
 
         assert adapter is not None
+        assert adapter.get_crm_name() == expected_name
 
     def test_invalid_crm_type_raises_error(self):
         """Test that invalid CRM type raises error"""
@@ -69,22 +71,9 @@ class TestCRMFactory:
                 api_key="test_key"
             )
 
-    def test_adapters_have_required_methods(self):
+    def test_adapters_have_required_methods(self, registered_adapter):
         """Test that all adapters implement required interface"""
-        for crm_type in CRMFactory.get_available_crm_types():
-            adapter = CRMFactory.create(
-                crm_type=crm_type,
-                api_key="test_key",
-                base_url="https://test.example.com"
-            )
-
-            # Check required methods exist
-            assert hasattr(adapter, "get_client_by_phone")
-            assert hasattr(adapter, "create_client")
-            assert hasattr(adapter, "get_services")
-            assert hasattr(adapter, "get_available_slots")
-            assert hasattr(adapter, "create_appointment")
-            assert hasattr(adapter, "health_check")
+        assert _REQUIRED_ADAPTER_METHODS <= set(dir(registered_adapter))
 
     def test_crm_type_enum_values(self):
         """Test CRM type enum has correct values"""
@@ -2,17 +2,31 @@
 Unit tests for CryptoService
 """
 
+import base64
+from concurrent.futures import ThreadPoolExecutor
 import os
 import pytest
+from cryptography.fernet import Fernet, InvalidToken
+from shared.utils import crypto as crypto_module
 from shared.utils.crypto import CryptoService
 
 
+# Shared source for long-value tests (sliced per size instead of rebuilt)
+_LONG_BYTES = b"x" * 100_000
+
+
+def _legacy_token(plaintext: str) -> str:
+    """Fernet token as written by earlier CryptoService versions"""
+    key = crypto_module._derive_key("test-master-key-for-testing-only")
+    return Fernet(key).encrypt(plaintext.encode()).decode()
+
+
 class TestCryptoService:
     """Tests for encryption/decryption functionality"""
 
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def crypto(self):
-        """Create CryptoService with test key"""
+        """CryptoService with test key, shared by the module (tests do not mutate it)"""
         return CryptoService(master_key="test-master-key-for-testing-only")
 
     def test_encrypt_decrypt_roundtrip(self, crypto):
@@ -105,10 +119,119 @@ class TestCryptoService:
             if old_value:
                 os.environ["ENCRYPTION_MASTER_KEY"] = old_value
 
-    def test_long_values(self, crypto):
+    @pytest.mark.parametrize("size", [100, 10_000, 100_000])
+    def test_long_values(self, crypto, size):
         """Test encryption of long values"""
-        long_value = "x" * 10000
+        long_value = _LONG_BYTES[:size].decode()
         encrypted = crypto.encrypt(long_value)
         decrypted = crypto.decrypt(encrypted)
 
         assert decrypted == long_value
+        assert crypto.decrypt_bytes(crypto.encrypt_bytes(_LONG_BYTES[:size])) == _LONG_BYTES[:size]
+
+    def test_key_derivation_cached_per_master_key(self, mocker):
+        """PBKDF2 runs once per master key, not once per instance"""
+        kdf = mocker.patch.object(
+            crypto_module.hashlib, "pbkdf2_hmac", wraps=crypto_module.hashlib.pbkdf2_hmac
+        )
+
+        crypto1 = CryptoService(master_key="cached-derivation-key")
+        crypto2 = CryptoService(master_key="cached-derivation-key")
+        CryptoService(master_key="another-derivation-key")
+
+        assert kdf.call_count == 2
+        assert crypto2.decrypt(crypto1.encrypt("secret")) == "secret"
+
+    def test_master_key_not_retained(self):
+        """The instance keeps only the ciphers, not the master key"""
+        crypto = CryptoService(master_key="retained-key-check")
+
+        assert "retained-key-check" not in vars(crypto).values()
+        assert not hasattr(crypto, "_master_key")
+
+    def test_aesgcm_token_format(self, crypto):
+        """New values are AES-GCM tokens with the version prefix"""
+        encrypted = crypto.encrypt("secret")
+
+        assert encrypted.startswith("aesgcm1:")
+        assert crypto.is_encrypted(encrypted) is True
+
+    def test_tampered_token_fails_decryption(self, crypto):
+        """Modified AES-GCM tokens are rejected as InvalidToken"""
+        prefix, payload = crypto.encrypt("secret").split(":", 1)
+        data = bytearray(base64.urlsafe_b64decode(payload))
+        data[-1] ^= 0x01
+        tampered = f"{prefix}:{base64.urlsafe_b64encode(bytes(data)).decode()}"
+
+        with pytest.raises(InvalidToken):
+            crypto.decrypt(tampered)
+
+    def test_legacy_fernet_token_decrypts(self, crypto):
+        """Values written with Fernet by earlier versions are still readable"""
+        legacy = _legacy_token("old_api_key")
+
+        assert crypto.decrypt(legacy) == "old_api_key"
+
+    def test_encrypt_if_needed_migrates_fernet(self, crypto):
+        """Legacy Fernet tokens are re-encrypted with AES-GCM"""
+        legacy = _legacy_token("old_api_key")
+
+        migrated = crypto.encrypt_if_needed(legacy)
+
+        assert migrated.startswith("aesgcm1:")
+        assert crypto.decrypt(migrated) == "old_api_key"
+
+    def test_repeated_decrypt_uses_cache(self, crypto, mocker):
+        """The same ciphertext is decrypted once while cached"""
+        encrypted = crypto.encrypt("cached_value")
+        uncached = mocker.spy(crypto, "_decrypt_uncached")
+
+        assert crypto.decrypt(encrypted) == "cached_value"
+        assert crypto.decrypt(encrypted) == "cached_value"
+        assert uncached.call_count == 1
+
+        crypto.clear_decrypt_cache()
+        crypto.decrypt(encrypted)
+        assert uncached.call_count == 2
+
+    def test_decrypt_cache_expires(self, crypto, mocker):
+        """Cached plaintexts are dropped after DECRYPT_CACHE_TTL_SECONDS"""
+        encrypted = crypto.encrypt("short_lived")
+        uncached = mocker.spy(crypto, "_decrypt_uncached")
+        clock = mocker.patch.object(crypto_module.time, "monotonic", return_value=1000.0)
+
+        crypto.decrypt(encrypted)
+        clock.return_value = 1000.0 + crypto_module.DECRYPT_CACHE_TTL_SECONDS + 1
+        crypto.decrypt(encrypted)
+
+        assert uncached.call_count == 2
+
+    def test_bytes_roundtrip(self, crypto):
+        """Bytes API produces tokens interchangeable with the str API"""
+        token = crypto.encrypt_bytes(b"\x00binary\xff")
+
+        assert isinstance(token, bytes)
+        assert crypto.decrypt_bytes(token) == b"\x00binary\xff"
+        assert crypto.decrypt_bytes(crypto.encrypt("text").encode()) == b"text"
+        assert crypto.decrypt(crypto.encrypt_bytes(b"text").decode()) == "text"
+        assert crypto.decrypt_bytes(_legacy_token("old").encode()) == b"old"
+
+    def test_is_encrypted_bytes(self, crypto):
+        """Bytes detection matches the str version"""
+        assert CryptoService.is_encrypted_bytes(crypto.encrypt_bytes(b"value")) is True
+        assert CryptoService.is_encrypted_bytes(b"gAAAAA_fake") is True
+        assert CryptoService.is_encrypted_bytes(b"plaintext") is False
+        assert CryptoService.is_encrypted_bytes(b"") is False
+
+    def test_singleton_created_once_under_concurrency(self, mocker):
+        """Concurrent first calls to get_crypto_service share one instance"""
+        mocker.patch.object(crypto_module, "_crypto_service", None)
+        init = mocker.spy(CryptoService, "__init__")
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            services = list(pool.map(
+                lambda _: crypto_module.get_crypto_service("singleton-key"), range(16)
+            ))
+
+        assert init.call_count == 1
+        assert all(service is services[0] for service in services)
@@ -0,0 +1,131 @@
+"""
+Unit tests for DataRetentionService
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from shared.services import data_retention_service
+from shared.services.data_retention_service import DataRetentionService, RetentionPolicy
+from shared.services.message_repository import MessageRepository
+from shared.services.session_repository import SessionRepository
+
+
+class _FakeDatabase:
+    """Database stub counting simultaneously open sessions"""
+
+    def __init__(self, mocker):
+        self.mocker = mocker
+        self.open_sessions = 0
+        self.max_open_sessions = 0
+
+    @asynccontextmanager
+    async def session(self):
+        self.open_sessions += 1
+        self.max_open_sessions = max(self.max_open_sessions, self.open_sessions)
+        try:
+            yield self.mocker.MagicMock()
+        finally:
+            self.open_sessions -= 1
+
+
+def _patch_repositories(mocker, value=0):
+    async def slow_query(self, company_id, **kwargs):
+        await asyncio.sleep(0.01)
+        return value
+
+    for repository_cls, method, _ in data_retention_service._statistics_queries(
+        data_retention_service.datetime.now()
+    ):
+        mocker.patch.object(repository_cls, method, slow_query)
+
+
+class TestDashboardSummary:
+    """Tests for concurrent dashboard statistics"""
+
+    async def test_queries_run_in_separate_sessions(self, mocker):
+        """Every query gets its own session and they overlap in time"""
+        _patch_repositories(mocker)
+        database = _FakeDatabase(mocker)
+
+        stats = await DataRetentionService.get_dashboard_summary(database, "company")
+
+        assert database.max_open_sessions > 1
+        assert set(stats) == {
+            "totals",
+            "last_30_days",
+            "by_channel",
+            "sessions_by_state",
+            "conversion_rate_30d",
+            "generated_at",
+        }
+
+    async def test_concurrency_is_bounded(self, mocker):
+        """No more than STATISTICS_CONCURRENCY sessions are open at once"""
+        mocker.patch.object(data_retention_service, "STATISTICS_CONCURRENCY", 2)
+        _patch_repositories(mocker)
+        database = _FakeDatabase(mocker)
+
+        await DataRetentionService.get_dashboard_summary(database, "company")
+
+        assert database.max_open_sessions == 2
+
+    async def test_same_result_as_serial_statistics(self, mock_db_session, mocker):
+        """Concurrent and serial paths build the same response"""
+        _patch_repositories(mocker, value=7)
+
+        concurrent = await DataRetentionService.get_dashboard_summary(
+            _FakeDatabase(mocker), "company"
+        )
+        serial = await DataRetentionService(mock_db_session).get_data_statistics("company")
+
+        concurrent.pop("generated_at")
+        serial.pop("generated_at")
+        assert concurrent == serial
+
+
+class TestCleanupCompanyData:
+    """Tests for batched retention cleanup"""
+
+    async def test_batches_use_own_sessions(self, mock_db_session, mocker):
+        """Each batch runs in its own session; the service session is not committed"""
+        sessions = []
+
+        class _RecordingDatabase(_FakeDatabase):
+            @asynccontextmanager
+            async def session(self):
+                async with super().session() as session:
+                    sessions.append(session)
+                    yield session
+
+        mocker.patch.object(
+            MessageRepository, "delete_old_messages_batch",
+            mocker.AsyncMock(side_effect=[2, 2, 1]),
+        )
+        mocker.patch.object(
+            SessionRepository, "delete_old_sessions_batch",
+            mocker.AsyncMock(side_effect=[0]),
+        )
+        database = _RecordingDatabase(mocker)
+        service = DataRetentionService(mock_db_session, database=database)
+
+        result = await service.cleanup_company_data(
+            "company", RetentionPolicy(batch_size=2)
+        )
+
+        assert result == {"deleted_messages": 5, "deleted_sessions": 0}
+        assert len(sessions) == 4
+        assert database.max_open_sessions == 1
+        mock_db_session.execute.assert_not_called()
+        mock_db_session.commit.assert_not_called()
+
+    async def test_without_database_uses_service_session(self, mock_db_session, mocker):
+        """Without a Database the cleanup stays in the caller's transaction"""
+        mock_db_session.execute.return_value = mocker.MagicMock(rowcount=0)
+        service = DataRetentionService(mock_db_session)
+
+        result = await service.cleanup_company_data("company")
+
+        assert result == {"deleted_messages": 0, "deleted_sessions": 0}
+        assert mock_db_session.execute.await_count == 2
+        mock_db_session.commit.assert_not_called()
@@ -0,0 +1,247 @@
+"""
+Unit tests for the Telegram bot API Gateway client (message batching)
+"""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from telegram_bot.src.gateway_client import (
+    GatewayClient,
+    GatewayResponseError,
+    _is_missing_route,
+)
+
+
+class _FakeGateway:
+    """Local API Gateway recording every webhook request it receives"""
+
+    def __init__(self, batch_route: bool = True, batch_status: int = 200):
+        self.batch_route = batch_route
+        self.batch_status = batch_status
+        self.single_requests = []
+        self.batch_requests = []
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/api/v1/telegram/webhook/{token}", self.single)
+        if self.batch_route:
+            app.router.add_post("/api/v1/telegram/webhook/{token}/batch", self.batch)
+        return app
+
+    @staticmethod
+    def _answer(update):
+        return {"ok": True, "response": update["message"]["text"]}
+
+    async def single(self, request):
+        token = request.match_info["token"]
+        update = await request.json()
+        self.single_requests.append((token, update))
+        if token == "missing":
+            return web.json_response({"detail": "Channel not found"}, status=404)
+        return web.json_response(self._answer(update))
+
+    async def batch(self, request):
+        token = request.match_info["token"]
+        updates = await request.json()
+        self.batch_requests.append((token, updates))
+        if token == "missing":
+            return web.json_response({"detail": "Channel not found"}, status=404)
+        if self.batch_status != 200:
+            return web.json_response({"detail": "boom"}, status=self.batch_status)
+        return web.json_response([self._answer(update) for update in updates])
+
+
+@pytest.fixture
+def fake_gateway():
+    """Fake gateway with the batch endpoint"""
+    return _FakeGateway()
+
+
+@pytest.fixture
+async def gateway_client(fake_gateway):
+    """GatewayClient pointed at a running fake gateway"""
+    server = TestServer(fake_gateway.app())
+    await server.start_server()
+
+    client = GatewayClient(batching=True, batch_window=0.05, batch_max_size=16)
+    client.base_url = str(server.make_url(""))
+    yield client
+
+    await client.close()
+    await server.close()
+
+
+def _send(client, token, text, message_id=1):
+    return client.send_message(
+        webhook_token=token,
+        telegram_user_id=42,
+        telegram_username="user",
+        telegram_first_name="First",
+        telegram_last_name=None,
+        text=text,
+        message_id=message_id,
+    )
+
+
+class TestGatewayClientBatching:
+    """Tests for batching of concurrent messages"""
+
+    async def test_batches_by_token(self, gateway_client, fake_gateway):
+        """Concurrent messages are grouped per webhook token"""
+        results = await asyncio.gather(
+            _send(gateway_client, "token-a", "a1"),
+            _send(gateway_client, "token-b", "b1"),
+            _send(gateway_client, "token-a", "a2"),
+        )
+
+        assert [result["response"] for result in results] == ["a1", "b1", "a2"]
+        assert [(token, len(updates)) for token, updates in fake_gateway.batch_requests] == [
+            ("token-a", 2)
+        ]
+        # A single message is sent without the batch endpoint
+        assert [token for token, _ in fake_gateway.single_requests] == ["token-b"]
+
+    async def test_batch_max_size_split(self, gateway_client, fake_gateway):
+        """Batches never exceed batch_max_size"""
+        gateway_client.batch_max_size = 2
+
+        results = await asyncio.gather(
+            *(_send(gateway_client, "token-a", f"m{i}", i) for i in range(5))
+        )
+
+        assert [result["response"] for result in results] == [f"m{i}" for i in range(5)]
+        assert sorted(len(updates) for _, updates in fake_gateway.batch_requests) == [2, 2]
+        assert len(fake_gateway.single_requests) == 1
+
+    async def test_missing_batch_route_falls_back(self, gateway_client, fake_gateway):
+        """Without the batch endpoint the token switches to single requests"""
+        fake_gateway.batch_route = False
+        server = TestServer(fake_gateway.app())
+        await server.start_server()
+        gateway_client.base_url = str(server.make_url(""))
+
+        try:
+            results = await asyncio.gather(
+                _send(gateway_client, "token-a", "a1"),
+                _send(gateway_client, "token-a", "a2"),
+            )
+            assert [result["response"] for result in results] == ["a1", "a2"]
+            assert "token-a" in gateway_client._batch_unsupported
+
+            await asyncio.gather(
+                _send(gateway_client, "token-a", "a3"),
+                _send(gateway_client, "token-a", "a4"),
+            )
+            assert len(fake_gateway.single_requests) == 4
+        finally:
+            await gateway_client.close()
+            await server.close()
+
+    async def test_channel_not_found_is_not_treated_as_missing_route(
+        self, gateway_client, fake_gateway
+    ):
+        """A 404 returned by the batch endpoint itself reaches the callers"""
+        results = await asyncio.gather(
+            _send(gateway_client, "missing", "x1"),
+            _send(gateway_client, "missing", "x2"),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(result, GatewayResponseError) for result in results)
+        assert all(result.status == 404 for result in results)
+        assert "missing" not in gateway_client._batch_unsupported
+        assert fake_gateway.single_requests == []
+
+    async def test_batch_error_propagates_to_each_caller(self, gateway_client, fake_gateway):
+        """Every caller of a failed batch gets the error"""
+        fake_gateway.batch_status = 500
+
+        results = await asyncio.gather(
+            _send(gateway_client, "token-a", "a1"),
+            _send(gateway_client, "token-a", "a2"),
+            return_exceptions=True,
+        )
+
+        assert [type(result) for result in results] == [GatewayResponseError] * 2
+        assert [result.status for result in results] == [500, 500]
+
+    async def test_close_fails_queued_messages(self, gateway_client):
+        """Messages still waiting in the queue fail when the client closes"""
+        future = asyncio.get_running_loop().create_future()
+        gateway_client._queue = asyncio.Queue()
+        gateway_client._queue.put_nowait(("token-a", {"update_id": 1}, future))
+
+        await gateway_client.close()
+
+        with pytest.raises(RuntimeError):
+            await future
+
+    async def test_close_during_batch_window_fails_collected_messages(self, gateway_client):
+        """Messages taken off the queue for an unsent batch fail on close"""
+        gateway_client.batch_window = 1.0
+        pending = asyncio.ensure_future(_send(gateway_client, "token-a", "a1"))
+        await asyncio.sleep(0.1)
+
+        await gateway_client.close()
+
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(pending, timeout=1.0)
+
+    async def test_close_waits_for_in_flight_batches(self, gateway_client):
+        """Batches already sent still deliver their responses on close"""
+        pending = asyncio.ensure_future(asyncio.gather(
+            _send(gateway_client, "token-a", "a1"),
+            _send(gateway_client, "token-a", "a2"),
+        ))
+        # Let the batch window expire so the batch is in flight
+        await asyncio.sleep(0.1)
+
+        await gateway_client.close()
+
+        assert [result["response"] for result in await pending] == ["a1", "a2"]
+
+
+class TestGatewayClientWithoutBatching:
+    """Tests for the default (non-batching) mode"""
+
+    async def test_sends_each_message_separately(self, fake_gateway):
+        """Without batching concurrent messages never use the batch endpoint"""
+        server = TestServer(fake_gateway.app())
+        await server.start_server()
+        client = GatewayClient()
+        client.base_url = str(server.make_url(""))
+
+        try:
+            results = await asyncio.gather(
+                _send(client, "token-a", "a1"),
+                _send(client, "token-a", "a2"),
+            )
+        finally:
+            await client.close()
+            await server.close()
+
+        assert [result["response"] for result in results] == ["a1", "a2"]
+        assert fake_gateway.batch_requests == []
+        assert len(fake_gateway.single_requests) == 2
+        assert client._batch_task is None
+
+
+class TestIsMissingRoute:
+    """Tests for distinguishing a missing endpoint from an endpoint 404"""
+
+    @pytest.mark.parametrize(
+        "body,expected",
+        [
+            (b'{"detail": "Not Found"}', True),
+            (b"404: Not Found", True),
+            (b"<html>Not Found</html>", True),
+            (b"[]", True),
+            (b'{"detail": "Channel not found"}', False),
+        ],
+    )
+    def test_is_missing_route(self, body, expected):
+        """Only FastAPI's default 404 or non-JSON bodies mean a missing route"""
+        assert _is_missing_route(body) is expected
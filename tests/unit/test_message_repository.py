@@ -0,0 +1,307 @@
+"""
+Unit tests for MessageRepository
+"""
+
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from sqlalchemy.dialects import postgresql
+
+from shared.database.models import UTCDateTime
+from shared.services.message_repository import BULK_COPY_MIN_ROWS, STREAM_YIELD_PER, MessageRepository
+from shared.utils.pagination import decode_cursor
+
+
+class TestDropExpiredPartitions:
+    """Tests for monthly partition retention"""
+
+    async def test_drops_only_fully_expired_months(self, mock_db_session, mocker):
+        """Partitions whose upper bound is after the cutoff are kept"""
+        partitions = mocker.MagicMock()
+        partitions.all.return_value = [
+            ("messages_2024_11",),
+            ("messages_2024_12",),
+            ("messages_2025_01",),
+            ("messages_default",),
+        ]
+        mock_db_session.execute.side_effect = [partitions, None, None, None]
+        repo = MessageRepository(mock_db_session)
+
+        dropped = await repo.drop_expired_partitions(
+            datetime(2025, 1, 1, tzinfo=timezone.utc)
+        )
+
+        assert dropped == ["messages_2024_11", "messages_2024_12"]
+        # SELECT партиций, два DROP и очистка messages_daily_count
+        assert mock_db_session.execute.await_count == 4
+        summary_cleanup = mock_db_session.execute.await_args_list[-1].args[0]
+        assert summary_cleanup.table.name == "messages_daily_count"
+
+    async def test_december_upper_bound_rolls_over_year(self, mock_db_session, mocker):
+        """December partition ends on January 1st of the next year"""
+        partitions = mocker.MagicMock()
+        partitions.all.return_value = [("messages_2024_12",)]
+        mock_db_session.execute.return_value = partitions
+        repo = MessageRepository(mock_db_session)
+
+        dropped = await repo.drop_expired_partitions(
+            datetime(2024, 12, 31, tzinfo=timezone.utc)
+        )
+
+        assert dropped == []
+
+
+class TestMessagesPagination:
+    """Tests for keyset pagination without COUNT(*)"""
+
+    async def test_extra_row_means_next_page(self, mock_db_session, mocker):
+        """per_page + 1 rows are fetched; the extra row is trimmed"""
+        rows = [
+            mocker.MagicMock(created_at=datetime(2026, 1, 13, 10, minute, tzinfo=timezone.utc), id=uuid4())
+            for minute in range(3, 0, -1)
+        ]
+        result = mocker.MagicMock()
+        result.all.return_value = rows
+        mock_db_session.execute.return_value = result
+        repo = MessageRepository(mock_db_session)
+
+        messages, next_cursor = await repo.get_messages_with_pagination(
+            company_id=str(uuid4()), per_page=2
+        )
+
+        assert messages == rows[:2]
+        assert decode_cursor(next_cursor) == (rows[1].created_at, rows[1].id)
+        assert mock_db_session.execute.await_count == 1
+
+    async def test_last_page_has_no_cursor(self, mock_db_session, mocker):
+        """A short page ends pagination"""
+        rows = [mocker.MagicMock(created_at=datetime(2026, 1, 13, tzinfo=timezone.utc), id=uuid4())]
+        result = mocker.MagicMock()
+        result.all.return_value = rows
+        mock_db_session.execute.return_value = result
+        repo = MessageRepository(mock_db_session)
+
+        messages, next_cursor = await repo.get_messages_with_pagination(
+            company_id=str(uuid4()), per_page=2
+        )
+
+        assert messages == rows
+        assert next_cursor is None
+
+
+class TestSaveMessage:
+    """Tests for single message inserts"""
+
+    async def test_created_at_left_to_database(self, mock_db_session, mocker):
+        """created_at is filled by the DEFAULT, string IDs are converted"""
+        mock_db_session.flush = mocker.AsyncMock()
+        session_id, company_id = uuid4(), uuid4()
+        repo = MessageRepository(mock_db_session)
+
+        message = await repo.save_user_message(
+            str(session_id), company_id, "telegram", "hi", "user-1"
+        )
+
+        assert message.created_at is None
+        assert message.session_id == session_id
+        assert message.company_id == company_id
+        mock_db_session.add.assert_called_once_with(message)
+
+
+class TestUTCDateTime:
+    """Tests for the naive-UTC timestamp column type"""
+
+    def test_aware_bind_converted_to_naive_utc(self):
+        """Aware values are stored as naive UTC"""
+        value = datetime(2026, 1, 13, 15, 0, tzinfo=timezone(timedelta(hours=3)))
+
+        assert UTCDateTime().process_bind_param(value, None) == datetime(2026, 1, 13, 12, 0)
+
+    def test_result_is_aware_utc(self):
+        """Naive values from the database are returned as UTC"""
+        value = UTCDateTime().process_result_value(datetime(2026, 1, 13, 12, 0), None)
+
+        assert value == datetime(2026, 1, 13, 12, 0, tzinfo=timezone.utc)
+
+
+class TestSaveMessagesBulk:
+    """Tests for batched message inserts"""
+
+    @staticmethod
+    def _messages(count):
+        return [
+            {
+                "session_id": str(uuid4()),
+                "company_id": str(uuid4()),
+                "channel": "telegram",
+                "text": f"message {i}",
+                "is_from_bot": bool(i % 2),
+            }
+            for i in range(count)
+        ]
+
+    async def test_small_batch_uses_single_flush(self, mock_db_session, mocker):
+        """Batches below BULK_COPY_MIN_ROWS go through the ORM"""
+        mock_db_session.flush = mocker.AsyncMock()
+        mock_db_session.connection = mocker.AsyncMock()
+        repo = MessageRepository(mock_db_session)
+
+        ids = await repo.save_messages_bulk(self._messages(3))
+
+        assert len(ids) == 3
+        added = mock_db_session.add_all.call_args.args[0]
+        assert [m.id for m in added] == ids
+        mock_db_session.flush.assert_awaited_once()
+        mock_db_session.connection.assert_not_awaited()
+
+    async def test_large_batch_uses_copy(self, mock_db_session, mocker):
+        """Large batches are written with COPY on the session connection"""
+        driver_connection = mocker.MagicMock()
+        driver_connection.copy_records_to_table = mocker.AsyncMock()
+        connection = mocker.MagicMock()
+        connection.get_raw_connection = mocker.AsyncMock(
+            return_value=mocker.MagicMock(driver_connection=driver_connection)
+        )
+        mock_db_session.connection = mocker.AsyncMock(return_value=connection)
+        repo = MessageRepository(mock_db_session)
+
+        ids = await repo.save_messages_bulk(self._messages(BULK_COPY_MIN_ROWS))
+
+        call = driver_connection.copy_records_to_table.await_args
+        assert call.args == ("messages",)
+        assert len(call.kwargs["records"]) == BULK_COPY_MIN_ROWS
+        assert [record[0] for record in call.kwargs["records"]] == ids
+        mock_db_session.add_all.assert_not_called()
+
+    async def test_empty_batch(self, mock_db_session):
+        """Nothing is sent for an empty list"""
+        repo = MessageRepository(mock_db_session)
+
+        assert await repo.save_messages_bulk([]) == []
+        mock_db_session.add_all.assert_not_called()
+
+
+class TestDeleteOldMessages:
+    """Tests for batched retention deletes"""
+
+    async def test_deletes_in_batches_without_count(self, mock_db_session, mocker):
+        """DELETE repeats until a short batch; no COUNT(*) is issued"""
+        mock_db_session.execute.side_effect = [
+            mocker.MagicMock(rowcount=2),
+            mocker.MagicMock(rowcount=2),
+            mocker.MagicMock(rowcount=1),
+        ]
+        repo = MessageRepository(mock_db_session)
+
+        deleted = await repo.delete_old_messages(str(uuid4()), retention_days=30, batch_size=2)
+
+        assert deleted == 5
+        assert mock_db_session.execute.await_count == 3
+        # The repository never commits: the caller owns the transaction
+        mock_db_session.commit.assert_not_called()
+        for call in mock_db_session.execute.await_args_list:
+            assert call.args[0].is_delete
+
+
+class TestDailyMessageCount:
+    """Tests for analytics read from messages_daily_count"""
+
+    async def test_reads_summary_table(self, mock_db_session, mocker):
+        """Daily counts come from the summary table, not from messages"""
+        result = mocker.MagicMock()
+        result.all.return_value = [mocker.MagicMock(date="2026-01-13", count=42)]
+        mock_db_session.execute.return_value = result
+        repo = MessageRepository(mock_db_session)
+
+        daily = await repo.get_daily_message_count(str(uuid4()), days=7)
+
+        assert daily == [{"date": "2026-01-13", "count": 42}]
+        query = mock_db_session.execute.await_args.args[0]
+        assert [table.name for table in query.get_final_froms()] == ["messages_daily_count"]
+
+
+class TestLeanMessageLists:
+    """Tests for column-only list queries"""
+
+    async def test_session_messages_skip_metadata(self, mock_db_session, mocker):
+        """List queries select plain columns without JSONB metadata"""
+        result = mocker.MagicMock()
+        result.all.return_value = []
+        mock_db_session.execute.return_value = result
+        repo = MessageRepository(mock_db_session)
+
+        await repo.list_session_messages_lite(str(uuid4()))
+
+        query = mock_db_session.execute.await_args.args[0]
+        selected = [column.name for column in query.selected_columns]
+        assert "message_metadata" not in selected
+        assert "audio_url" not in selected
+        assert {"id", "text", "is_from_bot", "created_at"} <= set(selected)
+
+
+class TestCreateFuturePartitions:
+    """Tests for monthly partition maintenance"""
+
+    async def test_months_roll_over_year(self, mock_db_session, mocker):
+        """Partitions are requested for the current and following months"""
+        fake_now = datetime(2026, 11, 20, tzinfo=timezone.utc)
+        mocker.patch(
+            "shared.services.message_repository.datetime",
+            mocker.MagicMock(now=mocker.MagicMock(return_value=fake_now)),
+        )
+        mock_db_session.execute.return_value = mocker.MagicMock()
+        repo = MessageRepository(mock_db_session)
+
+        await repo.create_future_partitions(months_ahead=2)
+
+        months = [call.args[1]["month"] for call in mock_db_session.execute.await_args_list]
+        assert [str(month) for month in months] == ["2026-11-01", "2026-12-01", "2027-01-01"]
+
+
+class TestIterCompanyMessages:
+    """Tests for streaming message export"""
+
+    async def test_streams_with_server_side_cursor(self, mock_db_session, mocker):
+        """Rows are read through stream_scalars with yield_per, without LIMIT"""
+        messages = [mocker.MagicMock(), mocker.MagicMock()]
+
+        class _Stream:
+            def __init__(self):
+                self.close = mocker.AsyncMock()
+
+            async def __aiter__(self):
+                for message in messages:
+                    yield message
+
+        stream = _Stream()
+        mock_db_session.stream_scalars = mocker.AsyncMock(return_value=stream)
+        repo = MessageRepository(mock_db_session)
+
+        received = [m async for m in repo.iter_company_messages(str(uuid4()), channel="telegram")]
+
+        assert received == messages
+        query = mock_db_session.stream_scalars.await_args.args[0]
+        assert query.get_execution_options()["yield_per"] == STREAM_YIELD_PER
+        assert query._limit_clause is None
+        stream.close.assert_awaited_once()
+
+
+class TestCountMessages:
+    """Tests for the message count query shape"""
+
+    async def test_plain_count_star(self, mock_db_session, mocker):
+        """Count is a bare count(*) without ORDER BY or subquery"""
+        mock_db_session.execute.return_value = mocker.MagicMock()
+        mock_db_session.execute.return_value.scalar.return_value = 7
+        repo = MessageRepository(mock_db_session)
+
+        count = await repo.count_messages(
+            str(uuid4()), start_date=datetime(2026, 1, 1, tzinfo=timezone.utc), channel="telegram"
+        )
+
+        assert count == 7
+        stmt = mock_db_session.execute.await_args.args[0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert sql.startswith("SELECT count(*) AS count_1 \nFROM messages")
+        assert "ORDER BY" not in sql
+        assert "(SELECT" not in sql
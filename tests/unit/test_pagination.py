@@ -0,0 +1,57 @@
+"""
+Unit tests for keyset pagination cursors
+"""
+
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import column, select, table
+from sqlalchemy.dialects import postgresql
+
+from shared.utils.pagination import encode_cursor, decode_cursor, estimate_row_count
+
+
+class TestCursor:
+    """Tests for cursor encoding"""
+
+    def test_roundtrip(self):
+        """Decoded cursor returns the original position"""
+        timestamp = datetime(2026, 1, 13, 10, 15, 30, 123456, tzinfo=timezone.utc)
+        record_id = uuid4()
+
+        cursor = encode_cursor(timestamp, record_id)
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == (timestamp, record_id)
+
+    @pytest.mark.parametrize("cursor", ["", "not-a-cursor", "bm8tc2VwYXJhdG9y"])
+    def test_invalid_cursor(self, cursor):
+        """Malformed cursors raise ValueError"""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestEstimateRowCount:
+    """Tests for EXPLAIN-based row estimates"""
+
+    async def test_user_values_are_not_parsed_as_binds(self):
+        """Inlined values containing ':name' reach the driver unchanged"""
+        result = MagicMock()
+        result.scalar.return_value = [{"Plan": {"Plan Rows": 42}}]
+        connection = MagicMock()
+        connection.exec_driver_sql = AsyncMock(return_value=result)
+        session = MagicMock()
+        session.get_bind.return_value.dialect = postgresql.dialect()
+        session.connection = AsyncMock(return_value=connection)
+
+        messages = table("messages", column("channel"))
+        query = select(messages).where(messages.c.channel == "a :evil")
+
+        assert await estimate_row_count(session, query) == 42
+        sql = connection.exec_driver_sql.await_args.args[0]
+        assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+        assert "'a :evil'" in sql
+        assert connection.exec_driver_sql.await_args.args[1:] == ()
+        session.execute.assert_not_called()
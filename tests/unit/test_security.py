@@ -44,6 +44,22 @@ class TestSecurityService:
 
         assert security.verify_webhook_signature(payload, signature) is True
 
+    def test_verify_webhook_signature_hex_case_and_raw_bytes(self, security):
+        """Signature is compared as a digest: hex case does not matter, raw bytes work"""
+        payload = b'{"event": "test"}'
+        digest = hmac.new(b"test-webhook-secret", payload, hashlib.sha256).digest()
+
+        assert security.verify_webhook_signature(payload, digest.hex().upper()) is True
+        assert security.verify_webhook_signature(payload, digest) is True
+        assert security.verify_webhook_signature(payload, digest[:-1]) is False
+
+    def test_verify_webhook_signature_repeated_calls(self, security):
+        """Each verification starts from a clean HMAC state"""
+        for payload in (b'{"event": "first"}', b'{"event": "second"}', b""):
+            signature = hmac.new(b"test-webhook-secret", payload, hashlib.sha256).hexdigest()
+
+            assert security.verify_webhook_signature(payload, signature) is True
+
     def test_verify_webhook_signature_invalid(self, security):
         """Test invalid webhook signature rejection"""
         payload = b'{"event": "test"}'
@@ -0,0 +1,165 @@
+"""
+Unit tests for SessionRepository
+"""
+
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from shared.services import session_repository
+from shared.services.session_repository import SessionRepository
+
+
+@pytest.fixture(autouse=True)
+def clear_conversion_cache():
+    """Isolate the process-wide conversion cache between tests"""
+    session_repository._conversion_cache.clear()
+    yield
+    session_repository._conversion_cache.clear()
+
+
+def _compiled_sql(mock_db_session) -> str:
+    stmt = mock_db_session.execute.await_args.args[0]
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+class TestUpsertSession:
+    """Tests for single-statement session upsert"""
+
+    async def test_single_insert_on_conflict(self, mock_db_session, mocker):
+        """Upsert is one INSERT ... ON CONFLICT without a prior SELECT"""
+        mock_db_session.execute.return_value = mocker.MagicMock()
+        repo = SessionRepository(mock_db_session)
+
+        await repo.upsert_session(
+            session_id=str(uuid4()),
+            company_id=str(uuid4()),
+            user_id="user_1",
+            channel="telegram",
+            state="greeting",
+            context={"name": "Иван"},
+        )
+
+        assert mock_db_session.execute.await_count == 1
+        sql = _compiled_sql(mock_db_session)
+        assert sql.startswith("INSERT INTO sessions")
+        assert "ON CONFLICT (id) DO UPDATE" in sql
+        assert "context = excluded.context" in sql
+
+    async def test_empty_values_do_not_overwrite(self, mock_db_session, mocker):
+        """Missing context and CRM ids keep the stored values"""
+        mock_db_session.execute.return_value = mocker.MagicMock()
+        repo = SessionRepository(mock_db_session)
+
+        await repo.upsert_session(
+            session_id=str(uuid4()),
+            company_id=str(uuid4()),
+            user_id="user_1",
+            channel="telegram",
+            state="booking",
+        )
+
+        sql = _compiled_sql(mock_db_session)
+        set_clause = sql.split("DO UPDATE SET", 1)[1].split("RETURNING", 1)[0]
+        assert "state = excluded.state" in set_clause
+        assert "context" not in set_clause
+        assert "crm_client_id" not in set_clause
+        assert "crm_appointment_id" not in set_clause
+
+
+class TestConversionRate:
+    """Tests for single-pass, cached conversion stats"""
+
+    @staticmethod
+    def _stats_result(total, completed, mocker):
+        result = mocker.MagicMock()
+        result.one.return_value = mocker.MagicMock(total=total, completed=completed)
+        return result
+
+    async def test_single_query_with_filter(self, mock_db_session, mocker):
+        """Total and completed come from one COUNT ... FILTER query"""
+        mock_db_session.execute.return_value = self._stats_result(8, 2, mocker)
+        repo = SessionRepository(mock_db_session)
+
+        assert await repo.get_conversion_rate(str(uuid4())) == 25.0
+        assert mock_db_session.execute.await_count == 1
+        assert "FILTER (WHERE" in _compiled_sql(mock_db_session)
+
+    async def test_cached_per_company_and_period(self, mock_db_session, mocker):
+        """Repeated calls hit the cache; another period is queried separately"""
+        mock_db_session.execute.return_value = self._stats_result(4, 1, mocker)
+        repo = SessionRepository(mock_db_session)
+        company_id = str(uuid4())
+
+        assert await repo.get_conversion_rate(company_id) == 25.0
+        assert await repo.get_completed_sessions_count(company_id) == 1
+        assert mock_db_session.execute.await_count == 1
+
+        await repo.get_conversion_rate(company_id, days=7)
+        assert mock_db_session.execute.await_count == 2
+
+    async def test_no_sessions(self, mock_db_session, mocker):
+        """Zero sessions give zero conversion"""
+        mock_db_session.execute.return_value = self._stats_result(0, 0, mocker)
+        repo = SessionRepository(mock_db_session)
+
+        assert await repo.get_conversion_rate(str(uuid4())) == 0.0
+
+
+class TestUpdateSessionStatesBulk:
+    """Tests for batched session state writes"""
+
+    async def test_single_update_from_values(self, mock_db_session, mocker):
+        """All sessions are written by one UPDATE ... FROM (VALUES ...)"""
+        mock_db_session.execute.return_value = mocker.MagicMock(rowcount=2)
+        repo = SessionRepository(mock_db_session)
+        now = datetime.now(timezone.utc)
+
+        updated = await repo.update_session_states_bulk([
+            (uuid4(), "booking", {"name": "Иван"}, now),
+            (uuid4(), "completed", None, now),
+        ])
+
+        assert updated == 2
+        assert mock_db_session.execute.await_count == 1
+        sql = _compiled_sql(mock_db_session)
+        assert sql.startswith("UPDATE sessions")
+        assert "FROM (VALUES" in sql
+        assert "coalesce(v.context, sessions.context)" in sql
+
+    async def test_stale_updates_do_not_move_activity_back(self, mock_db_session, mocker):
+        """Rows newer than the buffered timestamp are left untouched"""
+        mock_db_session.execute.return_value = mocker.MagicMock(rowcount=0)
+        repo = SessionRepository(mock_db_session)
+
+        await repo.update_session_states_bulk([
+            (uuid4(), "booking", None, datetime.now(timezone.utc)),
+        ])
+
+        sql = _compiled_sql(mock_db_session)
+        assert "sessions.last_activity_at IS NULL" in sql
+        assert "sessions.last_activity_at <= v.activity_at" in sql
+
+    async def test_empty_updates(self, mock_db_session):
+        """Nothing is executed for an empty batch"""
+        repo = SessionRepository(mock_db_session)
+
+        assert await repo.update_session_states_bulk([]) == 0
+        mock_db_session.execute.assert_not_awaited()
+
+
+class TestGetLatestUserSession:
+    """Tests for the latest user session lookup"""
+
+    async def test_single_row_newest_first(self, mock_db_session, mocker):
+        """Only the most recently active session is fetched"""
+        mock_db_session.execute.return_value = mocker.MagicMock()
+        repo = SessionRepository(mock_db_session)
+
+        await repo.get_latest_user_session(str(uuid4()), "user_1")
+
+        sql = _compiled_sql(mock_db_session)
+        assert "ORDER BY sessions.last_activity_at DESC" in sql
+        assert "LIMIT" in sql
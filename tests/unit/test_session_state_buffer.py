@@ -0,0 +1,101 @@
+"""
+Unit tests for SessionStateBuffer
+"""
+
+import json
+from contextlib import asynccontextmanager
+from uuid import uuid4
+
+import pytest
+import redis.asyncio as aioredis
+
+from shared.services.session_repository import SessionRepository
+from shared.services.session_state_buffer import DIRTY_SESSIONS_KEY, SessionStateBuffer
+
+
+@pytest.fixture
+def mock_database(mocker, mock_db_session):
+    """Database whose session() yields mock_db_session"""
+    database = mocker.MagicMock()
+
+    @asynccontextmanager
+    async def session():
+        yield mock_db_session
+
+    database.session = session
+    return database
+
+
+def _payload(state, context=None):
+    return json.dumps({"state": state, "context": context, "ts": "2026-01-13T10:00:00+00:00"})
+
+
+class TestUpdateSessionState:
+    """Tests for buffering state updates in Redis"""
+
+    async def test_state_written_to_redis(self, mock_redis, mock_database, mocker):
+        """State goes to Redis and the session is marked dirty"""
+        pipe = mocker.MagicMock()
+        pipe.execute = mocker.AsyncMock()
+        mock_redis.pipeline.return_value.__aenter__ = mocker.AsyncMock(return_value=pipe)
+        mock_redis.pipeline.return_value.__aexit__ = mocker.AsyncMock(return_value=False)
+        buffer = SessionStateBuffer(mock_redis, mock_database)
+
+        assert await buffer.update_session_state("s1", "booking", {"name": "Иван"}) is True
+
+        key, payload = pipe.set.call_args.args
+        assert key == "session:s1:state"
+        assert json.loads(payload)["state"] == "booking"
+        pipe.sadd.assert_called_once_with(DIRTY_SESSIONS_KEY, "s1")
+
+    async def test_redis_error_reported(self, mock_redis, mock_database, mocker):
+        """Caller falls back to a direct write when Redis is unavailable"""
+        mock_redis.pipeline.return_value.__aenter__ = mocker.AsyncMock(
+            side_effect=aioredis.ConnectionError("down")
+        )
+        mock_redis.pipeline.return_value.__aexit__ = mocker.AsyncMock(return_value=False)
+        buffer = SessionStateBuffer(mock_redis, mock_database)
+
+        assert await buffer.update_session_state("s1", "booking") is False
+
+
+class TestFlush:
+    """Tests for batched writes to PostgreSQL"""
+
+    async def test_dirty_sessions_written_in_one_batch(self, mock_redis, mock_database, mocker):
+        """Sessions with expired state keys are skipped"""
+        first, second, expired = str(uuid4()), str(uuid4()), str(uuid4())
+        mock_redis.spop = mocker.AsyncMock(side_effect=[[first, second, expired], []])
+        mock_redis.mget = mocker.AsyncMock(
+            return_value=[_payload("booking", {"a": 1}), _payload("completed"), None]
+        )
+        bulk = mocker.patch.object(
+            SessionRepository, "update_session_states_bulk", mocker.AsyncMock(return_value=2)
+        )
+        buffer = SessionStateBuffer(mock_redis, mock_database, batch_size=10)
+
+        assert await buffer.flush() == 2
+
+        updates = bulk.await_args.args[0]
+        assert [(str(u[0]), u[1], u[2]) for u in updates] == [
+            (first, "booking", {"a": 1}),
+            (second, "completed", None),
+        ]
+
+    async def test_failed_write_requeues_sessions(self, mock_redis, mock_database, mocker):
+        """Sessions go back to the dirty set when PostgreSQL fails"""
+        session_id = str(uuid4())
+        mock_redis.spop = mocker.AsyncMock(return_value=[session_id])
+        mock_redis.mget = mocker.AsyncMock(return_value=[_payload("booking")])
+        mock_redis.sadd = mocker.AsyncMock()
+        mocker.patch.object(
+            SessionRepository,
+            "update_session_states_bulk",
+            mocker.AsyncMock(side_effect=RuntimeError("db down")),
+        )
+        buffer = SessionStateBuffer(mock_redis, mock_database)
+
+        with pytest.raises(RuntimeError):
+            await buffer.flush()
+
+        mock_redis.sadd.assert_awaited_once_with(DIRTY_SESSIONS_KEY, session_id)
@@ -0,0 +1,147 @@
+"""
+Unit tests for Telegram slot callback_data packing and parsing
+"""
+
+import pytest
+
+from telegram_bot.src.bot import SLOT_CALLBACK_RE, parse_slot_callback
+from telegram_bot.src.keyboards import (
+    MAX_CALLBACK_DATA_BYTES,
+    create_time_slots_keyboard,
+    pack_slot_datetime,
+    pack_slot_uuids,
+    slot_callback_data,
+    unpack_slot_datetime,
+    unpack_slot_uuids,
+)
+
+EMPLOYEE_UUID = "0b6f1a2c-3d4e-4f50-8a6b-7c8d9e0f1a2b"
+SERVICE_UUID = "e1f49f5a-6e7f-4f80-9a1b-2c3d4e5f6a7b"
+
+
+class TestSlotDatetimePacking:
+    """Tests for pack_slot_datetime / unpack_slot_datetime"""
+
+    @pytest.mark.parametrize("time_str", ["00:00", "09:05", "14:00", "23:59"])
+    def test_roundtrip(self, time_str):
+        """Packed date and time unpack to the original strings"""
+        token = pack_slot_datetime("2026-01-15", time_str)
+
+        assert len(token) == 8
+        assert unpack_slot_datetime(token) == ("2026-01-15", time_str)
+
+    @pytest.mark.parametrize(
+        "date_str,time_str",
+        [
+            ("2026-01-15", "24:00"),
+            ("2026-01-15", "23:60"),
+            ("2026-01-15", "9:00"),
+            ("2026-01-15", "14:00:00"),
+            ("2026-01-15", "-1:00"),
+            ("20260115", "14:00"),
+            ("not-a-date", "14:00"),
+            ("2026-01-15", ""),
+        ],
+    )
+    def test_non_roundtrip_values_are_not_packed(self, date_str, time_str):
+        """Values that would not unpack identically return None"""
+        assert pack_slot_datetime(date_str, time_str) is None
+
+    @pytest.mark.parametrize("token", ["AAAAAAAA", "________", "abc"])
+    def test_corrupted_token_raises(self, token):
+        """Corrupted tokens raise ValueError"""
+        with pytest.raises(ValueError):
+            unpack_slot_datetime(token)
+
+
+class TestSlotUuidPacking:
+    """Tests for pack_slot_uuids / unpack_slot_uuids"""
+
+    def test_roundtrip(self):
+        """Date, time and both UUIDs survive packing"""
+        token = pack_slot_uuids("2026-01-15", "14:00", EMPLOYEE_UUID, SERVICE_UUID)
+
+        assert len(token) == 51
+        assert unpack_slot_uuids(token) == ("2026-01-15", "14:00", EMPLOYEE_UUID, SERVICE_UUID)
+
+    @pytest.mark.parametrize(
+        "employee_id,service_id",
+        [
+            ("emp123", SERVICE_UUID),
+            (EMPLOYEE_UUID, "svc456"),
+            (EMPLOYEE_UUID.upper(), SERVICE_UUID),
+            (EMPLOYEE_UUID.replace("-", ""), SERVICE_UUID),
+        ],
+    )
+    def test_non_canonical_ids_are_not_packed(self, employee_id, service_id):
+        """Only canonical lowercase UUIDs are packed"""
+        assert pack_slot_uuids("2026-01-15", "14:00", employee_id, service_id) is None
+
+    def test_invalid_time_is_not_packed(self):
+        """Invalid time falls back even with UUID ids"""
+        assert pack_slot_uuids("2026-01-15", "24:00", EMPLOYEE_UUID, SERVICE_UUID) is None
+
+
+class TestSlotCallbackData:
+    """Tests for slot callback_data format selection and parsing"""
+
+    @pytest.mark.parametrize(
+        "fields,prefix",
+        [
+            (("2026-01-15", "14:00", EMPLOYEE_UUID, SERVICE_UUID), "su:"),
+            (("2026-01-15", "14:00", "emp123", "svc456"), "s:"),
+            (("2026-01-15", "9:00", "emp123", "svc456"), "slot:"),
+            (("2026-01-15", "24:00", "emp123", "svc456"), "slot:"),
+            (("2026-01-15", "14:00", "", ""), "s:"),
+        ],
+    )
+    def test_roundtrip_through_regexp(self, fields, prefix):
+        """Every format matches SLOT_CALLBACK_RE and parses back to the same fields"""
+        callback_data = slot_callback_data(*fields)
+        match = SLOT_CALLBACK_RE.match(callback_data)
+
+        assert callback_data.startswith(prefix)
+        assert len(callback_data.encode()) <= MAX_CALLBACK_DATA_BYTES
+        assert match is not None
+        assert parse_slot_callback(match) == fields
+
+    def test_overflow_raises_instead_of_truncating(self):
+        """IDs that do not fit are rejected, not silently cut"""
+        with pytest.raises(ValueError, match="exceeds"):
+            slot_callback_data("2026-01-15", "14:00", EMPLOYEE_UUID, "svc-" + "x" * 40)
+
+    @pytest.mark.parametrize(
+        "callback_data",
+        [
+            "su:tooshort",
+            "s:AAAA:emp:svc",
+            "s:VEYLAEgD:emp",
+            "slot:2026-01-15",
+            "service:svc",
+        ],
+    )
+    def test_regexp_rejects_malformed(self, callback_data):
+        """Malformed slot callback_data does not match"""
+        assert SLOT_CALLBACK_RE.match(callback_data) is None
+
+    def test_corrupted_packed_token_raises_on_parse(self):
+        """A well-formed but corrupted su: token raises ValueError"""
+        match = SLOT_CALLBACK_RE.match("su:" + "_" * 51)
+
+        assert match is not None
+        with pytest.raises(ValueError):
+            parse_slot_callback(match)
+
+    def test_keyboard_uses_compact_callback(self):
+        """Slot keyboard buttons carry parseable callback_data"""
+        keyboard = create_time_slots_keyboard(
+            [{"time": "14:00", "employee_id": EMPLOYEE_UUID, "employee_name": "Анна"}],
+            "2026-01-15",
+            SERVICE_UUID,
+        )
+        button = keyboard.inline_keyboard[0][0]
+
+        assert button.text == "14:00 (Анна)"
+        assert parse_slot_callback(SLOT_CALLBACK_RE.match(button.callback_data)) == (
+            "2026-01-15", "14:00", EMPLOYEE_UUID, SERVICE_UUID
+        )
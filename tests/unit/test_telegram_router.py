@@ -0,0 +1,104 @@
+"""
+Unit tests for the API Gateway Telegram webhook batch endpoint
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import HTTPException
+
+from api_gateway.src.api.routers import telegram as telegram_router
+
+
+def _request(body):
+    """Request stub whose JSON body is `body`"""
+    request = MagicMock()
+    request.json = AsyncMock(return_value=body)
+    return request
+
+
+def _update(update_id):
+    return {"update_id": update_id, "message": {"text": f"text {update_id}"}}
+
+
+@pytest.fixture
+def resolve_company_id(mocker):
+    """Channel lookup resolving every token to one company"""
+    return mocker.patch.object(
+        telegram_router, "_resolve_company_id", AsyncMock(return_value="company-1")
+    )
+
+
+class TestTelegramWebhookBatch:
+    """Tests for POST /webhook/{token}/batch"""
+
+    async def test_processes_updates_in_order(self, resolve_company_id, mocker):
+        """Responses follow the order of updates; the channel is resolved once"""
+        process = mocker.patch.object(
+            telegram_router,
+            "_process_update",
+            AsyncMock(side_effect=lambda company_id, update: {
+                "ok": True, "response": update["message"]["text"]
+            }),
+        )
+
+        responses = await telegram_router.telegram_webhook_batch(
+            "token", _request([_update(1), _update(2)])
+        )
+
+        assert [response["response"] for response in responses] == ["text 1", "text 2"]
+        resolve_company_id.assert_awaited_once_with("token")
+        assert process.await_count == 2
+
+    async def test_item_error_is_mapped_per_update(self, resolve_company_id, mocker):
+        """One failing update does not fail the rest of the batch"""
+        async def process(company_id, update):
+            if update["update_id"] == 2:
+                raise RuntimeError("agent exploded")
+            return {"ok": True, "response": "fine"}
+
+        mocker.patch.object(telegram_router, "_process_update", process)
+
+        responses = await telegram_router.telegram_webhook_batch(
+            "token", _request([_update(1), _update(2), _update(3)])
+        )
+
+        assert [response["ok"] for response in responses] == [True, False, True]
+        assert responses[1] == {
+            "ok": False,
+            "response": telegram_router.PROCESSING_ERROR_TEXT,
+            "error": "agent exploded",
+        }
+
+    async def test_non_list_body_returns_422(self, resolve_company_id):
+        """A single update object is rejected"""
+        with pytest.raises(HTTPException) as exc_info:
+            await telegram_router.telegram_webhook_batch("token", _request(_update(1)))
+
+        assert exc_info.value.status_code == 422
+        resolve_company_id.assert_not_awaited()
+
+    async def test_oversized_batch_returns_413(self, resolve_company_id):
+        """Batches above MAX_BATCH_SIZE are rejected before any processing"""
+        updates = [_update(i) for i in range(telegram_router.MAX_BATCH_SIZE + 1)]
+
+        with pytest.raises(HTTPException) as exc_info:
+            await telegram_router.telegram_webhook_batch("token", _request(updates))
+
+        assert exc_info.value.status_code == 413
+        resolve_company_id.assert_not_awaited()
+
+    async def test_unknown_channel_returns_404_detail(self, mocker):
+        """Unknown tokens answer 404 with the endpoint's own detail"""
+        session = MagicMock()
+        session.__aenter__ = AsyncMock(return_value=MagicMock())
+        session.__aexit__ = AsyncMock(return_value=False)
+        mocker.patch.object(telegram_router.db, "session", return_value=session)
+        company_service = mocker.patch.object(telegram_router, "CompanyService")
+        company_service.return_value.get_channel_by_token = AsyncMock(return_value=None)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await telegram_router.telegram_webhook_batch("unknown", _request([_update(1)]))
+
+        assert exc_info.value.status_code == 404
+        assert exc_info.value.detail == "Channel not found"